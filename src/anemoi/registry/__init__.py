@@ -7,12 +7,32 @@
 # granted to it by virtue of its status as an intergovernmental organisation
 # nor does it submit to any jurisdiction.
 
-# ruff: noqa: E402
-
+import importlib
 import logging
 
 LOG = logging.getLogger(__name__)
 
+# Imported on first use, so that a command only pays for the entries it needs
+_LAZY = {
+    "Dataset": ("entry.dataset", "DatasetCatalogueEntry"),
+    "DatasetsList": ("entry.dataset", "DatasetCatalogueEntryList"),
+    "Experiment": ("entry.experiment", "ExperimentCatalogueEntry"),
+    "ExperimentsList": ("entry.experiment", "ExperimentCatalogueEntryList"),
+    "Weights": ("entry.weights", "WeightCatalogueEntry"),
+    "WeightsList": ("entry.weights", "WeightsCatalogueEntryList"),
+    "Task": ("tasks", "TaskCatalogueEntry"),
+    "TasksList": ("tasks", "TaskCatalogueEntryList"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _LAZY[name]
+    value = getattr(importlib.import_module(f".{module}", __name__), attr)
+    globals()[name] = value
+    return value
+
 
 def config(*args, **kwargs):
     from anemoi.registry.configuration import CONF
@@ -21,17 +41,10 @@ def config(*args, **kwargs):
 
 
 def publish_dataset(*args, **kwargs):
-    return Dataset.publish(*args, **kwargs)
+    from .entry.dataset import DatasetCatalogueEntry
 
+    return DatasetCatalogueEntry.publish(*args, **kwargs)
 
-from .entry.dataset import DatasetCatalogueEntry as Dataset
-from .entry.dataset import DatasetCatalogueEntryList as DatasetsList
-from .entry.experiment import ExperimentCatalogueEntry as Experiment
-from .entry.experiment import ExperimentCatalogueEntryList as ExperimentsList
-from .entry.weights import WeightCatalogueEntry as Weights
-from .entry.weights import WeightsCatalogueEntryList as WeightsList
-from .tasks import TaskCatalogueEntry as Task
-from .tasks import TaskCatalogueEntryList as TasksList
 
 try:
     # NOTE: the `_version.py` file must not be present in the git repository
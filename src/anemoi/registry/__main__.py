@@ -7,6 +7,8 @@
 # granted to it by virtue of its status as an intergovernmental organisation
 # nor does it submit to any jurisdiction.
 
+import sys
+
 from anemoi.utils.cli import cli_main
 from anemoi.utils.cli import make_parser
 
@@ -20,7 +22,7 @@ def create_parser():
 
 
 def main():
-    cli_main(__version__, __doc__, COMMANDS)
+    cli_main(__version__, __doc__, COMMANDS.selected(sys.argv[1:]))
 
 
 def main_PYTHON_ARGCOMPLETE_OK():
@@ -0,0 +1,129 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Asyncio front-end to the REST API client, for bulk operations.
+
+Requests are run in worker threads on the shared, pooled session of `Rest`,
+so they get the same retries (`anemoi.utils.remote.robust`) and the same error
+mapping (`Rest.raise_for_status`) as the synchronous API. A semaphore bounds the
+number of requests in flight.
+"""
+
+import asyncio
+import logging
+
+from anemoi.registry.rest import DEFAULT_POOL_SIZE
+from anemoi.registry.rest import AlreadyExists
+from anemoi.registry.rest import Rest
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncRest:
+    """Asynchronous REST API client with bounded concurrency."""
+
+    def __init__(self, rest=None, max_concurrency=None):
+        self.rest = rest or Rest()
+        if max_concurrency is None:
+            # More requests in flight than pooled connections would open throw-away connections
+            max_concurrency = self.rest.config.get("http_pool_size", DEFAULT_POOL_SIZE)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily, so that it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _call(self, func, *args, **kwargs):
+        async with self.semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def get(self, path, params=None, errors={}, cache=True):
+        return await self._call(self.rest.get, path, params=params, errors=errors, cache=cache)
+
+    async def exists(self, path, params=None):
+        return await self._call(self.rest.exists, path, params=params)
+
+    async def put(self, path, data, errors={}):
+        return await self._call(self.rest.put, path, data, errors=errors)
+
+    async def patch(self, path, data, errors={}, robust=False):
+        return await self._call(self.rest.patch, path, data, errors=errors, robust=robust)
+
+    async def post(self, path, data, errors={}, robust=False):
+        return await self._call(self.rest.post, path, data, errors=errors, robust=robust)
+
+    async def delete(self, path, errors={}):
+        return await self._call(self.rest.delete, path, errors=errors)
+
+    async def unprotected_delete(self, path, errors={}):
+        return await self._call(self.rest.unprotected_delete, path, errors=errors)
+
+    async def unprotected_bulk_delete(self, path, keys):
+        return await self._call(self.rest.unprotected_bulk_delete, path, keys)
+
+
+class AsyncRestItem:
+    """Single catalogue entry from REST API, asynchronous version of `RestItem`."""
+
+    def __init__(self, collection, key, rest=None):
+        self.collection = collection
+        self.key = key
+        self.rest = rest or AsyncRest()
+        self.path = f"{collection}/{key}"
+
+    async def exists(self, *args, **kwargs):
+        return await self.rest.exists(self.path, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self.rest.get(self.path, *args, **kwargs)
+
+    async def patch(self, data, *args, **kwargs):
+        return await self.rest.patch(self.path, data, *args, **kwargs)
+
+    async def put(self, data, *args, **kwargs):
+        return await self.rest.put(self.path, data, *args, **kwargs)
+
+    async def delete(self, *args, **kwargs):
+        return await self.rest.delete(self.path, *args, **kwargs)
+
+    async def unprotected_delete(self, *args, **kwargs):
+        return await self.rest.unprotected_delete(self.path, *args, **kwargs)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.collection}, {self.key})"
+
+
+class AsyncRestItemList:
+    """List of catalogue entries from REST API, asynchronous version of `RestItemList`."""
+
+    def __init__(self, collection, rest=None):
+        self.collection = collection
+        self.rest = rest or AsyncRest()
+        self.path = collection
+
+    async def get(self, *args, **kwargs):
+        return await self.rest.get(self.path, *args, **kwargs)
+
+    async def post(self, data, **kwargs):
+        return await self.rest.post(self.path, data, errors={409: AlreadyExists}, **kwargs)
+
+    def item(self, key):
+        return AsyncRestItem(self.collection, key, rest=self.rest)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.collection})"
+
+
+def run(coroutine):
+    """Run a coroutine from synchronous code."""
+    return asyncio.run(coroutine)
@@ -7,17 +7,60 @@
 # granted to it by virtue of its status as an intergovernmental organisation
 # nor does it submit to any jurisdiction.
 
+import importlib
 import os
+from collections.abc import Mapping
 
 from anemoi.utils.cli import Command
 from anemoi.utils.cli import Failed
-from anemoi.utils.cli import register_commands
 
 __all__ = ["Command"]
 
-COMMANDS = register_commands(
-    os.path.dirname(__file__),
-    __name__,
-    lambda x: x.command() if hasattr(x, "command") else None,
-    lambda name, error: Failed(name, error),
-)
+
+class LazyCommands(Mapping):
+    """The commands of the CLI, one per module of this package. A module is only imported
+    when its command is looked up, see `selected`.
+    """
+
+    def __init__(self, here, package):
+        self.package = package
+        self.names = sorted(
+            os.path.splitext(p)[0] for p in os.listdir(here) if p.endswith(".py") and not p.startswith("_")
+        )
+        self._commands = {}
+
+    def _load(self, name):
+        if name not in self._commands:
+            try:
+                module = importlib.import_module(f".{name}", package=self.package)
+                self._commands[name] = module.command() if hasattr(module, "command") else None
+            except ImportError as e:
+                self._commands[name] = Failed(name, e)
+        return self._commands[name]
+
+    def __getitem__(self, name):
+        if name not in self.names or self._load(name) is None:
+            raise KeyError(name)
+        return self._commands[name]
+
+    def __iter__(self):
+        # Modules without a command (e.g. base) are skipped
+        return (name for name in self.names if self._load(name) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def selected(self, argv):
+        """The command given in `argv` only, so that the other ones are not imported. All the
+        commands if there is none, e.g. for --help.
+        """
+        for arg in argv:
+            if arg.startswith("-"):
+                continue
+            if arg in self.names and self._load(arg) is not None:
+                return {arg: self[arg]}
+            break
+        return self
+
+
+COMMANDS = LazyCommands(os.path.dirname(__file__), __name__)
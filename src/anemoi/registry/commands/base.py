@@ -17,7 +17,6 @@ import os
 import yaml
 
 from ..entry import VALUES_PARSERS
-from ..entry import CatalogueEntryNotFound
 from . import Command
 
 LOG = logging.getLogger(__name__)
@@ -27,15 +26,14 @@ class BaseCommand(Command):
     internal = True
     timestamp = True
 
+    # Options that only write to the entry, without reading its record, see `get_entry`
+    write_only_options = ()
+
     def is_path(self, name_or_path):
         return os.path.exists(name_or_path)
 
     def is_identifier(self, name_or_path):
-        try:
-            self.entry_class(key=name_or_path)
-            return True
-        except CatalogueEntryNotFound:
-            return False
+        return self.entry_class.key_exists(name_or_path)
 
     def process_task(self, entry, args, k, func_name=None, /, _skip_if_not_found=False, **kwargs):
         """Call the method `k` on the entry object.
@@ -82,7 +80,18 @@ class BaseCommand(Command):
         entry = self.get_entry(args)
         self._run(entry, args)
 
+    def only_writes(self, args):
+        if not self.write_only_options or self.is_path(args.NAME_OR_PATH):
+            return False
+        ignored = ("command", "debug", "version", "rich", "NAME_OR_PATH")
+        used = [k for k, v in vars(args).items() if k not in ignored and v not in (None, False, [])]
+        return bool(used) and all(k in self.write_only_options for k in used)
+
     def get_entry(self, args, must_exist=False):
+        if self.only_writes(args):
+            # Only the update counter is needed (see `increment_update`), the rest is fetched if needed
+            return self.entry_class(key=args.NAME_OR_PATH, fields=["metadata.updated"])
+
         return self.entry_class.load_from_anything(
             key=args.NAME_OR_PATH,
             path=args.NAME_OR_PATH if self.is_path(args.NAME_OR_PATH) else None,
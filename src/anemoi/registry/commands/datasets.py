@@ -25,6 +25,16 @@ class Datasets(BaseCommand):
     timestamp = True
     entry_class = DatasetCatalogueEntry
     kind = "dataset"
+    write_only_options = (
+        "unregister",
+        "set_status",
+        "set_recipe",
+        "set_metadata",
+        "remove_metadata",
+        "add_location",
+        "uri_pattern",
+        "remove_location",
+    )
 
     def add_arguments(self, command_parser):
         command_parser.add_argument("NAME_OR_PATH", help="The name or the path of a dataset.")
@@ -16,6 +16,7 @@ from tempfile import TemporaryDirectory
 
 import jsonpatch
 import yaml
+from requests.exceptions import HTTPError
 
 from anemoi.registry.rest import Rest
 
@@ -173,9 +174,15 @@ class Entry(Command):
         else:
             raise ValueError(f"Unknown file extension {ext}. Please specify --json or --yaml")
 
-        if rest.exists(args.path):
-            # if the entry exists, we patch it.
+        try:
             metadata = rest.get(args.path)
+        except HTTPError as e:
+            if e.response.status_code != 404:
+                raise
+            metadata = None
+
+        if metadata is not None:
+            # if the entry exists, we patch it.
             patch = jsonpatch.make_patch(metadata, edited)
             patch = list(patch)
             LOG.debug(f"Applying patch to {args.path}: {patch}")
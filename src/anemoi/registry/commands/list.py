@@ -9,6 +9,7 @@
 
 
 import datetime
+import json
 import logging
 
 from anemoi.utils.humanize import json_pretty_dump
@@ -17,11 +18,27 @@ from anemoi.utils.text import table
 
 from anemoi.registry.rest import RestItemList
 from anemoi.registry.utils import list_to_dict
+from anemoi.registry.utils import lookup
+from anemoi.registry.utils import parse_fields
 
 from . import Command
 
 LOG = logging.getLogger(__name__)
 
+WHERE_HELP = (
+    'Only show the {} matching the query, e.g. "resolution=o96 and start_date<1990 and .locations.leonardo exists". '
+    "Operators: = != < <= > >= ~ (glob), in (a, b), in lo..hi, not in, exists, and, or, not. "
+    "Paths are in the metadata, unless they start with '.' or '/'. Can be repeated, all must match."
+)
+
+
+def _format(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
 
 class List(Command):
     """List elements in the catalogue."""
@@ -40,12 +57,20 @@ class List(Command):
             "filter", nargs="*", help="Filter experiments with a list of key=value.", metavar="key=value"
         )
         experiment.add_argument("--json", help="Output as JSON", action="store_true")
+        experiment.add_argument(
+            "--fields", help="Comma separated list of fields to fetch and show, e.g. name,status,locations"
+        )
+        experiment.add_argument("--where", help=WHERE_HELP.format("experiments"), action="append", metavar="QUERY")
 
         checkpoint = sub_parser.add_parser("weights", help="List weights in the catalogue.")
         checkpoint.add_argument(
             "filter", nargs="*", help="Filter weights with a list of key=value.", metavar="key=value"
         )
         checkpoint.add_argument("--json", help="Output as JSON", action="store_true")
+        checkpoint.add_argument(
+            "--fields", help="Comma separated list of fields to fetch and show, e.g. name,status,locations"
+        )
+        checkpoint.add_argument("--where", help=WHERE_HELP.format("weights"), action="append", metavar="QUERY")
 
         training = sub_parser.add_parser(
             "trainings",
@@ -55,10 +80,18 @@ class List(Command):
             "filter", nargs="*", help="Filter trainings with a list of key=value.", metavar="key=value"
         )
         training.add_argument("--json", help="Output as JSON", action="store_true")
+        training.add_argument(
+            "--fields", help="Comma separated list of fields to fetch and show, e.g. name,status,locations"
+        )
+        training.add_argument("--where", help=WHERE_HELP.format("trainings"), action="append", metavar="QUERY")
 
         dataset = sub_parser.add_parser("datasets", help="List datasets in the catalogue.")
         dataset.add_argument("filter", nargs="*", help="Filter datasets with a list of key=value.", metavar="key=value")
         dataset.add_argument("--json", help="Output as JSON", action="store_true")
+        dataset.add_argument(
+            "--fields", help="Comma separated list of fields to fetch and show, e.g. name,status,locations"
+        )
+        dataset.add_argument("--where", help=WHERE_HELP.format("datasets"), action="append", metavar="QUERY")
 
     #        tasks = sub_parser.add_parser("tasks")
     #        tasks.add_argument("filter", nargs="*")
@@ -72,44 +105,37 @@ class List(Command):
         getattr(self, f"run_{args.subcommand}", self._run_default)(args)
 
     def _run_default(self, args):
-        collection = args.subcommand
-        request = list_to_dict(args.filter)
-        payload = RestItemList(collection).get(params=request)
-        if args.json:
-            print(json_pretty_dump(payload))
-        else:
-            for v in payload:
-                print(v["name"])
+        self._print_list(args, "name")
 
     def run_datasets(self, args):
-        collection = args.subcommand
-        request = list_to_dict(args.filter)
-        payload = RestItemList(collection).get(params=request)
-        if args.json:
-            print(json_pretty_dump(payload))
-        else:
-            for v in payload:
-                print(v["name"])
+        self._print_list(args, "name")
 
     def run_weights(self, args):
-        collection = args.subcommand
-        request = list_to_dict(args.filter)
-        payload = RestItemList(collection).get(params=request)
-        if args.json:
-            print(json_pretty_dump(payload))
-        else:
-            for v in payload:
-                print(v["uuid"])
+        self._print_list(args, "uuid")
 
     def run_experiments(self, args):
+        self._print_list(args, "expver")
+
+    def _print_list(self, args, key):
         collection = args.subcommand
         request = list_to_dict(args.filter)
-        payload = RestItemList(collection).get(params=request)
+        fields = parse_fields(args.fields)
+
+        if fields and key not in fields:
+            fields = [key] + fields
+        if not fields and not args.json:
+            # Only the key is printed, no need to download the full records
+            fields = [key]
+
+        payload = RestItemList(collection, where=args.where).get(params=request, fields=fields)
         if args.json:
             print(json_pretty_dump(payload))
+        elif args.fields:
+            rows = [[_format(lookup(v, f)) for f in fields] for v in payload]
+            print(table(rows, fields, "<" * len(fields)))
         else:
             for v in payload:
-                print(v["expver"])
+                print(v[key])
 
     def run_tasks(self, args):
         collection = "tasks"
@@ -0,0 +1,77 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+
+import datetime
+import logging
+import time
+
+from anemoi.registry import config
+
+from . import Command
+
+LOG = logging.getLogger(__name__)
+
+
+class MirrorCommand(Command):
+    """Keep a local copy of the catalogue, used in offline mode."""
+
+    internal = True
+    timestamp = True
+
+    def add_arguments(self, command_parser):
+        sub_parser = command_parser.add_subparsers(dest="subcommand")
+
+        sync = sub_parser.add_parser("sync", help="Download the records changed since the previous sync.")
+        sync.add_argument(
+            "collections", nargs="*", help="Collections to sync (datasets, experiments, weights, trainings)."
+        )
+        sync.add_argument("--full", help="Download all the records again.", action="store_true")
+        sync.add_argument("--max-concurrency", help="Maximum number of requests in flight.", type=int)
+
+        sub_parser.add_parser("status", help="Show the number of records and the time of the last sync.")
+        sub_parser.add_parser("clear", help="Forget all the records.")
+
+    def run(self, args):
+        from anemoi.registry.mirror import Mirror
+
+        if not args.subcommand:
+            raise ValueError("Missing subcommand")
+
+        mirror = Mirror.from_config(config().get("mirror"))
+        getattr(self, f"run_{args.subcommand}")(mirror, args)
+
+    def run_sync(self, mirror, args):
+        from anemoi.registry.mirror import COLLECTIONS
+
+        for collection in args.collections:
+            if collection not in COLLECTIONS:
+                raise ValueError(f"Cannot mirror {collection}, expected one of {', '.join(COLLECTIONS)}")
+
+        start = time.time()
+        results = mirror.sync(args.collections, full=args.full, max_concurrency=args.max_concurrency)
+        for collection, counts in results.items():
+            print(f"{collection}: " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+        LOG.info(f"Mirror {mirror.path} synced in {time.time() - start:.1f}s.")
+
+    def run_status(self, mirror, args):
+        from anemoi.utils.humanize import when
+        from anemoi.utils.text import table
+
+        rows = []
+        for collection, (count, url, synced) in mirror.status().items():
+            synced = when(datetime.datetime.fromtimestamp(synced)) if synced else "never"
+            rows.append([collection, count, synced, url or ""])
+        print(table(rows, ["Collection", "Records", "Synced", "From"], ["<", ">", "<", "<"]))
+
+    def run_clear(self, mirror, args):
+        mirror.clear()
+
+
+command = MirrorCommand
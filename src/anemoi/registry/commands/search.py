@@ -0,0 +1,73 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+
+import logging
+
+from anemoi.registry import config
+
+from . import Command
+
+LOG = logging.getLogger(__name__)
+
+
+class Search(Command):
+    """Search the catalogue by names, metadata, recipes and variables, in the local mirror."""
+
+    internal = True
+    timestamp = True
+
+    def add_arguments(self, command_parser):
+        command_parser.add_argument(
+            "words",
+            nargs="+",
+            help=(
+                "Words to search for, all must be found. 'word*' matches the words starting with 'word', "
+                "'variables:2t' only looks for 2t in the variables (also name, recipe and text). "
+                "OR and NOT are supported."
+            ),
+        )
+        command_parser.add_argument(
+            "--collection",
+            help="Only search this collection (datasets, experiments, weights, trainings). Can be repeated.",
+            action="append",
+        )
+        command_parser.add_argument("--limit", help="Maximum number of results.", type=int, default=20)
+        command_parser.add_argument(
+            "--sync", help="Download the records changed in the catalogue first.", action="store_true"
+        )
+
+    def run(self, args):
+        from anemoi.utils.text import table
+
+        from anemoi.registry.mirror import Mirror
+
+        mirror = Mirror.from_config(config().get("mirror"))
+        # Before downloading anything
+        mirror.check_searchable()
+        status = mirror.status()
+        collections = args.collection or None
+        for collection in collections or []:
+            if collection not in status:
+                raise ValueError(f"Cannot search {collection}, expected one of {', '.join(status)}")
+
+        # Built on first use
+        never_synced = any(status[c][2] is None for c in collections or status)
+        if args.sync or never_synced:
+            LOG.info(f"Updating the mirror of the catalogue in {mirror.path}.")
+            mirror.sync(collections)
+
+        results = mirror.search(" ".join(args.words), collections=collections, limit=args.limit)
+        if not results:
+            print("No match.")
+            return
+        print(table([list(r) for r in results], ["Collection", "Key", "Match"], ["<", "<", "<"]))
+
+
+command = Search
@@ -14,11 +14,12 @@ import logging
 import yaml
 
 from anemoi.registry import config
+from anemoi.registry.commands import Command
 
 LOG = logging.getLogger(__name__)
 
 
-class Settings:
+class Settings(Command):
     """Show current settings and quit. For debug purposes only."""
 
     internal = True
@@ -30,10 +31,18 @@ class Settings:
 
     def add_arguments(self, command_parser):
         command_parser.add_argument("--show-secrets", help="Show the token in the output", action="store_true")
+        command_parser.add_argument(
+            "--refresh", help="Fetch the settings from the server, instead of the cached ones", action="store_true"
+        )
 
     def run(self, args):
         from anemoi.utils.config import DotDict
 
+        from anemoi.registry.configuration import CONF
+
+        if args.refresh and CONF.settings_cache is not None:
+            CONF.settings_cache.clear()
+
         d = config(with_secrets=args.show_secrets)
 
         def convert_dict(d):
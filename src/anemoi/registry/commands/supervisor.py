@@ -0,0 +1,36 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+
+import logging
+
+from anemoi.registry.commands.base import BaseCommand
+
+LOG = logging.getLogger(__name__)
+
+
+class SupervisorCommand(BaseCommand):
+    """Run the pools of workers of the config, as many workers as their queues need."""
+
+    internal = True
+    timestamp = True
+
+    def add_arguments(self, command_parser):
+        command_parser.add_argument("--interval", help="Check the queues every INTERVAL seconds.", type=int)
+        command_parser.add_argument(
+            "--idle", help="Retire the workers of a pool once its queue is empty for IDLE seconds.", type=int
+        )
+
+    def run(self, args):
+        from anemoi.registry.workers.supervisor import Supervisor
+
+        Supervisor.from_config(interval=args.interval, idle=args.idle).run()
+
+
+command = SupervisorCommand
@@ -9,9 +9,9 @@
 
 
 import logging
+import time
 
 from anemoi.registry.commands.base import BaseCommand
-from anemoi.registry.entry import CatalogueEntryNotFound
 from anemoi.registry.tasks import TaskCatalogueEntry
 from anemoi.registry.tasks import TaskCatalogueEntryList
 from anemoi.registry.utils import list_to_dict
@@ -73,7 +73,8 @@ class Tasks(BaseCommand):
     def run_with_uuid(self, uuid, args):
 
         uuid = args.TASK
-        entry = self.entry_class(key=uuid)
+        # None of the actions below need to read the task
+        entry = self.entry_class(key=uuid, lazy=True)
 
         self.process_task(entry, args, "disown", "release_ownership")
         self.process_task(entry, args, "own", "take_ownership")
@@ -92,23 +93,31 @@ class Tasks(BaseCommand):
 
     def run_delete_many(self, args):
         cat = TaskCatalogueEntryList(*args.delete_many, sort=args.sort)
-        if not cat:
+        # Take a snapshot of the matching tasks, the list is not requested again
+        uuids = cat.keys()
+        if not uuids:
             LOG.info("No tasks found")
             return
         if not args.yes:
-            print(f"Do you really want to delete these {len(cat)} entries? (y/n)", end=" ")
+            print(f"Do you really want to delete these {len(uuids)} entries? (y/n)", end=" ")
             if input("").lower() != "y":
                 return
-        count = 0
-        while cat:
-            try:
-                entry = cat[0]
-                entry.unregister()
-                count += 1
-                LOG.info(f"Task {entry.key} deleted.")
-            except CatalogueEntryNotFound:
-                LOG.warning(f"Task {entry.key} not found.")
-        LOG.info(f"{count} tasks deleted.")
+
+        start = time.time()
+        step = max(1, len(uuids) // 20)
+        reported = 0
+
+        def progress(done, total):
+            nonlocal reported
+            if done - reported >= step or done == total:
+                reported = done
+                LOG.info(f"{done}/{total} tasks processed ({done / (time.time() - start):.0f}/s)")
+
+        counts = cat.delete_many(uuids, progress=progress)
+        LOG.info(
+            f"{counts['deleted']} tasks deleted, {counts['missing']} not found, {counts['failed']} failed"
+            f" in {time.time() - start:.1f}s."
+        )
 
     def run_take_one(self, args):
         cat = TaskCatalogueEntryList(*args.take_one, status="queued", sort=args.sort)
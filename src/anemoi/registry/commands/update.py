@@ -8,6 +8,7 @@
 # nor does it submit to any jurisdiction.
 
 
+import copy
 import glob
 import json
 import logging
@@ -131,13 +132,6 @@ def catalogue_from_recipe_file(path, *, workdir, dry_run, force, update, ignore,
 
     LOG.info(f"Updating catalogue entry from recipe: {path} {dry_run=} {force=} {update=}")
 
-    def entry_set_value(path, value, **kwargs):
-        if dry_run:
-            LOG.info(f"Would set value {path} to {_shorten(value)}")
-        else:
-            LOG.info(f"Setting value {path} to {_shorten(value)}")
-            entry.set_value(path, value, **kwargs)
-
     with open(path) as f:
         recipe = yaml.safe_load(f)
 
@@ -159,118 +153,125 @@ def catalogue_from_recipe_file(path, *, workdir, dry_run, force, update, ignore,
             return
         raise
 
-    updated = entry.record["metadata"].get("updated", 0)
-    constants = None
-
-    if "recipe" in entry.record["_original"]["metadata"]:
+    # All the changes are sent in a single PATCH when leaving the block, and
+    # only if nothing else updated the entry in the meantime
+    with entry.edit(increment_update=True, guard=True) as record:
+        metadata = record["metadata"]
 
-        if not update and not force:
-            LOG.info("%s: `recipe` already in original. Use --force and --update to update", name)
-            return
-
-        # Remove stuff added by prepml
-        for k in [
-            "build_dataset",
-            "config_format_version",
-            "config_path",
-            "dataset_status",
-            "ecflow",
-            "metadata",
-            "platform",
-            "reading_chunks",
-            "upload",
-        ]:
-            recipe.pop(k, None)
-
-        if "recipe" not in entry.record["metadata"] or force:
-            LOG.info("%s, setting `recipe` 🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥", name)
+        def entry_set_value(key, value):
             if dry_run:
-                LOG.info("Would set recipe %s", name)
+                LOG.info(f"Would set value /metadata/{key} to {_shorten(value)}")
             else:
-                LOG.info("Setting recipe %s", name)
-                recipe["name"] = name
-                entry_set_value("/metadata/recipe", recipe)
-                entry_set_value("/metadata/updated", updated + 1)
-
-        computed_constant_fields = sorted(open_dataset(name).computed_constant_fields())
-        constant_fields = entry.record["metadata"].get("constant_fields", [])
-        if computed_constant_fields != constant_fields:
-            LOG.info("%s, setting `constant_fields`", name)
-            if dry_run:
-                LOG.info("Would set constant_fields %s", name)
+                LOG.info(f"Setting value /metadata/{key} to {_shorten(value)}")
+                metadata[key] = value
+
+        constants = None
+
+        if "recipe" in record["_original"]["metadata"]:
+
+            if not update and not force:
+                LOG.info("%s: `recipe` already in original. Use --force and --update to update", name)
+                return
+
+            # Remove stuff added by prepml
+            for k in [
+                "build_dataset",
+                "config_format_version",
+                "config_path",
+                "dataset_status",
+                "ecflow",
+                "metadata",
+                "platform",
+                "reading_chunks",
+                "upload",
+            ]:
+                recipe.pop(k, None)
+
+            if "recipe" not in metadata or force:
+                LOG.info("%s, setting `recipe` 🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥", name)
+                if dry_run:
+                    LOG.info("Would set recipe %s", name)
+                else:
+                    LOG.info("Setting recipe %s", name)
+                    recipe["name"] = name
+                    entry_set_value("recipe", recipe)
+
+            computed_constant_fields = sorted(open_dataset(name).computed_constant_fields())
+            constant_fields = metadata.get("constant_fields", [])
+            if computed_constant_fields != constant_fields:
+                LOG.info("%s, setting `constant_fields`", name)
+                if dry_run:
+                    LOG.info("Would set constant_fields %s", name)
+                else:
+                    LOG.info("Setting constant_fields %s", name)
+                    entry_set_value("constant_fields", computed_constant_fields)
+
+            if "constant_fields" in metadata and "variables_metadata" in metadata:
+                LOG.info("%s, checking `variables_metadata` and `constant_fields`", name)
+                constants = metadata["constant_fields"]
+                # A copy, so that a dry run leaves the record unchanged
+                new_value = copy.deepcopy(metadata["variables_metadata"])
+
+            changed = False
+            for k, v in new_value.items():
+
+                if k in constants and v.get("constant_in_time") is not True:
+                    v["constant_in_time"] = True
+                    changed = True
+                    LOG.info(f"Setting {k} constant_in_time to True")
+
+                if "is_constant_in_time" in v:
+                    del v["is_constant_in_time"]
+                    changed = True
+
+            if changed:
+                if debug:
+                    with open(f"{name}.variables_metadata.json", "w") as f:
+                        print(json.dumps(new_value, indent=2), file=f)
+                entry_set_value("variables_metadata", new_value)
             else:
-                LOG.info("Setting constant_fields %s", name)
-                entry_set_value("/metadata/constant_fields", computed_constant_fields)
-                entry_set_value("/metadata/updated", updated + 1)
-                entry.record["metadata"]["constant_fields"] = computed_constant_fields
-
-        if "constant_fields" in entry.record["metadata"] and "variables_metadata" in entry.record["metadata"]:
-            LOG.info("%s, checking `variables_metadata` and `constant_fields`", name)
-            constants = entry.record["metadata"]["constant_fields"]
-            new_value = entry.record["metadata"]["variables_metadata"]
-
-        changed = False
-        for k, v in new_value.items():
-
-            if k in constants and v.get("constant_in_time") is not True:
-                v["constant_in_time"] = True
-                changed = True
-                LOG.info(f"Setting {k} constant_in_time to True")
-
-            if "is_constant_in_time" in v:
-                del v["is_constant_in_time"]
-                changed = True
-
-        if changed:
-            if debug:
-                with open(f"{name}.variables_metadata.json", "w") as f:
-                    print(json.dumps(new_value, indent=2), file=f)
-            entry_set_value("/metadata/variables_metadata", new_value)
-            entry_set_value("/metadata/updated", updated + 1)
-        else:
-            LOG.info("No changes required")
-
-    for new_key in ("variables_metadata", "origins"):
-        LOG.info("Checking %s for %s", name, new_key)
-        if new_key not in entry.record["metadata"] or force or update == "all" or update == new_key:
-            from anemoi.datasets.create.tasks import run_task
-
-            LOG.info("%s, setting `%s`  🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥", name, new_key)
-
-            dir = os.path.join(workdir, f"anemoi-registry-commands-update-{time.time()}")
-            os.makedirs(dir)
+                LOG.info("No changes required")
 
-            try:
-                tmp = os.path.join(dir, "tmp.zarr")
+        for new_key in ("variables_metadata", "origins"):
+            LOG.info("Checking %s for %s", name, new_key)
+            if new_key not in metadata or force or update == "all" or update == new_key:
+                from anemoi.datasets.create.tasks import run_task
 
-                run_task("init", recipe=path, path=tmp, overwrite=True)
+                LOG.info("%s, setting `%s`  🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥🔥", name, new_key)
 
-                with open(f"{tmp}/.zattrs") as f:
-                    attrs = yaml.safe_load(f)
+                dir = os.path.join(workdir, f"anemoi-registry-commands-update-{time.time()}")
+                os.makedirs(dir)
 
-                new_value = attrs.get(new_key)
-                if new_value is None:
-                    LOG.warning("%s does not have a %s attribute", tmp, new_key)
-                    continue
+                try:
+                    tmp = os.path.join(dir, "tmp.zarr")
 
-                LOG.info("Setting %s %s", new_key, name)
+                    run_task("init", recipe=path, path=tmp, overwrite=True)
 
-                # Make sure we did not lose any information, and if we did, log it and add it back in the new value
-                if new_key == "variables_metadata" and constants is not None:
-                    for k, v in new_value.items():
-                        if k in constants and v.get("constant_in_time") is not True:
-                            v["constant_in_time"] = True
-                            LOG.info(f"Setting {k} constant_in_time to True")
+                    with open(f"{tmp}/.zattrs") as f:
+                        attrs = yaml.safe_load(f)
 
-                if debug:
-                    with open(f"{name}.{new_key}.json", "w") as f:
-                        print(json.dumps(new_value, indent=2), file=f)
+                    new_value = attrs.get(new_key)
+                    if new_value is None:
+                        LOG.warning("%s does not have a %s attribute", tmp, new_key)
+                        continue
+
+                    LOG.info("Setting %s %s", new_key, name)
+
+                    # Make sure we did not lose any information, and if we did, log it and add it back in the new value
+                    if new_key == "variables_metadata" and constants is not None:
+                        for k, v in new_value.items():
+                            if k in constants and v.get("constant_in_time") is not True:
+                                v["constant_in_time"] = True
+                                LOG.info(f"Setting {k} constant_in_time to True")
+
+                    if debug:
+                        with open(f"{name}.{new_key}.json", "w") as f:
+                            print(json.dumps(new_value, indent=2), file=f)
 
-                entry_set_value(f"/metadata/{new_key}", new_value)
-                entry_set_value("/metadata/updated", updated + 1)
+                    entry_set_value(new_key, new_value)
 
-            finally:
-                shutil.rmtree(dir)
+                finally:
+                    shutil.rmtree(dir)
 
 
 def zarr_file_from_catalogue(path, *, dry_run, ignore, _error=print):
@@ -48,17 +48,53 @@ class WorkerCommand(BaseCommand):
         dummy = subparsers.add_parser("dummy", help="Dummy worker for test purposes")
         dummy.add_argument("--arg")
 
-        for subparser in [transfer, delete, dummy]:
-            subparser.add_argument("--timeout", help="Die with timeout (SIGALARM) after TIMEOUT seconds.", type=int)
-            subparser.add_argument("--timeout-exit-code", help="Exit code when timeout is reached")
+        reaper = subparsers.add_parser(
+            "reaper", help="Requeue the running tasks without heartbeat for more than MAX_NO_HEARTBEAT seconds"
+        )
+        reaper.add_argument("--filter-tasks", help="Filter tasks to check (key=value list)", nargs="*", default=[])
+
+        for subparser in [transfer, delete, dummy, reaper]:
+            subparser.add_argument(
+                "--timeout",
+                help="After TIMEOUT seconds, release the tasks in progress and exit (SIGALRM).",
+                type=int,
+            )
+            subparser.add_argument("--timeout-exit-code", help="Exit code when timeout is reached", type=int)
+            subparser.add_argument(
+                "--timeout-grace",
+                help="Kill the process group if the tasks are not released TIMEOUT_GRACE seconds after the timeout.",
+                type=int,
+            )
             subparser.add_argument("--wait", help="Check for new task every WAIT seconds.", type=int)
+            subparser.add_argument(
+                "--max-wait", help="When idle, back off up to MAX_WAIT seconds between checks.", type=int
+            )
+            subparser.add_argument(
+                "--long-poll",
+                help="Wait for the queue to change instead of sleeping, if the catalogue supports it.",
+                action="store_true",
+                default=None,
+            )
             subparser.add_argument("--heartbeat", help="Heartbeat interval", type=int)
             subparser.add_argument(
                 "--max-no-heartbeat",
                 help="Max interval without heartbeat before considering task needs to be freed.",
                 type=int,
             )
+            subparser.add_argument(
+                "--no-reap",
+                help="Do not look for running tasks without heartbeat, when a reaper does it.",
+                action="store_false",
+                dest="reap",
+                default=None,
+            )
+            subparser.add_argument("--metrics-port", help="Serve metrics on this port, at /metrics.", type=int)
+            subparser.add_argument(
+                "--metrics-address", help="Serve metrics on this address (default: 127.0.0.1, localhost only)."
+            )
+            subparser.add_argument("--metrics-textfile", help="Write metrics to this file, for node-exporter.")
             subparser.add_argument("--loop", help="Run in a loop", action="store_true")
+            subparser.add_argument("--slots", help="Number of tasks processed in parallel.", type=int)
             subparser.add_argument(
                 "--check-todo",
                 help="See if there are tasks for this worker and exit with 0 if there are task to do.",
@@ -7,11 +7,12 @@
 # granted to it by virtue of its status as an intergovernmental organisation
 # nor does it submit to any jurisdiction.
 
-# ruff: noqa: E402
-
 import importlib
+import json
 import logging
 import os
+import threading
+import time
 from functools import cached_property
 
 from anemoi.utils.config import DotDict
@@ -22,6 +23,11 @@ from anemoi.registry.rest import Rest
 
 LOG = logging.getLogger(__name__)
 
+# Keys of the user config that are used as-is
+CLIENT_SIDE_KEYS = ["http_cache", "settings_cache", "mirror"]
+
+DEFAULT_SETTINGS_CACHE = "~/.cache/anemoi/registry/settings.json"
+
 
 # TODO : move this function to anemoi.utils.config
 def package_config(module_name, missing_ok=False):
@@ -37,6 +43,50 @@ def package_config(module_name, missing_ok=False):
     return DotDict(load_any_dict_format(path))
 
 
+class SettingsCache:
+    """Settings of the catalogue servers, kept on disk by URL with the time they were fetched."""
+
+    def __init__(self, path=DEFAULT_SETTINGS_CACHE, ttl=3600):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            LOG.warning(f"Ignoring settings cache {self.path}: {e}")
+            return {}
+
+    def load(self, url):
+        """Return the settings of `url` and their age in seconds, or (None, None)."""
+        entry = self._read().get(url)
+        if entry is None:
+            return None, None
+        return entry["settings"], time.time() - entry["fetched"]
+
+    def store(self, url, settings):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            cached = self._read()
+            cached[url] = dict(fetched=time.time(), settings=settings)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+                json.dump(cached, f)
+            # Atomic, readers see the old or the new file
+            os.replace(tmp, self.path)
+        except OSError as e:
+            LOG.warning(f"Cannot write settings cache {self.path}: {e}")
+
+    def clear(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
 class SingletonConfig:
     def __init__(self):
         self._cache = None
@@ -68,7 +118,7 @@ class SingletonConfig:
             LOG.warning("Using catalogue token from environment variable ANEMOI_CATALOGUE_TOKEN.")
             token = os.environ["ANEMOI_CATALOGUE_TOKEN"]
         else:
-            token = load_config(secrets=["api_token"]).get("registry", {}).get("api_token")
+            token = self.user_config.get("api_token")
 
         if token is None:
             raise ValueError(
@@ -76,14 +126,64 @@ class SingletonConfig:
             )
         return token
 
+    @cached_property
+    def user_config(self):
+        """The `registry` section of the user config, read once per process."""
+        return load_config(secrets=["api_token"]).get("registry", {})
+
     def _url_from_user_config(self):
-        return load_config(secrets=["api_token"]).get("registry", {}).get("catalogue")
+        return self.user_config.get("catalogue")
+
+    @cached_property
+    def settings_cache(self):
+        conf = {
+            **self.package_config["registry"].get("settings_cache", {}),
+            **self.user_config.get("settings_cache", {}),
+        }
+        if not conf.get("enabled", True):
+            return None
+        return SettingsCache(path=conf.get("path") or DEFAULT_SETTINGS_CACHE, ttl=conf.get("ttl", 3600))
+
+    @cached_property
+    def offline(self):
+        from anemoi.registry.mirror import is_offline
+
+        return is_offline(self.user_config.get("mirror"))
+
+    def _fetch_settings(self, robust=True):
+        return Rest(token=self._token, api_url=self.url).get_url(self.url + "/settings", robust=robust)
 
     def _config_from_server(self):
         if not self.url:
             return {}
 
-        return Rest(token=self._token).get_url(self.url + "/settings")
+        cache = self.settings_cache
+        if cache is None:
+            return self._fetch_settings()
+
+        settings, age = cache.load(self.url)
+        if settings is None:
+            settings = self._fetch_settings()
+            cache.store(self.url, settings)
+        elif age > cache.ttl and not self.offline:
+            from requests.exceptions import ConnectionError
+            from requests.exceptions import HTTPError
+            from requests.exceptions import Timeout
+
+            try:
+                fresh = self._fetch_settings(robust=False)
+            except HTTPError as e:
+                status = e.response.status_code
+                if status < 500 and status != 429:
+                    raise
+                LOG.warning(f"Cannot refresh the settings of {self.url}, using the cached ones: {e}")
+            except (ConnectionError, Timeout) as e:
+                # The expired ones are better than nothing when the catalogue cannot be reached
+                LOG.warning(f"Cannot refresh the settings of {self.url}, using the cached ones: {e}")
+            else:
+                cache.store(self.url, fresh)
+                settings = fresh
+        return settings
 
     def __call__(self, with_secrets=True):
         if self._cache:
@@ -107,11 +207,16 @@ class SingletonConfig:
                 conf[k].update(v)
 
         # partly overwritten by config from user
-        user_config = load_config(secrets=["api_token"])["registry"]
-        for k, v in user_config.items():
+        for k, v in self.user_config.items():
             if k in ["api_token"]:  # use token
                 conf[k] = v
                 continue
+            if k in CLIENT_SIDE_KEYS:  # settings of this client only, not known by the server
+                if isinstance(conf.get(k), dict) and isinstance(v, dict):
+                    conf[k] = {**conf[k], **v}
+                else:
+                    conf[k] = v
+                continue
             if k in ["allow_delete", "allow_edit_entries"]:  # use these flags, to be removed
                 conf[k] = v
                 LOG.warning(
@@ -141,35 +246,10 @@ class SingletonConfig:
 CONF = SingletonConfig()
 
 
-def publish_dataset(*args, **kwargs):
-    return Dataset.publish(*args, **kwargs)
-
-
-from .entry.dataset import DatasetCatalogueEntry as Dataset
-from .entry.dataset import DatasetCatalogueEntryList as DatasetsList
-from .entry.experiment import ExperimentCatalogueEntry as Experiment
-from .entry.experiment import ExperimentCatalogueEntryList as ExperimentsList
-from .entry.weights import WeightCatalogueEntry as Weights
-from .entry.weights import WeightsCatalogueEntryList as WeightsList
-from .tasks import TaskCatalogueEntry as Task
-from .tasks import TaskCatalogueEntryList as TasksList
-
-try:
-    # NOTE: the `_version.py` file must not be present in the git repository
-    #   as it is generated by setuptools at install time
-    from ._version import __version__  # type: ignore
-except ImportError:  # pragma: no cover
-    # Local copy or not installed with setuptools
-    __version__ = "999"
-
-
-__all__ = [
-    "Weights",
-    "WeightsList",
-    "Experiment",
-    "ExperimentsList",
-    "Dataset",
-    "DatasetsList",
-    "Task",
-    "TasksList",
-]
+def __getattr__(name):
+    # The entries used to be available from here too
+    import anemoi.registry
+
+    if name in anemoi.registry._LAZY or name in ("publish_dataset", "__version__"):
+        return getattr(anemoi.registry, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,20 +7,31 @@
 # granted to it by virtue of its status as an intergovernmental organisation
 # nor does it submit to any jurisdiction.
 
+import copy
+import functools
 import json
 import logging
 import os
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
 
+import jsonpatch
 import yaml
 from anemoi.utils.config import load_any_dict_format
 from anemoi.utils.dates import as_datetime
 from anemoi.utils.dates import as_timedelta
 from anemoi.utils.humanize import json_pretty_dump
+from requests.exceptions import HTTPError
 
 from anemoi.registry import config
 from anemoi.registry.rest import AlreadyExists
 from anemoi.registry.rest import RestItem
 from anemoi.registry.rest import RestItemList
+from anemoi.registry.rest import tidy
+from anemoi.registry.utils import parse_fields
+from anemoi.registry.utils import project
 
 # from anemoi.registry.rest import DryRunRest as Rest
 
@@ -58,10 +69,183 @@ class CatalogueEntryNotFound(Exception):
     pass
 
 
+class PatchConflict(HTTPError):
+    """A `test` operation of a JSON patch failed: the record was changed by someone else."""
+
+
+# Contention on catalogue records, see `CatalogueEntry.compare_and_swap`
+CONFLICT_STATS = Counter()
+
+
+class PartialRecord(dict):
+    """A record taken from a list payload.
+
+    If the list was requested with a projection, the full record is fetched, only once,
+    the first time a field left out of the projection is looked up, or when the whole
+    record is needed (iteration, copy, ...). Otherwise the payload is the whole record,
+    and a field that is not in it does not exist.
+    """
+
+    def __init__(self, data, fetch, projected=False, fields=None):
+        """`fields` are the keys of this dict that were requested, None if unknown."""
+        super().__init__(data)
+        self._fetch = fetch
+        self._projected = projected
+        self._fields = None if fields is None else set(fields)
+        self._complete = not projected
+
+    @classmethod
+    def from_projection(cls, data, fields, fetch):
+        """Wrap a record that only has the given fields. Dicts truncated by nested fields
+        (e.g. 'metadata' for 'metadata.updated') are also completed on demand, and the
+        full record is fetched at most once.
+        """
+        fetch = functools.cache(fetch)
+
+        def resolve(path):
+            rec = fetch()
+            for p in path:
+                rec = rec[p]
+            return rec
+
+        def requested(path):
+            # The keys under `path` that are in the projection
+            return [f.split(".")[len(path)] for f in fields if tuple(f.split("."))[: len(path)] == path]
+
+        record = cls(data, fetch, projected=True, fields=requested(()))
+        for field in fields:
+            parent, path = record, ()
+            for p in field.split(".")[:-1]:
+                path += (p,)
+                if ".".join(path) in fields:
+                    # Requested whole
+                    break
+                child = dict.get(parent, p)
+                if not isinstance(child, dict):
+                    break
+                if not isinstance(child, PartialRecord):
+                    child = cls(child, functools.partial(resolve, path), projected=True, fields=requested(path))
+                    dict.__setitem__(parent, p, child)
+                parent = child
+        return record
+
+    def complete(self):
+        if not self._complete:
+            # Only once the update succeeded, so that a failed fetch is tried again
+            self.update(self._fetch())
+            self._complete = True
+            LOG.debug("Fetched full record, fields missing from the list payload")
+        return self
+
+    def _whole(self):
+        if self._projected:
+            self.complete()
+        return self
+
+    def _lookup(self, key):
+        # Only the keys left out of the projection may be missing from the payload
+        if not dict.__contains__(self, key) and (self._fields is None or key not in self._fields):
+            self.complete()
+
+    def __missing__(self, key):
+        self._lookup(key)
+        if not dict.__contains__(self, key):
+            raise KeyError(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self._lookup(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        self._lookup(key)
+        return dict.get(self, key, default)
+
+    def copy(self):
+        return dict(self._whole())
+
+    def __iter__(self):
+        return dict.__iter__(self._whole())
+
+    def __len__(self):
+        return dict.__len__(self._whole())
+
+    def keys(self):
+        return dict.keys(self._whole())
+
+    def values(self):
+        return dict.values(self._whole())
+
+    def items(self):
+        return dict.items(self._whole())
+
+
+def _tests_for(before, patches):
+    """`test` operations checking that the values changed by `patches` are still those of `before`.
+    New keys are guarded by their parent, unless it is the root of the document.
+    """
+    tests = {}
+    for op in patches:
+        for path in (op["path"], op.get("from")):
+            if path is None:
+                continue
+            for p in (path, path.rsplit("/", 1)[0]):
+                if not p or p in tests:
+                    break
+                try:
+                    tests[p] = jsonpatch.JsonPointer(p).resolve(before)
+                    break
+                except jsonpatch.JsonPointerException:
+                    pass
+    return [{"op": "test", "path": p, "value": v} for p, v in tests.items()]
+
+
+class CatalogueEntryList(RestItemList):
+    """Base class for a list of Anemoi catalogue entries."""
+
+    entry_class = None
+
+    def keys(self, records=None):
+        if records is None:
+            records = self.get()
+        return [v[self.entry_class.main_key] for v in records]
+
+    def _fields(self):
+        # The main key is always needed to build the entries
+        if not self.fields:
+            return None
+        return [self.entry_class.main_key] + [f for f in self.fields if f != self.entry_class.main_key]
+
+    def __iter__(self):
+        fields = self._fields()
+        for v in self.get(fields=fields):
+            yield self.entry_class.from_list_payload(v, fields=fields)
+
+    async def __aiter__(self):
+        from anemoi.registry.async_rest import AsyncRest
+        from anemoi.registry.async_rest import AsyncRestItemList
+        from anemoi.registry.query import Query
+
+        fields = self._fields()
+        query = Query.compile(self.where) if self.where else None
+        requested = fields
+        if query is not None and fields is not None:
+            # The fields needed to evaluate the query too, as in `RestItemList._get_where`
+            needed = query.fields()
+            requested = None if needed is None else fields + needed
+        params = None if requested is None else {"_fields": ",".join(requested)}
+        records = await AsyncRestItemList(self.collection, rest=AsyncRest(self.rest)).get(params=params)
+        if query is not None:
+            records = query.filter(records)
+        for v in records:
+            if fields is not None:
+                v = project(v, fields)
+            yield self.entry_class.from_list_payload(v, fields=fields)
+
+
 class CatalogueEntry:
     """Base class for a Anemoi catalogue entry."""
 
-    record = None
     path = None
     key = None
     collection = None
@@ -70,20 +254,38 @@ class CatalogueEntry:
     def url(self):
         return f"{config()['web_url']}/{self.collection}/{self.key}"
 
-    def __init__(self, key, record=None, must_exist=True, params=None, path=None):
+    def __init__(self, key, record=None, must_exist=True, params=None, path=None, lazy=False, fields=None):
+        """Without a record, the record is fetched from the catalogue:
+        - by default, now, raising CatalogueEntryNotFound if the entry does not exist.
+        - with `lazy=True`, the first time it is accessed. Operations that only write, such as
+          `set_status` or `unregister`, then do not download it at all.
+        - with `fields`, only these fields are fetched now (e.g. ["metadata.updated"]), the
+          rest of the record is fetched the first time a missing field is accessed.
+        """
         # Ensure that exactly one of key, path or request is provided
         self.path = path
         self.key = key
+        self._params = params
+        self._record = None
 
-        if not record:
-            entry = self.__class__.load_from_key(key, params=params)
-            if entry is None:
-                raise CatalogueEntryNotFound(f"Could not find any {self.collection} with key={key}")
-            record = entry.record
+        self._rest_item = RestItem(self.collection, self.key)
 
-        self.record = record
+        if record is not None:
+            self._record = record
+        elif fields:
+            self._record = self.__class__.fetch_partial_record(key, fields, params=params)
+        elif not lazy:
+            self._record = self.__class__.fetch_record(key, params=params)
 
-        self._rest_item = RestItem(self.collection, self.key)
+    @property
+    def record(self):
+        if self._record is None:
+            self._record = self.__class__.fetch_record(self.key, params=self._params)
+        return self._record
+
+    @record.setter
+    def record(self, record):
+        self._record = record
 
     @classmethod
     def rest_collection(cls):
@@ -112,6 +314,8 @@ class CatalogueEntry:
         if len(results) == 1:
             key = results[0][cls.main_key]
             LOG.debug(f"Found {len(results)} element on {cls.collection} with request {request_str} : {key}")
+            if params is None:
+                return cls.from_list_payload(results[0])
             return cls.load_from_key(key, params=params)
 
         if len(results) == 0:
@@ -119,12 +323,76 @@ class CatalogueEntry:
 
         assert False, (request_str, results, cls.collection, cls.main_key)
 
+    @classmethod
+    def from_list_payload(cls, record, fields=None):
+        """Build an entry from an element of a list payload, without fetching it again.
+        `fields` is the projection used for the list request, if any.
+        """
+        key = record[cls.main_key]
+        fetch = functools.partial(cls.fetch_record, key)
+        if fields:
+            return cls(key=key, record=PartialRecord.from_projection(record, fields, fetch))
+        return cls(key=key, record=PartialRecord(record, fetch))
+
+    @classmethod
+    def _not_found(cls, key):
+        def not_found(e):
+            return CatalogueEntryNotFound(f"Could not find any {cls.collection} with key={key}")
+
+        return {404: not_found}
+
+    @classmethod
+    def fetch_record(cls, key, params=None):
+        """Fetch the record in a single request, raise CatalogueEntryNotFound if there is none."""
+        return RestItem(cls.collection, key).get(params=params, errors=cls._not_found(key))
+
+    @classmethod
+    def fetch_partial_record(cls, key, fields, params=None):
+        """Fetch only some fields of the record, see `PartialRecord.from_projection`."""
+        fields = parse_fields(fields)
+        projection = dict(params or {}, _fields=",".join(fields))
+        data = RestItem(cls.collection, key).get(params=projection, errors=cls._not_found(key))
+        fetch = functools.partial(cls.fetch_record, key, params=params)
+        return PartialRecord.from_projection(project(data, fields), fields, fetch)
+
     @classmethod
     def load_from_key(cls, key, params=None):
-        _rest_item = RestItem(cls.collection, key)
-        if _rest_item.exists():
-            record = _rest_item.get(params=params)
-            return cls(key=key, record=record, must_exist=True, params=params)
+        try:
+            record = cls.fetch_record(key, params=params)
+        except CatalogueEntryNotFound:
+            return None
+        return cls(key=key, record=record, must_exist=True, params=params)
+
+    @classmethod
+    async def aload_from_key(cls, key, params=None, rest=None):
+        """Asynchronous version of `load_from_key`, `rest` is an optional shared `AsyncRest`."""
+        from anemoi.registry.async_rest import AsyncRestItem
+
+        try:
+            record = await AsyncRestItem(cls.collection, key, rest=rest).get(params=params)
+        except HTTPError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+        return cls(key=key, record=record, must_exist=True, params=params)
+
+    @classmethod
+    async def aload_many(cls, keys, params=None, rest=None):
+        """Load several entries concurrently. Entries that do not exist are returned as None."""
+        import asyncio
+
+        from anemoi.registry.async_rest import AsyncRest
+
+        rest = rest or AsyncRest()
+        return await asyncio.gather(*[cls.aload_from_key(key, params=params, rest=rest) for key in keys])
+
+    @classmethod
+    def load_many(cls, keys, params=None, max_concurrency=None):
+        """Load several entries concurrently, see `aload_many`."""
+        from anemoi.registry.async_rest import AsyncRest
+        from anemoi.registry.async_rest import run
+
+        return run(cls.aload_many(keys, params=params, rest=AsyncRest(max_concurrency=max_concurrency)))
 
     @classmethod
     def load_from_anything(cls, key=None, path=None, kwargs={}, must_exist=True, params=None):
@@ -192,12 +460,105 @@ class CatalogueEntry:
         print(self.as_json())
 
     def patch(self, data, *args, **kwargs):
-        return self._rest_item.patch(data, *args, **kwargs)
+        kwargs.setdefault("errors", {**self._not_found(self.key), 409: self._conflict})
+        result = self._rest_item.patch(data, *args, **kwargs)
+        self._patched(data, result)
+        return result
+
+    @staticmethod
+    def _conflict(e):
+        return PatchConflict(*e.args, request=e.request, response=e.response)
+
+    @contextmanager
+    def edit(self, increment_update=False, guard=False, **kwargs):
+        """Edit a copy of the record, the changes are sent as one PATCH when leaving the block:
+
+            with entry.edit(increment_update=True) as record:
+                record["metadata"]["recipe"] = recipe
+
+        Nothing is sent if the record is unchanged, or if the block raises. The patch is
+        rejected with PatchConflict if, in the meantime, someone else changed:
+        - `metadata.updated`, with `guard=True`.
+        - any of the values replaced by the patch, with `guard="changes"`.
+        """
+        if isinstance(self.record, PartialRecord):
+            self.record.complete()
+
+        before = tidy(self.record)
+        record = copy.deepcopy(before)
+        yield record
+
+        patches = jsonpatch.make_patch(before, tidy(record)).patch
+        if not patches:
+            LOG.debug(f"{self.key}: no changes to send")
+            return
+
+        metadata = before.get("metadata", {})
+        if guard == "changes":
+            patches = _tests_for(before, patches) + patches
+        elif guard and "updated" in metadata:
+            patches = [{"op": "test", "path": "/metadata/updated", "value": metadata["updated"]}] + patches
+        if increment_update:
+            patches.append({"op": "add", "path": "/metadata/updated", "value": metadata.get("updated", 0) + 1})
+
+        LOG.debug(f"jsonpatch: {patches}")
+        self.patch(patches, **kwargs)
+
+    def compare_and_swap(self, mutate, retries=5, backoff=0.2, increment_update=False, robust=False):
+        """Apply `mutate(record)` to a copy of the record and send the changes, guarded by
+        the values they replace. If someone else changed these values in the meantime, only
+        this record is fetched again and `mutate` is applied again, up to `retries` times,
+        with a jittered exponential backoff. `mutate` may be called several times.
+
+        As all PATCH requests, it is not resent on network errors by default: if the first
+        one went through, the next one would conflict and `mutate` would be applied twice.
+        Only pass `robust=True` if applying `mutate` again is harmless.
+
+        Conflicts and retries are counted in `CONFLICT_STATS`.
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.edit(increment_update=increment_update, guard="changes", robust=robust) as record:
+                    mutate(record)
+                return
+            except PatchConflict:
+                CONFLICT_STATS[f"{self.collection}.conflicts"] += 1
+                if attempt == retries:
+                    CONFLICT_STATS[f"{self.collection}.failures"] += 1
+                    raise
+                CONFLICT_STATS[f"{self.collection}.retries"] += 1
+                delay = backoff * 2**attempt * random.uniform(0.5, 1.5)
+                LOG.info(f"{self.key} was changed by someone else, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                # Fetched again on next access
+                self._record = None
+
+    def _patched(self, data, result):
+        """Bring the in-memory record in line with the catalogue after a successful PATCH,
+        so that chained operations do not need to fetch it again.
+        """
+        if self._params is None and isinstance(result, dict) and result.get(self.main_key) == self.key:
+            # The server returned the patched document
+            self._record = result
+            return
+
+        if self._record is None:
+            # Not fetched yet, it will be up to date when it is
+            return
+
+        try:
+            jsonpatch.apply_patch(self._record, tidy(data), in_place=True)
+        except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException) as e:
+            # The local copy was out of date, fetch it again when needed
+            LOG.debug(f"Cannot apply patch to the record of {self.key} ({e}), it will be fetched again")
+            self._record = None
 
     def unregister(self, *args, **kwargs):
+        kwargs.setdefault("errors", self._not_found(self.key))
         return self._rest_item.delete(*args, **kwargs)
 
     def unprotected_unregister(self, *args, **kwargs):
+        kwargs.setdefault("errors", self._not_found(self.key))
         return self._rest_item.unprotected_delete(*args, **kwargs)
 
     @classmethod
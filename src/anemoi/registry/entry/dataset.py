@@ -19,9 +19,9 @@ from anemoi.utils.humanize import when
 from anemoi.utils.sanitise import sanitise
 
 from anemoi.registry import config
-from anemoi.registry.rest import RestItemList
 
 from . import CatalogueEntry
+from . import CatalogueEntryList
 
 LOG = logging.getLogger(__name__)
 
@@ -62,15 +62,12 @@ def delete_on_local(path):
             LOG.error(f"Failed to delete {to_delete}: {e}")
 
 
-class DatasetCatalogueEntryList(RestItemList):
+class DatasetCatalogueEntryList(CatalogueEntryList):
     """List of dataset catalogue entries."""
 
     def __init__(self, **kwargs):
         super().__init__(COLLECTION, **kwargs)
-
-    def __iter__(self):
-        for v in self.get():
-            yield DatasetCatalogueEntry(key=v["name"])
+        self.entry_class = DatasetCatalogueEntry
 
 
 class DatasetCatalogueEntry(CatalogueEntry):
@@ -168,7 +165,7 @@ class DatasetCatalogueEntry(CatalogueEntry):
             if not lst:
                 LOG.info("No runnning transfer found, starting one.")
                 uuid = TaskCatalogueEntryList().add_new_task(**kwargs)
-                task = TaskCatalogueEntry(key=uuid)
+                task = TaskCatalogueEntry(key=uuid, lazy=True)
                 return task
 
             lst = TaskCatalogueEntryList(**kwargs)
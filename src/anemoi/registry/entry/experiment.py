@@ -15,14 +15,10 @@ import tempfile
 from getpass import getuser
 
 import yaml
-from anemoi.utils.remote.s3 import delete
-from anemoi.utils.remote.s3 import download
-from anemoi.utils.remote.s3 import upload
-
-from anemoi.registry.rest import RestItemList
 
 from .. import config
 from . import CatalogueEntry
+from . import CatalogueEntryList
 from .weights import WeightCatalogueEntry
 
 COLLECTION = "experiments"
@@ -30,15 +26,12 @@ COLLECTION = "experiments"
 LOG = logging.getLogger(__name__)
 
 
-class ExperimentCatalogueEntryList(RestItemList):
+class ExperimentCatalogueEntryList(CatalogueEntryList):
     """List of ExperimentCatalogueEntry objects."""
 
     def __init__(self, **kwargs):
         super().__init__(COLLECTION, **kwargs)
-
-    def __iter__(self):
-        for v in self.get():
-            yield ExperimentCatalogueEntry(key=v["expver"])
+        self.entry_class = ExperimentCatalogueEntry
 
 
 class ExperimentCatalogueEntry(CatalogueEntry):
@@ -90,26 +83,16 @@ class ExperimentCatalogueEntry(CatalogueEntry):
         return new
 
     def _ensure_run_exists(self, run_number, **kwargs):
-        e = self.__class__(key=self.key)
-
-        if "runs" not in e.record:
+        def add_run(record):
             # for backwards compatibility, create '/runs' if it does not exist
-            e.patch([{"op": "add", "path": "/runs", "value": {}}], robust=True)
-            e.record["runs"] = {}
-
-        # add run_number if it does not exist
-        if str(run_number) not in self.record.get("runs", {}):
-            e.patch(
-                [
-                    {"op": "test", "path": "/runs", "value": e.record["runs"]},
-                    {"op": "add", "path": f"/runs/{run_number}", "value": dict(archives={}, **kwargs)},
-                ],
-                robust=True,
-            )
-            e.record["runs"] = {str(run_number): dict(archives={}, **kwargs)}
-        self.record = e.record
+            runs = record.setdefault("runs", {})
+            runs.setdefault(str(run_number), dict(archives={}, **kwargs))
+
+        self.compare_and_swap(add_run, robust=True)
 
     def set_archive(self, path, platform, run_number, overwrite=True, extras={}):
+        from anemoi.utils.remote.s3 import upload
+
         if not os.path.exists(path):
             raise FileNotFoundError(f"Could not find archive to upload at {path}")
 
@@ -137,6 +120,8 @@ class ExperimentCatalogueEntry(CatalogueEntry):
         self.patch([{"op": "add", "path": f"/runs/{run_number}/archives/{platform}", "value": dic}], robust=True)
 
     def remove_archive(self, platform, run_number):
+        from anemoi.utils.remote.s3 import delete
+
         if platform is None:
             raise ValueError("platform must be set")
 
@@ -200,6 +185,8 @@ class ExperimentCatalogueEntry(CatalogueEntry):
         return self.record.get("runs", {}).get(run_number, {})
 
     def get_archive(self, path, *, platform, run_number):
+        from anemoi.utils.remote.s3 import download
+
         if os.path.exists(path):
             raise FileExistsError(f"Path {path} already exists")
 
@@ -227,6 +214,8 @@ class ExperimentCatalogueEntry(CatalogueEntry):
         # self.delete_archives()
 
     def delete_all_plots(self):
+        from anemoi.utils.remote.s3 import delete
+
         plots = self.record.get("plots", [])
         if not plots:
             return
@@ -240,15 +229,16 @@ class ExperimentCatalogueEntry(CatalogueEntry):
                 LOG.warning(f"Skipping deletion of {url} because it does not belong to this experiment")
                 continue
             delete(url)
-        self.patch(
-            [
-                {"op": "test", "path": "/plots", "value": plots},
-                {"op": "add", "path": "/plots", "value": []},
-            ],
-            robust=True,
-        )
+
+        def remove_plots(record):
+            # Keep the plots added in the meantime
+            record["plots"] = [p for p in record.get("plots", []) if p not in plots]
+
+        self.compare_and_swap(remove_plots, robust=True)
 
     def _add_one_plot(self, path, **kwargs):
+        from anemoi.utils.remote.s3 import upload
+
         if not os.path.exists(path):
             raise FileNotFoundError(f"Could not find plot to upload at {path}")
 
@@ -277,7 +267,8 @@ class ExperimentCatalogueEntry(CatalogueEntry):
     def _add_one_weights(self, path, **kwargs):
         weights = WeightCatalogueEntry.load_from_path(path=path)
 
-        if not WeightCatalogueEntry.key_exists(weights.key):
+        other = WeightCatalogueEntry.load_from_key(key=weights.key)
+        if other is None:
             # weights with this uuid does not exist, register and upload them
             weights.register(ignore_existing=False, overwrite=False)
             weights.upload(path, overwrite=False)
@@ -286,7 +277,6 @@ class ExperimentCatalogueEntry(CatalogueEntry):
             # Weights with this uuid already exist
             # Skip if the weights are the same
             # Raise an error if the weights are different
-            other = WeightCatalogueEntry.load_from_key(key=weights.key)
             if other.record["metadata"]["timestamp"] == weights.record["metadata"]["timestamp"]:
                 LOG.info(
                     f"Not updating weights with key={weights.key}, because it already exists and has the same timestamp"
@@ -13,24 +13,20 @@ import os
 
 from anemoi.utils.config import load_any_dict_format
 
-from anemoi.registry.rest import RestItemList
-
 from . import CatalogueEntry
+from . import CatalogueEntryList
 
 COLLECTION = "trainings"
 
 LOG = logging.getLogger(__name__)
 
 
-class TrainingCatalogueEntryList(RestItemList):
+class TrainingCatalogueEntryList(CatalogueEntryList):
     """List of TrainingCatalogueEntry objects."""
 
     def __init__(self, **kwargs):
         super().__init__(COLLECTION, **kwargs)
-
-    def __iter__(self):
-        for v in self.get():
-            yield TrainingCatalogueEntry(key=v["name"])
+        self.entry_class = TrainingCatalogueEntry
 
 
 class TrainingCatalogueEntry(CatalogueEntry):
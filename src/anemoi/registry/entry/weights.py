@@ -11,29 +11,21 @@
 import logging
 import os
 
-from anemoi.utils.checkpoints import load_metadata as load_checkpoint_metadata
-from anemoi.utils.remote.s3 import download
-from anemoi.utils.remote.s3 import upload
-
-from anemoi.registry.rest import RestItemList
-
 from .. import config
 from . import CatalogueEntry
+from . import CatalogueEntryList
 
 COLLECTION = "weights"
 
 LOG = logging.getLogger(__name__)
 
 
-class WeightsCatalogueEntryList(RestItemList):
+class WeightsCatalogueEntryList(CatalogueEntryList):
     """List of weights catalogue entries."""
 
     def __init__(self, **kwargs):
         super().__init__(COLLECTION, **kwargs)
-
-    def __iter__(self):
-        for v in self.get():
-            yield WeightCatalogueEntry.load_from_key(key=v["uuid"])
+        self.entry_class = WeightCatalogueEntry
 
 
 class WeightCatalogueEntry(CatalogueEntry):
@@ -54,6 +46,8 @@ class WeightCatalogueEntry(CatalogueEntry):
 
     def download(self, path, platform):
         """Download the weights to the specified path."""
+        from anemoi.utils.remote.s3 import download
+
         LOG.info(f"Downloading {self.key} to {path}.")
         dirname = os.path.dirname(path)
         if dirname and not os.path.exists(dirname):
@@ -71,6 +65,8 @@ class WeightCatalogueEntry(CatalogueEntry):
         download(source, path, resume=True)
 
     def upload(self, path, target=None, overwrite=False):
+        from anemoi.utils.remote.s3 import upload
+
         if target is None:
             target = self.default_location()
 
@@ -90,6 +86,8 @@ class WeightCatalogueEntry(CatalogueEntry):
 
     @classmethod
     def load_from_path(cls, path):
+        from anemoi.utils.checkpoints import load_metadata as load_checkpoint_metadata
+
         assert os.path.exists(path), f"{path} does not exist"
 
         metadata = load_checkpoint_metadata(path)
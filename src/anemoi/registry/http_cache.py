@@ -0,0 +1,156 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Persistent cache of GET responses, revalidated with ETag / Last-Modified.
+
+The cache is a SQLite database shared by all the processes of a user on a node.
+Bodies are stored compressed, and the least recently used entries are evicted
+when the total size goes above the configured limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PATH = "~/.cache/anemoi/registry/http-cache.sqlite"
+DEFAULT_MAX_SIZE_MB = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+_CACHES = {}
+
+
+class CachedResponse:
+    def __init__(self, key, etag, last_modified, body):
+        self.key = key
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+
+    def json(self):
+        return json.loads(zlib.decompress(self.body))
+
+    def validators(self):
+        """Headers to send to make the request conditional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """SQLite-backed cache of JSON responses, safe for concurrent processes."""
+
+    def __init__(self, path=DEFAULT_PATH, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.path = os.path.expanduser(path)
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as db:
+            db.execute(SCHEMA)
+
+    @classmethod
+    def from_config(cls, conf):
+        """Return the cache for the ``http_cache`` section of the config, or None if it is disabled."""
+        if not conf or not conf.get("enabled"):
+            return None
+        path = conf.get("path") or DEFAULT_PATH
+        max_size_mb = conf.get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+        if (path, max_size_mb) not in _CACHES:
+            _CACHES[(path, max_size_mb)] = cls(path=path, max_size_mb=max_size_mb)
+        return _CACHES[(path, max_size_mb)]
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def make_key(url, params=None, token=None):
+        params = sorted((params or {}).items())
+        owner = hashlib.sha256((token or "").encode()).hexdigest()[:16]
+        return json.dumps([owner, url, params], default=str)
+
+    def lookup(self, key):
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT etag, last_modified, body FROM responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            LOG.warning(f"HTTP cache unavailable ({self.path}): {e}")
+            return None
+        if row is None:
+            return None
+        return CachedResponse(key, *row)
+
+    def touch(self, key):
+        try:
+            with self._connect() as db:
+                db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            LOG.warning(f"HTTP cache unavailable ({self.path}): {e}")
+
+    def store(self, key, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            # Nothing to revalidate with
+            return
+
+        body = zlib.compress(response.content)
+        try:
+            with self._connect() as db:
+                db.execute("BEGIN IMMEDIATE")
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, etag, last_modified, body, len(body), time.time()),
+                )
+                self._evict(db)
+                db.execute("COMMIT")
+        except sqlite3.Error as e:
+            LOG.warning(f"HTTP cache unavailable ({self.path}): {e}")
+
+    def _evict(self, db):
+        (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_size:
+            return
+        db.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS cumulative FROM responses
+                ) WHERE cumulative > ?
+            )
+            """,
+            (self.max_size,),
+        )
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM responses")
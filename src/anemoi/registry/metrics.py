@@ -0,0 +1,186 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Counters and histograms of the process, in the Prometheus text format.
+
+They can be served over HTTP (`Metrics.serve`) or written to a file for the
+textfile collector of node-exporter (`Metrics.write_textfile`). Recording is a
+dictionary update under a lock held for a few instructions, cheap enough for the
+progress callbacks of a transfer.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+LOG = logging.getLogger(__name__)
+
+PREFIX = "anemoi_registry"
+
+# Seconds, from a REST request to a transfer of several hours
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600, 4 * 3600, 24 * 3600)
+
+DESCRIPTIONS = {
+    "tasks_total": ("counter", "Tasks claimed, completed, failed, released and interrupted by the workers"),
+    "task_seconds": ("histogram", "Wall time of the tasks processed by the workers"),
+    "transferred_bytes_total": ("counter", "Bytes transferred by the workers"),
+    "transferred_files_total": ("counter", "Files transferred by the workers"),
+    "request_seconds": ("histogram", "Latency of the requests to the catalogue, until the response headers"),
+    "heartbeat_lag_seconds": ("histogram", "Time between two heartbeats of a task, see max_no_heartbeat"),
+    "claim_attempts_total": ("counter", "Attempts to claim a queued task"),
+    "claim_claimed_total": ("counter", "Tasks claimed"),
+    "claim_conflicts_total": ("counter", "Claims lost to another worker"),
+    "claim_seconds_total": ("counter", "Time spent claiming tasks"),
+    "patch_conflicts_total": ("counter", "Guarded patches rejected because the entry changed, and their retries"),
+    "reaper_tasks_total": ("counter", "Running tasks seen by the reaper, by outcome"),
+    "reaper_scans_total": ("counter", "Scans of the running tasks by the reaper"),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format(name, labels, value, extra=()):
+    labels = tuple(labels) + tuple(extra)
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{PREFIX}_{name}{{{inner}}} {value!r}" if inner else f"{PREFIX}_{name} {value!r}"
+
+
+class Metrics:
+    """Counters and histograms, identified by a name and labels."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.server = None
+        self._writer = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # One count per bucket, then +Inf, sum
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            histogram[i] += 1
+            histogram[-1] += value
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def _stats(self):
+        # The statistics kept by the client as plain counters
+        from anemoi.registry.entry import CONFLICT_STATS
+        from anemoi.registry.tasks import CLAIM_STATS
+        from anemoi.registry.tasks import REAP_STATS
+
+        counters = {}
+        for k, v in CLAIM_STATS.items():
+            counters[(f"claim_{k}_total", ())] = v
+        for k, v in CONFLICT_STATS.items():
+            collection, event = k.rsplit(".", 1)
+            counters[("patch_conflicts_total", (("collection", collection), ("event", event)))] = v
+        for k, v in REAP_STATS.items():
+            if k == "scans":
+                counters[("reaper_scans_total", ())] = v
+            else:
+                counters[("reaper_tasks_total", (("outcome", k),))] = v
+        return counters
+
+    def render(self):
+        """All the metrics, in the Prometheus text format."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+        counters.update(self._stats())
+
+        lines = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+        for name in names:
+            kind, description = DESCRIPTIONS.get(name, ("untyped", name))
+            lines.append(f"# HELP {PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(_format(name, labels, value))
+            for (n, labels), histogram in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), histogram):
+                    cumulative += count
+                    lines.append(_format(f"{name}_bucket", labels, cumulative, [("le", bound)]))
+                lines.append(_format(f"{name}_sum", labels, histogram[-1]))
+                lines.append(_format(f"{name}_count", labels, cumulative))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, address="127.0.0.1"):
+        """Serve the metrics on http://<address>:<port>/metrics, in a background thread. Only on
+        the loopback interface by default, use "0.0.0.0" (or "") for all the interfaces.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((address, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        LOG.info(f"Serving metrics on http://{address or '0.0.0.0'}:{self.server.server_address[1]}/metrics")
+        return self.server
+
+    def write_textfile(self, path):
+        """Write the metrics to `path`, atomically so that node-exporter never reads a partial file."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def write_textfile_every(self, path, interval):
+        """Write the metrics to `path` every `interval` seconds, in a background thread."""
+        if self._writer is not None:
+            return
+
+        def write():
+            while True:
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    LOG.error(f"Cannot write metrics to {path}: {e}")
+                time.sleep(interval)
+
+        self._writer = threading.Thread(target=write, name="metrics-textfile", daemon=True)
+        self._writer.start()
+
+
+METRICS = Metrics()
@@ -0,0 +1,445 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Local copy of the catalogue in a SQLite database.
+
+`Mirror.sync` lists the keys and `updated` timestamps of a collection in one request,
+then downloads only the records that are new or changed since the previous sync, and
+forgets the ones deleted from the catalogue. The records in the list are only used as
+they are from servers that ignore `_fields`. In offline mode (`mirror.offline` in the
+config, or ANEMOI_CATALOGUE_OFFLINE=1) `Rest` serves the reads from the mirror and
+refuses the changes, see `Rest.mirror`.
+
+The records are also indexed for full-text search (SQLite FTS5), when they are stored,
+so that the index follows the incremental syncs, see `Mirror.search`. Without FTS5 in the
+SQLite of this Python, the mirror works without the index, which is rebuilt the next time
+the mirror is opened with FTS5.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import closing
+from contextlib import contextmanager
+from functools import cache
+
+from requests.exceptions import HTTPError
+
+from .query import MISSING
+from .rest import Offline
+from .rest import Rest
+from .utils import lookup
+from .utils import project
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PATH = "~/.cache/anemoi/registry/mirror.sqlite"
+
+# The collections mirrored, and their main key
+COLLECTIONS = {
+    "datasets": "name",
+    "experiments": "expver",
+    "weights": "uuid",
+    "trainings": "name",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    updated TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (collection, key)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    collection TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    synced REAL NOT NULL
+);
+"""
+
+# Full-text index of the records, the rowid is that of `records`. bm25 weights, in this order.
+SEARCH_COLUMNS = {"name": 10.0, "variables": 5.0, "recipe": 2.0, "text": 1.0}
+
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+    collection UNINDEXED,
+    key UNINDEXED,
+    {", ".join(SEARCH_COLUMNS)}
+)
+"""
+
+# Stored in `PRAGMA user_version`, mirrors created before the search index have 0
+SCHEMA_VERSION = 1
+
+_MIRRORS = {}
+
+
+def is_offline(conf):
+    """True if the reads must be served by the mirror, from the environment or the
+    ``mirror`` section of the config.
+    """
+    env = os.environ.get("ANEMOI_CATALOGUE_OFFLINE")
+    if env is not None:
+        return env.lower() not in ("", "0", "false", "no")
+    return bool((conf or {}).get("offline"))
+
+
+@cache
+def fts5_available():
+    """True if the SQLite of this Python has the FTS5 extension, needed for the search index."""
+    try:
+        with closing(sqlite3.connect(":memory:")) as db:
+            db.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def _words(value, words):
+    # The keys and the strings of a document, numbers (e.g. the statistics) are left out
+    if isinstance(value, dict):
+        for k, v in value.items():
+            words.append(str(k))
+            _words(v, words)
+    elif isinstance(value, list):
+        for v in value:
+            _words(v, words)
+    elif isinstance(value, str):
+        words.append(value)
+    return words
+
+
+def search_columns(key, record):
+    """The text of a record in each column of the search index."""
+    metadata = record.get("metadata")
+    metadata = metadata if isinstance(metadata, dict) else {}
+    variables = metadata.get("variables")
+    variables = [str(v) for v in variables] if isinstance(variables, list) else []
+    variables_metadata = metadata.get("variables_metadata")
+    if isinstance(variables_metadata, dict):
+        variables += [v for v in variables_metadata if v not in variables]
+
+    # The name is in its own column, and the timestamps would match any search for a year
+    others = {k: v for k, v in record.items() if k not in ("metadata", "created", "updated") and v != key}
+    others["metadata"] = {k: v for k, v in metadata.items() if k not in ("recipe", "variables", "statistics")}
+    return {
+        "name": " ".join(dict.fromkeys([key, str(record.get("name", key))])),
+        "variables": " ".join(variables),
+        "recipe": " ".join(_words(metadata.get("recipe"), [])),
+        "text": " ".join(_words(others, [])),
+    }
+
+
+def search_query(text):
+    """The FTS5 query for the words of `text`: all must be found, `word*` is a prefix, `column:word`
+    only looks into a column of the index, and AND, OR, NOT are kept as they are.
+    """
+    terms = []
+    for word in text.split():
+        if word in ("AND", "OR", "NOT"):
+            terms.append(word)
+            continue
+        column, colon, term = word.partition(":")
+        if not colon or column not in SEARCH_COLUMNS:
+            column, term = None, word
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not term:
+            continue
+        # Quoted, so that the punctuation of names (e.g. '-') is not taken for operators
+        phrase = '"' + term.replace('"', '""') + '"' + ("*" if prefix else "")
+        terms.append(f"{column} : {phrase}" if column else phrase)
+    if not terms:
+        raise ValueError(f"Nothing to search for in {text!r}")
+    return " ".join(terms)
+
+
+class Mirror:
+    """SQLite copy of the collections of the catalogue, safe for concurrent processes."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = os.path.expanduser(path)
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, conf):
+        """Return the mirror for the ``mirror`` section of the config."""
+        path = (conf or {}).get("path") or DEFAULT_PATH
+        if path not in _MIRRORS:
+            _MIRRORS[path] = cls(path=path)
+        return _MIRRORS[path]
+
+    @property
+    def db(self):
+        # One connection per thread, kept open so that lookups do not pay for opening the file
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._upgrade(db)
+        return db
+
+    @property
+    def searchable(self):
+        """True if the search index is kept up to date, see `fts5_available`."""
+        return fts5_available()
+
+    def check_searchable(self):
+        if not self.searchable:
+            raise ValueError(
+                f"Search needs the FTS5 extension of SQLite, which the SQLite {sqlite3.sqlite_version}"
+                f" of {sys.executable} does not have."
+            )
+
+    def _upgrade(self, db):
+        if not self.searchable or db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        with self.transaction():
+            # Another process may have done it in the meantime
+            if db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                return
+            db.execute(SEARCH_SCHEMA)
+            # Left out of date by a process without FTS5
+            db.execute("DELETE FROM search")
+            rows = db.execute("SELECT rowid, collection, key, record FROM records").fetchall()
+            if rows:
+                LOG.info(f"Indexing the {len(rows)} records of the mirror for search.")
+            for rowid, collection, key, record in rows:
+                self._index(db, rowid, collection, key, json.loads(record))
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # Reads
+
+    def _check(self, collection):
+        if collection not in COLLECTIONS:
+            raise Offline(f"The {collection} are not in the mirror, the catalogue is needed for them.")
+        if not self.exists():
+            raise Offline(f"No mirror of the catalogue in {self.path}, run 'anemoi-registry mirror sync' first.")
+
+    def get(self, collection, key, params=None):
+        """The record `key` of `collection`, or None if it is not in the mirror."""
+        self._check(collection)
+        row = self.db.execute(
+            "SELECT record FROM records WHERE collection = ? AND key = ?", (collection, str(key))
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        fields = (params or {}).get("_fields")
+        return project(record, fields.split(",")) if fields else record
+
+    def list(self, collection, params=None, where=None):
+        """The records of `collection`, with the parameters of a list request: key=value
+        filters (nested keys with dots), `_sort` (`-` for descending), `_limit` and `_fields`.
+        `where` is a compiled `Query`, evaluated on the values extracted by SQLite, only the
+        matching records are decoded.
+        """
+        self._check(collection)
+        params = dict(params or {})
+        filters = {k: v for k, v in params.items() if not k.startswith("_")}
+
+        main_key = COLLECTIONS[collection]
+        sql, args = "WHERE collection = ?", [collection]
+        if main_key in filters:
+            sql, args = sql + " AND key = ?", args + [str(filters[main_key])]
+
+        json_paths = [p.json_path for p in where.paths] if where is not None else []
+        if where is not None and None not in json_paths and sqlite3.sqlite_version_info >= (3, 38):
+            columns = "".join(", record -> ?" for _ in json_paths)
+            rows = self.db.execute(f"SELECT record{columns} FROM records {sql} ORDER BY key", json_paths + args)
+            rows = rows.fetchall()
+            values = {
+                p.parts: [MISSING if r[i] is None else json.loads(r[i]) for r in rows]
+                for i, p in enumerate(where.paths, start=1)
+            }
+            records = [json.loads(rows[i][0]) for i in where.select(values, len(rows))]
+        else:
+            rows = self.db.execute(f"SELECT record FROM records {sql} ORDER BY key", args)
+            records = [json.loads(record) for (record,) in rows]
+            if where is not None:
+                records = where.filter(records)
+
+        records = [r for r in records if all(str(lookup(r, k)) == str(v) for k, v in filters.items())]
+
+        if params.get("_sort"):
+            sort = params["_sort"]
+            records.sort(key=lambda r: str(lookup(r, sort.lstrip("-"))), reverse=sort.startswith("-"))
+        if params.get("_limit"):
+            records = records[: int(params["_limit"])]
+        if params.get("_fields"):
+            fields = params["_fields"].split(",")
+            records = [project(r, fields) for r in records]
+        return records
+
+    def status(self):
+        """Number of records and time of the last sync of each collection."""
+        synced = {c: (url, t) for c, url, t in self.db.execute("SELECT collection, url, synced FROM syncs")}
+        counts = dict(self.db.execute("SELECT collection, COUNT(*) FROM records GROUP BY collection"))
+        return {c: (counts.get(c, 0), *synced.get(c, (None, None))) for c in COLLECTIONS}
+
+    def search(self, text, collections=None, limit=20):
+        """The records with all the words of `text` (see `search_query`), the most relevant
+        first, as (collection, key, snippet) where the snippet shows the words found.
+        """
+        self.check_searchable()
+        if not self.exists():
+            raise Offline(f"No mirror of the catalogue in {self.path}, run 'anemoi-registry mirror sync' first.")
+
+        sql = "SELECT collection, key, snippet(search, -1, '[', ']', '...', 12) FROM search WHERE search MATCH ?"
+        args = [search_query(text)]
+        if collections:
+            sql += f" AND collection IN ({', '.join('?' for _ in collections)})"
+            args += list(collections)
+        weights = ", ".join(str(w) for w in [0, 0, *SEARCH_COLUMNS.values()])
+        sql += f" ORDER BY bm25(search, {weights}) LIMIT ?"
+        return self.db.execute(sql, args + [limit]).fetchall()
+
+    # Updates
+
+    def _unindexed(self, db):
+        # Changed without updating the search index, it is rebuilt by the next process with FTS5
+        db.execute("PRAGMA user_version = 0")
+
+    def _index(self, db, rowid, collection, key, record):
+        if not self.searchable:
+            return
+        columns = search_columns(key, record)
+        db.execute(
+            f"INSERT INTO search (rowid, collection, key, {', '.join(columns)}) VALUES (?, ?, ?{', ?' * len(columns)})",
+            (rowid, collection, key, *columns.values()),
+        )
+
+    def _remove(self, db, collection, key):
+        row = db.execute("SELECT rowid FROM records WHERE collection = ? AND key = ?", (collection, key)).fetchone()
+        if row is not None:
+            if self.searchable:
+                db.execute("DELETE FROM search WHERE rowid = ?", row)
+            db.execute("DELETE FROM records WHERE rowid = ?", row)
+
+    def _store(self, db, collection, key, record):
+        self._remove(db, collection, key)
+        rowid = db.execute(
+            "INSERT INTO records VALUES (?, ?, ?, ?)", (collection, key, record.get("updated"), json.dumps(record))
+        ).lastrowid
+        self._index(db, rowid, collection, key, record)
+
+    def sync(self, collections=None, full=False, max_concurrency=None):
+        """Download the records changed since the previous sync. Return, for each
+        collection, the number of records added, updated, deleted and unchanged.
+        """
+        from .async_rest import AsyncRest
+
+        rest = Rest(offline=False)
+        arest = AsyncRest(rest, max_concurrency=max_concurrency)
+        return {c: self.sync_collection(c, rest, arest, full=full) for c in collections or COLLECTIONS}
+
+    def sync_collection(self, collection, rest, arest, full=False):
+        from .async_rest import run
+
+        main_key = COLLECTIONS[collection]
+        url = f"{rest.api_url}/{collection}"
+        start = time.time()
+
+        db = self.db
+        previous = db.execute("SELECT url FROM syncs WHERE collection = ?", (collection,)).fetchone()
+        if full or (previous is not None and previous[0] != url):
+            # Another catalogue, nothing can be reused
+            local = {}
+        else:
+            local = dict(db.execute("SELECT key, updated FROM records WHERE collection = ?", (collection,)))
+
+        # One request for the keys and timestamps, the records are only fetched if they changed.
+        projection = {main_key, "updated"}
+        listed = rest.get(collection, params={"_fields": f"{main_key},updated"}, cache=False)
+        remote = {str(r[main_key]): r.get("updated") for r in listed}
+        # A server that ignored _fields sent the whole records, a list may otherwise leave out some fields
+        complete = {str(r[main_key]): r for r in listed if r.keys() - projection}
+
+        # Records without timestamp are always fetched again
+        changed = [k for k, u in remote.items() if k not in local or u is None or u != local[k]]
+        deleted = [k for k in local if k not in remote]
+        missing = [k for k in changed if k not in complete]
+        fetched = dict(zip(missing, run(self._fetch(collection, missing, arest))))
+        records = [complete[k] if k in complete else fetched[k] for k in changed]
+
+        counts = Counter(added=0, updated=0, deleted=0, unchanged=len(remote) - len(changed))
+        with self.transaction():
+            if not self.searchable:
+                self._unindexed(db)
+            if not local:
+                if self.searchable:
+                    db.execute("DELETE FROM search WHERE collection = ?", (collection,))
+                db.execute("DELETE FROM records WHERE collection = ?", (collection,))
+            for key, record in zip(changed, records):
+                if record is None:
+                    # Deleted since it was listed
+                    deleted.append(key)
+                    continue
+                counts["updated" if key in local else "added"] += 1
+                self._store(db, collection, key, record)
+            for key in deleted:
+                self._remove(db, collection, key)
+            counts["deleted"] = sum(1 for k in deleted if k in local)
+            db.execute("INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)", (collection, url, start))
+
+        LOG.debug(f"Synced {collection} in {time.time() - start:.1f}s: {dict(counts)}")
+        return counts
+
+    async def _fetch(self, collection, keys, rest):
+        import asyncio
+
+        from .async_rest import AsyncRestItem
+
+        async def fetch(key):
+            try:
+                return await AsyncRestItem(collection, key, rest=rest).get(cache=False)
+            except HTTPError as e:
+                if e.response.status_code == 404:
+                    return None
+                raise
+
+        return await asyncio.gather(*[fetch(key) for key in keys])
+
+    @contextmanager
+    def transaction(self):
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def clear(self):
+        with self.transaction() as db:
+            if self.searchable:
+                db.execute("DELETE FROM search")
+            else:
+                self._unindexed(db)
+            db.execute("DELETE FROM records")
+            db.execute("DELETE FROM syncs")
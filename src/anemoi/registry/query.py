@@ -0,0 +1,438 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Filters on the records of a list, evaluated on the client side.
+
+    resolution=o96 and start_date<1990 and .locations.leonardo exists
+    frequency in (6h, 24h) and not .status=deprecated
+    .name~aifs-* and end_date in 2020..2023
+
+Paths follow `CatalogueEntry.resolve_path`: `a.b` is `/metadata/a/b`, `.a.b` and `/a/b`
+start at the top of the record. The operators are `=` (or `==`), `!=`, `<`, `<=`, `>`,
+`>=`, `~` (glob pattern), `in (a, b, ...)`, `in lo..hi` (inclusive, either bound may be
+left out), `not in` and `exists`, combined with `and`, `or`, `not` and parentheses.
+
+Values are compared as numbers if both are numbers, otherwise as strings, so that ISO
+dates compare in chronological order. A list in the record matches if one of its
+elements does. Records without the value never match a comparison, see `exists`.
+
+A query is compiled once, and evaluated one record at a time (`Query.match`) or over
+columns of values (`Query.filter`, `Query.select`). Each predicate is then only tested on
+the records not ruled out by the previous ones, and the mirror extracts from its database
+only the values tested, instead of decoding every record.
+"""
+
+import fnmatch
+import logging
+import re
+
+LOG = logging.getLogger(__name__)
+
+# Lists shorter than this are filtered one record at a time
+COLUMNAR_THRESHOLD = 64
+
+KEYWORDS = ("and", "or", "not", "in", "exists")
+
+TOKENS = re.compile(
+    r"""\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<op>==|!=|<=|>=|=|<|>|~|\(|\)|,)
+    |(?P<word>[^\s()=!<>~,'"]+)
+    )""",
+    re.VERBOSE,
+)
+
+
+class QueryError(ValueError):
+    pass
+
+
+class _Missing:
+    def __repr__(self):
+        return "MISSING"
+
+
+# The value of a path that is not in the record
+MISSING = _Missing()
+
+
+def _is_number(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def _text(x):
+    if x is None:
+        return "null"
+    if isinstance(x, bool):
+        return "true" if x else "false"
+    return str(x)
+
+
+def _literal(word):
+    for parse in (int, float):
+        try:
+            return parse(word)
+        except ValueError:
+            pass
+    return {"true": True, "false": False, "null": None}.get(word, word)
+
+
+def _any(test):
+    # A list matches if one of its elements does
+    def wrapped(value):
+        if value is MISSING:
+            return False
+        if isinstance(value, list):
+            return any(test(v) for v in value)
+        return test(value)
+
+    return wrapped
+
+
+COMPARISONS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _comparison(op, literal):
+    compare = COMPARISONS[op]
+    text = _text(literal)
+    if _is_number(literal):
+        return _any(lambda v: compare(v, literal) if _is_number(v) else compare(_text(v), text))
+    return _any(lambda v: compare(_text(v), text))
+
+
+class Path:
+    """A path in a record, with the semantics of `CatalogueEntry.resolve_path`."""
+
+    def __init__(self, path):
+        from anemoi.registry.entry import CatalogueEntry
+
+        self.text = path
+        self.parts = tuple(CatalogueEntry.resolve_path(path, check=False).split("/")[1:])
+
+    def __call__(self, record):
+        for p in self.parts:
+            if isinstance(record, dict):
+                if p not in record:
+                    return MISSING
+                record = record[p]
+            elif isinstance(record, list) and p.isdigit() and int(p) < len(record):
+                record = record[int(p)]
+            else:
+                return MISSING
+        return record
+
+    @property
+    def field(self):
+        """The path as a field of a list request (see `RestItemList.get`), or None."""
+        if any("." in p for p in self.parts):
+            return None
+        return ".".join(self.parts)
+
+    @property
+    def json_path(self):
+        """The path in the JSON functions of SQLite, or None if it may go through a list."""
+        if any(p.isdigit() or '"' in p for p in self.parts):
+            return None
+        return "$" + "".join(f'."{p}"' for p in self.parts)
+
+    def __repr__(self):
+        return self.text
+
+
+class Columns:
+    """Values of each path in a list of records, as `{path.parts: [value, ...]}`."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def values(self, path, selection):
+        column = self.columns[path.parts]
+        return [column[i] for i in selection]
+
+
+class Records:
+    """Values of each path in a list of records, extracted for the records still selected only."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def values(self, path, selection):
+        records = self.records
+        return [path(records[i]) for i in selection]
+
+
+class Node:
+    def paths(self):
+        return []
+
+
+class Predicate(Node):
+    def __init__(self, path, test, text):
+        self.path = path
+        self.test = test
+        self.text = text
+
+    def paths(self):
+        return [self.path]
+
+    def match(self, record):
+        return self.test(self.path(record))
+
+    def select(self, columns, selection):
+        test = self.test
+        return [i for i, v in zip(selection, columns.values(self.path, selection)) if test(v)]
+
+    def __repr__(self):
+        return self.text
+
+
+class And(Node):
+    def __init__(self, children):
+        self.children = children
+
+    def paths(self):
+        return [p for c in self.children for p in c.paths()]
+
+    def match(self, record):
+        return all(c.match(record) for c in self.children)
+
+    def select(self, columns, selection):
+        for child in self.children:
+            if not selection:
+                break
+            selection = child.select(columns, selection)
+        return selection
+
+    def __repr__(self):
+        return "(" + " and ".join(map(repr, self.children)) + ")"
+
+
+class Or(Node):
+    def __init__(self, children):
+        self.children = children
+
+    def paths(self):
+        return [p for c in self.children for p in c.paths()]
+
+    def match(self, record):
+        return any(c.match(record) for c in self.children)
+
+    def select(self, columns, selection):
+        selected, remaining = set(), selection
+        for child in self.children:
+            if not remaining:
+                break
+            selected.update(child.select(columns, remaining))
+            remaining = [i for i in remaining if i not in selected]
+        return [i for i in selection if i in selected]
+
+    def __repr__(self):
+        return "(" + " or ".join(map(repr, self.children)) + ")"
+
+
+class Not(Node):
+    def __init__(self, child):
+        self.child = child
+
+    def paths(self):
+        return self.child.paths()
+
+    def match(self, record):
+        return not self.child.match(record)
+
+    def select(self, columns, selection):
+        excluded = set(self.child.select(columns, selection))
+        return [i for i in selection if i not in excluded]
+
+    def __repr__(self):
+        return f"not {self.child!r}"
+
+
+class Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+
+    def _tokenize(self, text):
+        tokens, pos = [], 0
+        text = text.rstrip()
+        while pos < len(text):
+            m = TOKENS.match(text, pos)
+            if m is None or m.end() == pos:
+                raise QueryError(f"Invalid query {text!r} at position {pos}")
+            kind = m.lastgroup
+            value = m.group(kind)
+            if kind == "string":
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            elif kind == "word" and value.lower() in KEYWORDS:
+                kind, value = "keyword", value.lower()
+            tokens.append((kind, value))
+            pos = m.end()
+        return tokens
+
+    def peek(self, *expected):
+        if self.pos >= len(self.tokens):
+            return None
+        kind, value = self.tokens[self.pos]
+        if expected and value not in expected:
+            return None
+        return kind, value
+
+    def next(self, what):
+        if self.pos >= len(self.tokens):
+            raise QueryError(f"Invalid query {self.text!r}: expected {what} at the end")
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def expect(self, value):
+        kind, found = self.next(repr(value))
+        if found != value or kind == "string":
+            raise QueryError(f"Invalid query {self.text!r}: expected {value!r}, found {found!r}")
+
+    def parse(self):
+        node = self.expression()
+        if self.pos < len(self.tokens):
+            raise QueryError(f"Invalid query {self.text!r}: unexpected {self.tokens[self.pos][1]!r}")
+        return node
+
+    def expression(self):
+        children = [self.conjunction()]
+        while self.peek("or"):
+            self.pos += 1
+            children.append(self.conjunction())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def conjunction(self):
+        children = [self.factor()]
+        while self.peek("and"):
+            self.pos += 1
+            children.append(self.factor())
+        return children[0] if len(children) == 1 else And(children)
+
+    def factor(self):
+        if self.peek("not"):
+            self.pos += 1
+            return Not(self.factor())
+        if self.peek("("):
+            self.pos += 1
+            node = self.expression()
+            self.expect(")")
+            return node
+        return self.predicate()
+
+    def value(self):
+        kind, value = self.next("a value")
+        if kind == "string":
+            return value
+        if kind == "op":
+            raise QueryError(f"Invalid query {self.text!r}: expected a value, found {value!r}")
+        return _literal(value)
+
+    def predicate(self):
+        kind, text = self.next("a path")
+        if kind != "word":
+            raise QueryError(f"Invalid query {self.text!r}: expected a path, found {text!r}")
+        path = Path(text)
+
+        kind, op = self.next(f"an operator after {text!r}")
+        if op == "exists":
+            return Predicate(path, lambda v: v is not MISSING, f"{text} exists")
+
+        negate = op == "not"
+        if negate:
+            self.expect("in")
+            op = "in"
+
+        if op == "in":
+            node = self.membership(path, text)
+            return Not(node) if negate else node
+
+        if op == "~":
+            pattern = _text(self.value())
+            return Predicate(path, _any(lambda v: fnmatch.fnmatchcase(_text(v), pattern)), f"{text}~{pattern}")
+
+        op = "=" if op == "==" else op
+        if op not in COMPARISONS:
+            raise QueryError(f"Invalid query {self.text!r}: unknown operator {op!r}")
+        literal = self.value()
+        return Predicate(path, _comparison(op, literal), f"{text}{op}{_text(literal)}")
+
+    def membership(self, path, text):
+        if not self.peek("("):
+            # A range, lo..hi
+            kind, value = self.next("a list or a range")
+            if kind != "word" or ".." not in value:
+                raise QueryError(f"Invalid query {self.text!r}: expected a list or a range, found {value!r}")
+            lo, hi = value.split("..", 1)
+            tests = [_comparison(">=", _literal(lo)) if lo else None, _comparison("<=", _literal(hi)) if hi else None]
+            tests = [t for t in tests if t is not None]
+            return Predicate(path, _any(lambda v: all(t(v) for t in tests)), f"{text} in {value}")
+
+        self.pos += 1
+        literals = [self.value()]
+        while self.peek(","):
+            self.pos += 1
+            literals.append(self.value())
+        self.expect(")")
+
+        numbers = {x for x in literals if _is_number(x)}
+        texts = {_text(x) for x in literals}
+
+        def test(v):
+            return v in numbers if _is_number(v) and numbers else _text(v) in texts
+
+        return Predicate(path, _any(test), f"{text} in ({', '.join(map(_text, literals))})")
+
+
+class Query:
+    """A compiled query, see the documentation of the module."""
+
+    def __init__(self, text):
+        if isinstance(text, (list, tuple)):
+            text = " and ".join(f"({t})" for t in text)
+        self.text = text
+        self.root = Parser(text).parse()
+        self.paths = list({p.parts: p for p in self.root.paths()}.values())
+
+    @classmethod
+    def compile(cls, query):
+        """A `Query` from a string, a list of strings (all must match) or a `Query`."""
+        return query if isinstance(query, cls) else cls(query)
+
+    def match(self, record):
+        return self.root.match(record)
+
+    def fields(self):
+        """The fields of the records needed to evaluate the query, or None for all of them."""
+        fields = [p.field for p in self.paths]
+        return None if None in fields else fields
+
+    def select(self, columns, count):
+        """Indices of the matching records, given the values of each path (see `paths`)
+        in the records, as `{path.parts: [value, ...]}`.
+        """
+        return self.root.select(Columns(columns), range(count))
+
+    def filter(self, records):
+        """The matching records."""
+        records = list(records)
+        if len(records) < COLUMNAR_THRESHOLD:
+            return [r for r in records if self.root.match(r)]
+        return [records[i] for i in self.root.select(Records(records), range(len(records)))]
+
+    def __repr__(self):
+        return f"Query({self.root!r})"
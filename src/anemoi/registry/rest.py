@@ -9,16 +9,25 @@
 
 
 import datetime
+import json
 import logging
 import os
 import socket
+import threading
+from functools import cached_property
 from getpass import getuser
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
 
 import requests
 from anemoi.utils.remote import robust as make_robust
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 
 from ._version import __version__
+from .metrics import METRICS
+from .utils import parse_fields
+from .utils import project
 
 LOG = logging.getLogger(__name__)
 
@@ -36,6 +45,10 @@ class AlreadyExists(ValueError):
     pass
 
 
+class Offline(ValueError):
+    """The catalogue is read from the local mirror, which cannot answer or be changed."""
+
+
 def tidy(d, *path):
     if isinstance(d, dict):
         return {k: tidy(v, *path, k) for k, v in d.items()}
@@ -67,16 +80,83 @@ def trace_info():
     return trace
 
 
+DEFAULT_POOL_SIZE = 10
+
+# Sessions are shared by all the Rest instances of the process, so that
+# connections are kept alive and reused across catalogue entries.
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _observe_latency(response, *args, **kwargs):
+    if "_wait" in parse_qs(urlsplit(response.request.url).query):
+        # Long-polls are held by the server on purpose, see `Rest.wait_for_change`
+        return
+    METRICS.observe("request_seconds", response.elapsed.total_seconds(), method=response.request.method)
+
+
+def shared_session(api_url, token, pool_size=DEFAULT_POOL_SIZE):
+    """Return the process-wide session for this (api_url, token), creating it if needed."""
+    key = (api_url, token)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Authorization": f"Bearer {token}"})
+            for k, v in trace_info().items():
+                session.headers.update({f"x-anemoi-registry-{k}": str(v)})
+            session.hooks["response"].append(_observe_latency)
+            _SESSIONS[key] = session
+        return session
+
+
+# Servers that answered HEAD requests with "405 Method Not Allowed"
+_HEAD_SUPPORTED = {}
+_BULK_DELETE_SUPPORTED = {}
+
+
+def close_sessions():
+    """Close all the shared sessions."""
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+
+
+def _forget_sessions():
+    # A forked child must not share sockets with its parent, and its pid is different.
+    # The lock may have been held by another thread of the parent at the time of the fork.
+    global _SESSIONS_LOCK
+    _SESSIONS_LOCK = threading.Lock()
+    _SESSIONS.clear()
+
+
+os.register_at_fork(after_in_child=_forget_sessions)
+
+
 class Rest:
     """REST API client."""
 
-    def __init__(self, token=None):
+    def __init__(self, token=None, api_url=None, offline=None):
+        """With `offline=None`, reads are served by the local mirror if the config says so."""
         self.token = token or self.config.api_token
+        self._api_url = api_url
+        self._offline = offline
 
-        self.session = requests.Session()
-        self.session.headers.update({"Authorization": f"Bearer {self.token}"})
-        for k, v in trace_info().items():
-            self.session.headers.update({f"x-anemoi-registry-{k}": str(v)})
+    @property
+    def session(self):
+        # Not cached on the instance, so that a Rest created before a fork does not
+        # keep using the sessions of the parent
+        return shared_session(self.api_url, self.token, pool_size=self._pool_size)
+
+    @cached_property
+    def _pool_size(self):
+        if self._api_url is None:
+            return self.config.get("http_pool_size", DEFAULT_POOL_SIZE)
+        return DEFAULT_POOL_SIZE
 
     @property
     def config(self):
@@ -86,33 +166,128 @@ class Rest:
 
     @property
     def api_url(self):
+        if self._api_url is not None:
+            return self._api_url
         return self.config.api_url
 
-    def get_url(self, url):
-        r = make_robust(self.session.get)(url)
+    def get_url(self, url, robust=True):
+        r = make_robust(self.session.get)(url) if robust else self.session.get(url, timeout=10)
         self.raise_for_status(r)
         return r.json()
 
-    def get(self, path, params=None, errors={}):
+    @cached_property
+    def response_cache(self):
+        if self._api_url is not None:
+            # Bootstrapping the configuration, the cache settings are not known yet
+            return None
+        from .http_cache import ResponseCache
+
+        return ResponseCache.from_config(self.config.get("http_cache"))
+
+    @cached_property
+    def mirror(self):
+        """The mirror serving the reads in offline mode, or None."""
+        if self._api_url is not None or self._offline is False:
+            return None
+        from .mirror import Mirror
+        from .mirror import is_offline
+
+        conf = self.config.get("mirror")
+        if not self._offline and not is_offline(conf):
+            return None
+        return Mirror.from_config(conf)
+
+    def _check_online(self, verb, path):
+        if self.mirror is not None:
+            raise Offline(f"Cannot {verb} {path}, the catalogue is read from the local mirror ({self.mirror.path}).")
+
+    def _get_from_mirror(self, path, params, errors):
+        collection, _, key = path.partition("/")
+        payload = self.mirror.get(collection, key, params) if key else self.mirror.list(collection, params)
+        if payload is None:
+            # As the catalogue would, so that callers handle it the same way
+            r = requests.Response()
+            r.status_code = 404
+            r.reason = "Not Found"
+            r.url = f"{self.api_url}/{path}"
+            r._content = json.dumps({"error": f"{path} not found in the mirror"}).encode()
+            self.raise_for_status(r, errors=errors)
+        return payload
+
+    def get(self, path, params=None, errors={}, cache=True):
+        """GET a document. If the response cache is enabled and `cache` is True,
+        the request is made conditional and the cached body is returned on 304.
+        In offline mode, the document comes from the mirror.
+        """
         self.log_debug("GET", path, params)
 
+        if self.mirror is not None:
+            return self._get_from_mirror(path, params, errors)
+
         kwargs = dict()
         if params is not None:
             kwargs["params"] = params
 
-        r = make_robust(self.session.get)(f"{self.api_url}/{path}", **kwargs)
+        url = f"{self.api_url}/{path}"
+        response_cache = self.response_cache if cache else None
+        cached = None
+        if response_cache is not None:
+            key = response_cache.make_key(url, params, self.token)
+            cached = response_cache.lookup(key)
+            if cached is not None:
+                kwargs["headers"] = cached.validators()
+
+        r = make_robust(self.session.get)(url, **kwargs)
+
+        if cached is not None and r.status_code == 304:
+            LOG.debug(f"GET {path} not modified, using cached response")
+            response_cache.touch(key)
+            return cached.json()
+
         self.raise_for_status(r, errors=errors)
+        if response_cache is not None:
+            response_cache.store(key, r)
         return r.json()
 
-    def exists(self, *args, **kwargs):
+    def wait_for_change(self, path, params=None, etag=None, timeout=30):
+        """Long-poll: ask the server to hold the request until the document differs from the
+        version `etag`, for at most `timeout` seconds. Return the ETag of the current version,
+        which is `etag` if nothing changed. Servers that do not support it answer at once.
+        """
+        self._check_online("wait for", path)
+        params = dict(params or {}, _wait=int(timeout))
+        headers = {"If-None-Match": etag} if etag else {}
+        self.log_debug("GET", path, params)
+        r = self.session.get(f"{self.api_url}/{path}", params=params, headers=headers, timeout=timeout + 30)
+        if r.status_code == 304:
+            return etag
+        self.raise_for_status(r)
+        return r.headers.get("ETag")
+
+    def exists(self, path, params=None):
+        """Check if a document exists. Use a HEAD request, unless the server does not support it."""
+        if self.mirror is None and _HEAD_SUPPORTED.get(self.api_url, True):
+            self.log_debug("HEAD", path, params)
+            r = make_robust(self.session.head)(f"{self.api_url}/{path}", params=params)
+            if r.status_code in (405, 501):
+                LOG.debug(f"HEAD not supported by {self.api_url}, using GET to check existence")
+                _HEAD_SUPPORTED[self.api_url] = False
+            else:
+                if r.status_code == 404:
+                    return False
+                self.raise_for_status(r)
+                return True
+
         try:
-            self.get(*args, **kwargs)
+            self.get(path, params=params, cache=False)
             return True
         except HTTPError as e:
             if e.response.status_code == 404:
                 return False
+            raise
 
     def put(self, path, data, errors={}):
+        self._check_online("PUT", path)
         self.log_debug("PUT", path, data)
         if not data:
             raise ValueError(f"PUT data must be provided for {path}")
@@ -120,15 +295,16 @@ class Rest:
         self.raise_for_status(r, errors=errors)
         return r.json()
 
-    def patch(self, path, data, errors={}, robust=False):
+    def patch(self, path, data, errors={}, robust=False, timeout=None):
         # patch (and post) are not idempotent, so we need to be careful with retries
         # default to non-robust
         robust_ = {True: make_robust, False: lambda x: x}[robust]
 
+        self._check_online("PATCH", path)
         self.log_debug("PATCH", path, data)
         if not data:
             raise ValueError(f"PATCH data must be provided for {path}")
-        r = robust_(self.session.patch)(f"{self.api_url}/{path}", json=tidy(data))
+        r = robust_(self.session.patch)(f"{self.api_url}/{path}", json=tidy(data), timeout=timeout)
         self.raise_for_status(r, errors=errors)
         return r.json()
 
@@ -136,6 +312,7 @@ class Rest:
         # patch (and post) are not idempotent, so we need to be careful with retries
         robust_ = {True: make_robust, False: lambda x: x}[robust]
 
+        self._check_online("POST", path)
         r = robust_(self.session.post)(f"{self.api_url}/{path}", json=tidy(data))
         self.raise_for_status(r, errors=errors)
         return r.json()
@@ -146,10 +323,29 @@ class Rest:
         return self.unprotected_delete(path, errors=errors)
 
     def unprotected_delete(self, path, errors={}):
+        self._check_online("DELETE", path)
         r = make_robust(self.session.delete)(f"{self.api_url}/{path}", params=dict(force=True))
         self.raise_for_status(r, errors=errors)
         return r.json()
 
+    def unprotected_bulk_delete(self, path, keys):
+        """Delete several documents of a collection in one request. Return the keys
+        that were deleted, or None if the server does not support bulk deletion.
+        """
+        self._check_online("DELETE", path)
+        if not _BULK_DELETE_SUPPORTED.get(self.api_url, True):
+            return None
+        self.log_debug("POST", f"{path}/_delete", keys)
+        r = make_robust(self.session.post)(
+            f"{self.api_url}/{path}/_delete", json={"keys": list(keys)}, params=dict(force=True)
+        )
+        if r.status_code in (404, 405, 501):
+            LOG.debug(f"Bulk deletion not supported by {self.api_url}, deleting one by one")
+            _BULK_DELETE_SUPPORTED[self.api_url] = False
+            return None
+        self.raise_for_status(r)
+        return r.json()["deleted"]
+
     def log_debug(self, verb, collection, data):
         if len(str(data)) > 100:
             if isinstance(data, dict):
@@ -189,13 +385,7 @@ class RestItem:
         self.path = f"{collection}/{key}"
 
     def exists(self, *args, **kwargs):
-        try:
-            self.get(*args, **kwargs)
-            return True
-        except HTTPError as e:
-            if e.response.status_code == 404:
-                return False
-            raise
+        return self.rest.exists(self.path, *args, **kwargs)
 
     def get(self, *args, **kwargs):
         return self.rest.get(self.path, *args, **kwargs)
@@ -219,13 +409,44 @@ class RestItem:
 class RestItemList:
     """List of catalogue entries from REST API."""
 
-    def __init__(self, collection):
+    def __init__(self, collection, fields=None, where=None):
         self.collection = collection
         self.rest = Rest()
         self.path = collection
-
-    def get(self, *args, **kwargs):
-        return self.rest.get(self.path, *args, **kwargs)
+        self.fields = parse_fields(fields)
+        self.where = where
+
+    def get(self, params=None, fields=None, where=None, **kwargs):
+        """Get the list. If `fields` is given, only these fields of each element are requested.
+        Servers that ignore the projection send full records, which are then projected here.
+        With `where`, only the elements matching this query are returned, see `anemoi.registry.query`.
+        """
+        fields = parse_fields(fields) or self.fields
+        where = where or self.where
+        if where:
+            return self._get_where(params, fields, where, **kwargs)
+        return self._get(params, fields, **kwargs)
+
+    def _get(self, params, fields, **kwargs):
+        if not fields:
+            return self.rest.get(self.path, params=params, **kwargs)
+
+        params = dict(params or {})
+        params["_fields"] = ",".join(fields)
+        return [project(v, fields) for v in self.rest.get(self.path, params=params, **kwargs)]
+
+    def _get_where(self, params, fields, where, **kwargs):
+        from .query import Query
+
+        query = Query.compile(where)
+        if self.rest.mirror is not None:
+            params = dict(params or {}, **({"_fields": ",".join(fields)} if fields else {}))
+            return self.rest.mirror.list(self.collection, params, where=query)
+
+        # Only the fields needed to evaluate the query are requested, in addition to those asked for
+        needed = query.fields()
+        records = query.filter(self._get(params, None if needed is None or not fields else fields + needed, **kwargs))
+        return [project(v, fields) for v in records] if fields else records
 
     def __len__(self):
         return len(self.get())
@@ -10,17 +10,48 @@
 
 import datetime
 import logging
+import random
+import time
+from collections import Counter
 
 from anemoi.utils.humanize import when
 from anemoi.utils.text import table
+from requests.exceptions import HTTPError
 
 from anemoi.registry.entry import CatalogueEntry
+from anemoi.registry.entry import CatalogueEntryNotFound
+from anemoi.registry.entry import PatchConflict
 from anemoi.registry.rest import RestItemList
 from anemoi.registry.rest import trace_info
 from anemoi.registry.utils import list_to_dict
+from anemoi.registry.utils import parse_fields
 
 LOG = logging.getLogger(__name__)
 
+BULK_DELETE_SIZE = 500
+
+# Number of queued tasks among which a worker picks the ones it tries to claim
+CLAIM_WINDOW = 32
+
+# Claim attempts, successes, conflicts with other workers, and time spent, see `TaskCatalogueEntryList.claim`
+CLAIM_STATS = Counter()
+
+# Scans of running tasks, and stale tasks requeued, see `TaskCatalogueEntryList.reap`
+REAP_STATS = Counter()
+
+
+class ClaimContended(Exception):
+    """No task could be claimed because other workers took them first, the queue is not empty."""
+
+
+def _progress(progress):
+    # progress can be a dict or an int
+    if isinstance(progress, int):
+        if not (0 <= progress <= 100):
+            raise ValueError("Progress must be between 0 and 100")
+        progress = dict(percent=progress)
+    return progress
+
 
 class TaskCatalogueEntryList:
     """List of task catalogue entries."""
@@ -28,7 +59,7 @@ class TaskCatalogueEntryList:
     collection = "tasks"
     main_key = "uuid"
 
-    def __init__(self, *args, sort="updated", **kwargs):
+    def __init__(self, *args, sort="updated", fields=None, **kwargs):
         if args:
             for k, v in list_to_dict(args).items():
                 if k in kwargs:
@@ -36,24 +67,109 @@ class TaskCatalogueEntryList:
                 kwargs[k] = v
         self.kwargs = kwargs
         self.sort = sort
+        self.fields = parse_fields(fields)
 
     @classmethod
     def rest_collection(cls):
         return RestItemList(cls.collection)
 
-    def get(self):
-        data = self.rest_collection().get(params=self.kwargs)
-        return sorted(data, key=lambda x: x[self.sort])
+    def _fields(self, fields=None):
+        fields = parse_fields(fields) or self.fields
+        if not fields:
+            return None
+        # The uuid and the sort key are always needed
+        return list(dict.fromkeys([self.main_key, self.sort] + fields))
+
+    def get(self, fields=None, limit=None, newest=False):
+        """Get the tasks, sorted by `self.sort`. With `limit`, only the oldest (or `newest`)
+        ones are returned, the server is asked to do the truncation if it can.
+        """
+        params = self.kwargs
+        if limit is not None:
+            params = dict(params, _limit=limit, _sort=f"-{self.sort}" if newest else self.sort)
+        data = self.rest_collection().get(params=params, fields=self._fields(fields))
+        data = sorted(data, key=lambda x: x[self.sort], reverse=newest)
+        return data if limit is None else data[:limit]
 
     def __iter__(self):
+        fields = self._fields()
         for v in self.get():
-            yield TaskCatalogueEntry(key=v["uuid"])
+            yield TaskCatalogueEntry.from_list_payload(v, fields=fields)
 
     def __getitem__(self, key):
         return list(self)[key]
 
+    def keys(self):
+        return [v[self.main_key] for v in self.get(fields=[self.main_key])]
+
+    def wait_for_change(self, etag=None, timeout=30):
+        """Wait until the list of tasks changes, see `Rest.wait_for_change`."""
+        params = dict(self.kwargs, _fields=self.main_key)
+        return self.rest_collection().rest.wait_for_change(self.collection, params=params, etag=etag, timeout=timeout)
+
+    def delete_many(self, uuids, max_concurrency=None, progress=None):
+        """Delete the given tasks, in bulk requests if the server supports them, otherwise
+        with several requests in flight. `progress(done, total)` is called as they complete.
+        Return the number of tasks deleted, missing (already deleted) and failed.
+        """
+        from anemoi.registry.async_rest import AsyncRest
+        from anemoi.registry.async_rest import run
+
+        return run(self._adelete_many(list(uuids), AsyncRest(max_concurrency=max_concurrency), progress))
+
+    async def _adelete_many(self, uuids, rest, progress):
+        import asyncio
+
+        from anemoi.registry.async_rest import AsyncRestItem
+
+        counts = Counter(deleted=0, missing=0, failed=0)
+
+        def done(status, n=1):
+            counts[status] += n
+            if progress is not None:
+                progress(counts.total(), len(uuids))
+
+        async def delete_chunk(chunk):
+            try:
+                deleted = await rest.unprotected_bulk_delete(self.collection, chunk)
+            except HTTPError as e:
+                # The other chunks are still deleted
+                LOG.error(f"{len(chunk)} tasks not deleted ({', '.join(chunk)}): {e}")
+                done("failed", len(chunk))
+                return True
+            if deleted is None:
+                return False
+            done("deleted", len(deleted))
+            done("missing", len(chunk) - len(deleted))
+            return True
+
+        async def delete_one(uuid):
+            try:
+                await AsyncRestItem(self.collection, uuid, rest=rest).unprotected_delete()
+                done("deleted")
+            except HTTPError as e:
+                if e.response.status_code == 404:
+                    LOG.warning(f"Task {uuid} not found.")
+                    done("missing")
+                else:
+                    LOG.error(f"Task {uuid} not deleted: {e}")
+                    done("failed")
+
+        chunks = [uuids[i : i + BULK_DELETE_SIZE] for i in range(0, len(uuids), BULK_DELETE_SIZE)]
+        # The first request tells whether the server supports bulk deletion
+        if chunks and await delete_chunk(chunks[0]):
+            await asyncio.gather(*[delete_chunk(chunk) for chunk in chunks[1:]])
+        else:
+            await asyncio.gather(*[delete_one(uuid) for uuid in uuids])
+
+        return counts
+
     def __len__(self):
-        return len(self.get())
+        return self.count()
+
+    def count(self, limit=None):
+        """Number of tasks in the list, counting at most `limit`. Only their uuids are fetched."""
+        return len(self.get(fields=[self.main_key], limit=limit))
 
     def add_new_task(self, **kwargs):
         kwargs = kwargs.copy()
@@ -66,20 +182,107 @@ class TaskCatalogueEntryList:
         return uuid
 
     def take_last(self):
-        uuids = [v["uuid"] for v in self.get()]
-        if not uuids:
+        try:
+            claimed = self.claim(newest=True)
+        except ClaimContended as e:
+            LOG.info(f"{e}.")
+            return
+        if not claimed:
             LOG.info("No available task has been found.")
             return
-        latest = uuids[-1]
+        return claimed[0].key
+
+    def claim(self, count=1, window=CLAIM_WINDOW, newest=False, rounds=5):
+        """Take ownership of up to `count` of the tasks, and return them.
+
+        Only a window of the oldest (or `newest`) tasks is listed, and they are tried in random
+        order, so that workers polling the same queue do not all race for the same task. After
+        a conflict with another worker the window is listed again, up to `rounds` times, as the
+        rest of it is likely to be out of date too. Raise ClaimContended if all of them are lost.
+        """
+        start = time.monotonic()
+        window = max(window, count)
+        claimed = []
+        for _ in range(rounds):
+            candidates = [v[self.main_key] for v in self.get(fields=[self.main_key], limit=window, newest=newest)]
+            random.shuffle(candidates)
+            conflict = False
+            for uuid in candidates:
+                if len(claimed) == count:
+                    break
+                CLAIM_STATS["attempts"] += 1
+                task = TaskCatalogueEntry(key=uuid, lazy=True)
+                try:
+                    task.take_ownership()
+                except (PatchConflict, CatalogueEntryNotFound):
+                    # Taken or deleted by someone else in the meantime
+                    CLAIM_STATS["conflicts"] += 1
+                    conflict = True
+                    break
+                CLAIM_STATS["claimed"] += 1
+                claimed.append(task)
+
+            if len(claimed) == count or not conflict:
+                break
+
+        elapsed = time.monotonic() - start
+        CLAIM_STATS["seconds"] += elapsed
+        LOG.debug(f"Claimed {len(claimed)} task(s) in {elapsed:.3f}s")
+        if not claimed and conflict:
+            raise ClaimContended(f"All the tasks tried were taken by other workers in {rounds} rounds")
+        return claimed
 
-        entry = TaskCatalogueEntry(key=latest)
-        res = entry.take_ownership()
-        LOG.debug(f"Task {latest} taken: {res}")
-        return res["uuid"]
+    def reap(self, max_no_heartbeat, dry_run=False):
+        """Requeue the tasks of the list that have not been updated for more than `max_no_heartbeat`
+        seconds, and return their uuids. The tasks are listed in one request, and each one is released
+        with a patch that fails if a heartbeat arrived in the meantime.
+        """
+        REAP_STATS["scans"] += 1
+        now = datetime.datetime.utcnow()
+        reaped = []
+        for v in self.get(fields=[self.main_key, "updated"]):
+            REAP_STATS["running"] += 1
+            updated = datetime.datetime.fromisoformat(v["updated"])
+            if (now - updated).total_seconds() <= max_no_heartbeat:
+                continue
+
+            uuid = v[self.main_key]
+            REAP_STATS["stale"] += 1
+            if dry_run:
+                LOG.warning(
+                    f"Would requeue task {uuid}, last update {when(updated, use_utc=True)}, but this is a dry run."
+                )
+                continue
+
+            task = TaskCatalogueEntry(key=uuid, lazy=True)
+            try:
+                task.release_ownership(updated=v["updated"])
+            except PatchConflict:
+                # A heartbeat arrived, or another reaper was faster
+                LOG.info(f"Task {uuid} was updated in the meantime, not requeued.")
+                REAP_STATS["revived"] += 1
+                continue
+            except CatalogueEntryNotFound:
+                REAP_STATS["missing"] += 1
+                continue
+            except Exception as e:
+                LOG.error(f"Could not requeue task {uuid}: {e}")
+                REAP_STATS["failed"] += 1
+                continue
+
+            LOG.warning(f"Task {uuid} requeued, no heartbeat for more than {max_no_heartbeat}s.")
+            REAP_STATS["reaped"] += 1
+            reaped.append(uuid)
+
+        return reaped
 
     def to_str(self, long):
         rows = []
-        for v in self.get():
+        # Without --long, only the columns of the table are needed
+        fields = (
+            None if long else ["created", "updated", "status", "progress", "action", "source", "destination", "dataset"]
+        )
+        for v in self.get(fields=fields):
             if not isinstance(v, dict):
                 raise ValueError(v)
             created = datetime.datetime.fromisoformat(v.pop("created"))
@@ -87,7 +290,12 @@ class TaskCatalogueEntryList:
 
             uuid = v.pop("uuid")
             status = v.pop("status")
-            progress = v.pop("progress", {}).get("percentage", "")
+            progress = v.pop("progress", {})
+            percentage = progress.get("percentage", progress.get("percent", ""))
+            if isinstance(percentage, (int, float)):
+                percentage = f"{percentage:.1f}"
+            eta = progress.get("eta")
+            eta = when(datetime.datetime.fromisoformat(eta), use_utc=True) if eta else ""
             action = v.pop("action", "")
             source = v.pop("source", "")
             destination = v.pop("destination", "")
@@ -100,14 +308,15 @@ class TaskCatalogueEntryList:
                 source,
                 destination,
                 dataset,
-                progress,
+                percentage,
+                eta,
                 uuid,
             ]
             rows.append(row)
             if long:
                 content = " ".join(f"{k}={v}" for k, v in v.items())
                 row.append(content)
-        cols = ["Created", "Updated", "Status", "Action", "Src", "Dest", "Dataset", "%", "UUID"]
+        cols = ["Created", "Updated", "Status", "Action", "Src", "Dest", "Dataset", "%", "ETA", "UUID"]
         if long:
             cols.append("More")
 
@@ -136,9 +345,12 @@ class TaskCatalogueEntry(CatalogueEntry):
             ]
         )
 
-    def release_ownership(self):
+    def release_ownership(self, updated=None):
+        """Put the task back in the queue. With `updated`, only if it has not been updated since."""
+        tests = [] if updated is None else [{"op": "test", "path": "/updated", "value": updated}]
         self.patch(
-            [
+            tests
+            + [
                 {"op": "test", "path": "/status", "value": "running"},
                 {"op": "replace", "path": "/status", "value": "queued"},
                 {"op": "remove", "path": "/worker"},
@@ -146,15 +358,19 @@ class TaskCatalogueEntry(CatalogueEntry):
         )
 
     def set_progress(self, progress):
-        # progress can be a dict or an int
-        if isinstance(progress, int):
-            if not (0 <= progress <= 100):
-                raise ValueError("Progress must be between 0 and 100")
-            progress = dict(percent=progress)
         self.patch(
             [
                 {"op": "test", "path": "/status", "value": "running"},
-                {"op": "add", "path": "/progress", "value": progress},
+                {"op": "add", "path": "/progress", "value": _progress(progress)},
             ],
             robust=True,
         )
+
+    def heartbeat(self, progress=None, timeout=None):
+        """Mark the task as still running, with its latest progress if any, in a single PATCH.
+        It is not resent on errors, and fails after `timeout` seconds if given.
+        """
+        patch = [{"op": "add", "path": "/status", "value": "running"}]
+        if progress is not None:
+            patch.append({"op": "add", "path": "/progress", "value": _progress(progress)})
+        self.patch(patch, timeout=timeout)
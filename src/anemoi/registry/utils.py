@@ -15,3 +15,38 @@ def list_to_dict(lst):
         if "=" not in x:
             raise ValueError(f"Invalid key-value pairs format '{x}', use 'key1=value1 key2=value2' list.")
     return {x.split("=")[0]: x.split("=")[1] for x in lst}
+
+
+def parse_fields(fields):
+    """Return a list of field names from a comma separated string or a list, or None."""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [f.strip() for f in fields if f.strip()]
+
+
+def project(record, fields):
+    """Keep only the given fields of a record. Nested fields use dots, e.g. 'metadata.updated'."""
+    result = {}
+    for field in fields:
+        src, dst = record, result
+        *parents, last = field.split(".")
+        for p in parents:
+            if not isinstance(src, dict) or p not in src:
+                break
+            src = src[p]
+            dst = dst.setdefault(p, {})
+        else:
+            if isinstance(src, dict) and last in src:
+                dst[last] = src[last]
+    return result
+
+
+def lookup(record, field):
+    """The value of a field of a record, nested fields use dots. None if it is missing."""
+    for p in field.split("."):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(p)
+    return record
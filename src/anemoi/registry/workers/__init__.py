@@ -7,17 +7,22 @@
 # granted to it by virtue of its status as an intergovernmental organisation
 # nor does it submit to any jurisdiction.
 
-import datetime
 import logging
 import os
+import random
 import signal
 import sys
 import threading
 import time
-
-from anemoi.utils.humanize import when
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
 
 from anemoi.registry import config
+from anemoi.registry.entry import CatalogueEntryNotFound
+from anemoi.registry.metrics import METRICS
+from anemoi.registry.tasks import CLAIM_STATS
+from anemoi.registry.tasks import ClaimContended
 from anemoi.registry.tasks import TaskCatalogueEntry
 from anemoi.registry.tasks import TaskCatalogueEntryList
 
@@ -26,26 +31,178 @@ from anemoi.registry.tasks import TaskCatalogueEntryList
 LOG = logging.getLogger(__name__)
 
 
+class TaskInterrupted(Exception):
+    """Raised in a task that is stopped before completion, it is put back in the queue."""
+
+
+class Backoff:
+    """Delay between polls: `min_wait` while there is work, then growing exponentially,
+    with some jitter so that workers spread out, up to `max_wait`.
+    """
+
+    def __init__(self, min_wait, max_wait, factor=2, jitter=0.25):
+        self.min_wait = min_wait
+        self.max_wait = max(min_wait, max_wait)
+        self.factor = factor
+        self.jitter = jitter
+        self.interval = min_wait
+
+    def reset(self):
+        self.interval = self.min_wait
+
+    def next(self):
+        delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.interval = min(self.interval * self.factor, self.max_wait)
+        return min(delay, self.max_wait)
+
+
+class Heartbeat:
+    """A single thread sending the heartbeats of all the tasks being processed: one PATCH
+    per task every `interval` seconds, which also carries the latest progress reported in
+    the meantime. While the catalogue is slow or failing, the interval of a task is doubled,
+    up to `max_interval`.
+    """
+
+    def __init__(self, interval, send, max_interval=None, slow=5):
+        self.interval = interval
+        self.max_interval = max(interval, max_interval or 4 * interval)
+        self.slow = slow
+        self.send = send
+        self.beats = {}
+        self.changed = threading.Condition()
+        self.thread = None
+        # The task whose heartbeat is being sent, without the lock held
+        self.sending = None
+
+    def add(self, task):
+        with self.changed:
+            self.beats[task.key] = dict(
+                task=task, due=time.monotonic(), interval=self.interval, progress=None, last=None
+            )
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+                self.thread.start()
+            self.changed.notify_all()
+
+    def remove(self, task):
+        with self.changed:
+            self.beats.pop(task.key, None)
+            # A heartbeat landing after the task is released would mark it as running again
+            while self.sending == task.key:
+                self.changed.wait()
+            self.changed.notify_all()
+
+    def report(self, task, progress):
+        """Set the progress of a task, it is sent with the next heartbeat."""
+        with self.changed:
+            if task.key in self.beats:
+                self.beats[task.key]["progress"] = progress
+
+    def _run(self):
+        with self.changed:
+            while self.beats:
+                key = min(self.beats, key=lambda k: self.beats[k]["due"])
+                beat = self.beats[key]
+                delay = beat["due"] - time.monotonic()
+                if delay > 0:
+                    self.changed.wait(delay)
+                    continue
+
+                progress, beat["progress"] = beat["progress"], None
+                self.sending = key
+                # Sent without the lock, so that the other tasks are not held up by a slow catalogue
+                self.changed.release()
+                try:
+                    outcome = self._beat(key, beat["task"], progress)
+                finally:
+                    self.changed.acquire()
+                    self.sending = None
+                    self.changed.notify_all()
+                if self.beats.get(key) is beat:
+                    self._reschedule(key, beat, progress, *outcome)
+            self.thread = None
+
+    def _beat(self, key, task, progress):
+        start = time.monotonic()
+        try:
+            self.send(task, progress)
+        except CatalogueEntryNotFound:
+            LOG.warning(f"Task {key} does not exist anymore, stopping its heartbeat.")
+            return None, True
+        except Exception as e:
+            LOG.error(f"Heartbeat for task {key} failed: {e}")
+            return None, False
+        return time.monotonic() - start, False
+
+    def _reschedule(self, key, beat, progress, elapsed, gone):
+        if gone:
+            del self.beats[key]
+            return
+
+        now = time.monotonic()
+        if elapsed is None:
+            # Failed, the progress is sent with the next one unless there is a newer one
+            if beat["progress"] is None:
+                beat["progress"] = progress
+            slow = True
+        else:
+            slow = elapsed > self.slow
+            if beat["last"] is not None:
+                METRICS.observe("heartbeat_lag_seconds", now - beat["last"])
+            beat["last"] = now
+
+        if slow:
+            beat["interval"] = min(2 * beat["interval"], self.max_interval)
+            LOG.warning(f"The catalogue is slow, next heartbeat for task {key} in {beat['interval']}s.")
+        else:
+            beat["interval"] = self.interval
+        beat["due"] = now + beat["interval"]
+
+
 class Worker:
     """Base class for a worker that processes tasks in the queue."""
 
     name = None
+    # Not resent on errors: the next heartbeat is delayed instead, see `Heartbeat`
+    heartbeat_timeout = 30
+    # Longest pause before claiming again, when the tasks were all taken by other workers
+    contended_wait = 1
 
     def __init__(
         self,
         heartbeat,
         max_no_heartbeat,
         wait,
+        max_wait=300,
+        long_poll=False,
         loop=False,
         check_todo=False,
         timeout=None,
         timeout_exit_code=None,
+        timeout_grace=60,
         dry_run=False,
+        slots=1,
+        reap=True,
+        metrics_port=None,
+        metrics_address="127.0.0.1",
+        metrics_textfile=None,
+        metrics_interval=15,
         **kwargs,
     ):
         """Run a worker that will process tasks in the queue.
-        timeout: Kill itself after `timeout` seconds.
-        wait: When no task is found, wait `wait` seconds before checking again.
+        timeout: After `timeout` seconds, stop claiming tasks, interrupt the ones in progress and release
+          them, then exit with `timeout_exit_code`. The process group is killed if this takes more than
+          `timeout_grace` seconds.
+        wait: When no task is found, wait `wait` seconds before checking again,
+          then twice as long each time, up to `max_wait` seconds.
+        long_poll: Wait for the queue to change instead of sleeping, if the catalogue supports it.
+        slots: Number of tasks processed in parallel, in threads of this process.
+        reap: When idle, requeue the running tasks without heartbeat for `max_no_heartbeat` seconds.
+          Can be disabled when a `reaper` worker is running.
+        metrics_port: Serve the metrics of the worker on http://<metrics_address>:<metrics_port>/metrics.
+        metrics_address: Address the metrics are served on, the loopback interface by default.
+        metrics_textfile: Write the metrics to that file every `metrics_interval` seconds, for node-exporter.
+          "{pid}" in the path is replaced by the process id.
         """
         if kwargs:
             LOG.warning(f"Unknown arguments for Worker: {kwargs}")
@@ -55,21 +212,39 @@ class Worker:
         self.loop = loop
         self.check_todo = check_todo
         self.dry_run = dry_run
+        self.reap = reap
+        self.metrics_port = metrics_port
+        self.metrics_address = metrics_address
+        # Workers of a node writing to the same directory need different files
+        self.metrics_textfile = metrics_textfile.format(pid=os.getpid()) if metrics_textfile else None
+        self.metrics_interval = metrics_interval
 
         self.wait = wait
-
+        self.max_wait = max_wait
+        self.long_poll = long_poll
+        self._queue_etag = None
+
+        self.slots = slots
+        # Heartbeats are late when the catalogue is slow, but not enough for the task to be freed
+        max_interval = max_no_heartbeat / 2 if max_no_heartbeat and max_no_heartbeat > 0 else None
+        self.heartbeats = Heartbeat(heartbeat, self.send_heartbeat, max_interval=max_interval)
+        self._stopping = threading.Event()
+        self._in_flight = {}
+
+        self.timeout_grace = timeout_grace
+        self.timeout_exit_code = 128 + signal.SIGALRM if timeout_exit_code is None else int(timeout_exit_code)
+        self._timed_out = threading.Event()
+        self._active = {}
         if timeout:
-
-            def timeout_handler(signum, frame):
-                # need to kill the process group to make sure all children are killed
-                # especially when using multiprocessing/threads/Popens
-                LOG.warning("Timeout reached, sending SIGHUP to the process group.")
-                os.killpg(os.getpgrp(), signal.SIGHUP)
-
-            signal.signal(signal.SIGALRM, timeout_handler)
+            signal.signal(signal.SIGALRM, self._soft_timeout)
             signal.alarm(timeout)
 
-        self.filter_tasks = {"action": self.name}
+        self.filter_tasks = self.tasks_filter()
+
+    @classmethod
+    def tasks_filter(cls, **kwargs):
+        """The filter of the tasks claimed by a worker created with these arguments."""
+        return {"action": cls.name}
 
     def run(self):
 
@@ -85,17 +260,34 @@ class Worker:
                 LOG.info("No tasks to do.")
                 sys.exit(1)
 
-        if self.loop:
-            # Process tasks in a loop for ever
-            while True:
+        self.export_metrics()
+
+        if self.loop and threading.current_thread() is threading.main_thread():
+            # SIGTERM or SIGHUP stop the claims and wait for the tasks in progress
+            for signum in (signal.SIGTERM, signal.SIGHUP):
+                signal.signal(signum, self._drain)
+
+        if self.slots > 1:
+            self.run_slots()
+
+        elif self.loop:
+            # Process tasks in a loop until stopped
+            backoff = Backoff(self.wait, self.max_wait)
+            while not self._stopping.is_set():
                 try:
-                    self.process_one_task()
-                    LOG.info(f"Waiting {self.wait} seconds before checking again.")
-                    time.sleep(self.wait)
+                    if self.process_one_task():
+                        # There may be more, check again at once
+                        backoff.reset()
+                        continue
+                except ClaimContended as e:
+                    # The queue is not empty, try again soon
+                    LOG.info(f"{e}, retrying.")
+                    self.pause(random.uniform(0, self.contended_wait))
+                    continue
                 except Exception as e:
-                    LOG.error(f"Error for task {task}: {e}")
-                    LOG.error("Waiting 60 seconds after this error before checking again.")
-                    time.sleep(60)
+                    LOG.error(f"Error: {e}")
+                # No task, or it failed and was released: do not claim it again at once
+                self.pause(backoff.next())
 
         else:
             # Process one task
@@ -112,51 +304,219 @@ class Worker:
                         LOG.error("No more retries left.")
                         raise
 
+        self.finish()
+
+    def finish(self):
+        """Write the metrics, and exit with `timeout_exit_code` if the timeout was reached."""
+        if self.metrics_textfile:
+            METRICS.write_textfile(self.metrics_textfile)
+
+        if self._timed_out.is_set():
+            LOG.warning(f"Exiting after timeout with code {self.timeout_exit_code}.")
+            sys.exit(self.timeout_exit_code)
+
+    def export_metrics(self):
+        if self.metrics_port and METRICS.server is None:
+            try:
+                METRICS.serve(self.metrics_port, self.metrics_address)
+            except OSError as e:
+                # e.g. another worker of the node has it, the textfile can be used instead
+                LOG.error(f"Cannot serve metrics on port {self.metrics_port}: {e}")
+        if self.metrics_textfile:
+            METRICS.write_textfile_every(self.metrics_textfile, self.metrics_interval)
+
+    def run_slots(self):
+        """Keep up to `self.slots` tasks in flight, in a pool of threads. Without `loop`, process only
+        the tasks claimed at once.
+        """
+        backoff = Backoff(self.wait, self.max_wait)
+        with ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="slot") as pool:
+            while not self._stopping.is_set():
+                completed = failed = 0
+                for future in [f for f in self._in_flight if f.done()]:
+                    task = self._in_flight.pop(future)
+                    if future.exception() is not None:
+                        LOG.error(f"Error for task {task.key}: {future.exception()}")
+                        failed += 1
+                    elif future.result():
+                        completed += 1
+                    else:
+                        failed += 1
+
+                if failed and self.loop:
+                    # The failed tasks are back in the queue, do not claim them again at once
+                    self.pause(backoff.next())
+                    if self._stopping.is_set():
+                        break
+                elif completed:
+                    backoff.reset()
+
+                free = self.slots - len(self._in_flight)
+                claimed = []
+                contended = False
+                if free:
+                    try:
+                        claimed = self.claim_tasks(free)
+                    except ClaimContended as e:
+                        LOG.info(f"{e}, retrying.")
+                        contended = True
+                    except Exception as e:
+                        LOG.error(f"Error: {e}")
+                for task in claimed:
+                    self._in_flight[pool.submit(self.process_claimed_task, task)] = task
+
+                if not self.loop:
+                    break
+                if claimed:
+                    # There may be more, check again at once
+                    continue
+                if len(self._in_flight) == self.slots:
+                    wait_for_futures(self._in_flight, timeout=1, return_when=FIRST_COMPLETED)
+                elif contended:
+                    # The queue is not empty, try again soon
+                    self.pause(random.uniform(0, self.contended_wait))
+                else:
+                    self.pause(backoff.next())
+
+            if self._in_flight:
+                LOG.info(f"Waiting for {len(self._in_flight)} task(s) in flight.")
+
+    def stop(self):
+        """Stop claiming tasks, the ones in flight are completed."""
+        self._stopping.set()
+
+    def _drain(self, signum, frame):
+        if self._stopping.is_set():
+            LOG.warning(f"Received signal {signum} again, releasing the tasks in progress and exiting.")
+            self._release_active()
+            os._exit(128 + signum)
+
+        LOG.warning(
+            f"Received signal {signum}, completing the {len(self._active)} task(s) in progress."
+            " Send it again to exit now."
+        )
+        self.stop()
+
+    def _soft_timeout(self, signum, frame):
+        LOG.warning(
+            f"Timeout reached, interrupting and releasing the {len(self._active)} task(s) in progress."
+            f" The process group is killed in {self.timeout_grace}s if they are not done by then."
+        )
+        self._timed_out.set()
+        self.stop()
+        if self.timeout_grace > 0:
+            signal.signal(signal.SIGALRM, self._hard_timeout)
+            signal.alarm(self.timeout_grace)
+        else:
+            self._hard_timeout(signum, frame)
+
+    def _hard_timeout(self, signum, frame):
+        LOG.warning("Grace period after timeout is over, releasing the tasks in progress and exiting.")
+        self._release_active()
+        # need to kill the process group to make sure all children are killed
+        # especially when using multiprocessing/threads/Popens
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        os.killpg(os.getpgrp(), signal.SIGHUP)
+        os._exit(self.timeout_exit_code)
+
+    def _release_active(self):
+        for task in list(self._active.values()):
+            # Stop the heartbeat first, it would mark the task as running again
+            self.heartbeats.remove(task)
+            try:
+                self.release_ownership(task)
+            except Exception as e:
+                LOG.error(f"Could not release task {task.key}: {e}")
+
+    def check_interrupted(self):
+        """Raise TaskInterrupted once the timeout is reached. Called by tasks that can stop early
+        and be resumed by the next worker.
+        """
+        if self._timed_out.is_set():
+            raise TaskInterrupted("Timeout reached")
+
+    def pause(self, delay):
+        """Wait `delay` seconds, or less when long-polling and the queue changes in the meantime."""
+        if self.long_poll:
+            start = time.monotonic()
+            queue = TaskCatalogueEntryList(status="queued", **self.filter_tasks)
+            try:
+                etag = queue.wait_for_change(self._queue_etag, timeout=delay)
+            except Exception as e:
+                LOG.error(f"Error while waiting for the queue to change: {e}")
+                etag = self._queue_etag
+            if etag is None:
+                LOG.warning("The catalogue does not support long-polling, polling instead.")
+                self.long_poll = False
+            elif etag != self._queue_etag:
+                self._queue_etag = etag
+                LOG.info("The queue has changed, checking again.")
+                return
+            delay -= time.monotonic() - start
+
+        if delay > 0:
+            LOG.info(f"Waiting {delay:.1f} seconds before checking again.")
+            self._stopping.wait(delay)
+
     def process_one_task(self):
-        task = self.choose_task()
+        """Claim a task and process it, return True if it was completed, False if there is none
+        or if it failed.
+        """
+        task = self.claim_task()
         if not task:
-            return
+            return False
+
+        return self.process_claimed_task(task)
 
+    def process_claimed_task(self, task):
+        """Process a task owned by this worker, and delete it once done or release it on failure.
+        Return True if it was completed.
+        """
+        self._active[task.key] = task
+        try:
+            return self._process_claimed_task(task)
+        finally:
+            self._active.pop(task.key, None)
+
+    def _process_claimed_task(self, task):
         uuid = task.key
         LOG.info(f"Processing task {uuid}: {task}")
-        self.parse_task(task)  # for checking only
+        try:
+            self.parse_task(task)  # for checking only
+        except Exception:
+            self.release_ownership(task)
+            raise
 
-        self.take_ownership(task)
+        start = time.monotonic()
         try:
             self.process_task_with_heartbeat(task)
+        except TaskInterrupted as e:
+            LOG.warning(f"Task {uuid} interrupted ({e}), putting it back in the queue.")
+            self._task_done(start, "interrupted")
+            self.release_ownership(task)
+            return False
         except Exception as e:
             LOG.error(f"Error for task {task}: {e}")
             LOG.exception("Exception occurred during task processing:", exc_info=e)
+            self._task_done(start, "failed")
             self.release_ownership(task)
-            return
+            return False
         LOG.info(f"Task {uuid} completed.")
+        self._task_done(start, "completed")
         self.unregister(task)
         LOG.info(f"Task {uuid} deleted.")
+        return True
 
-    def process_task_with_heartbeat(self, task):
-        STOP = []
-
-        # create another thread to send heartbeat
-        def send_heartbeat():
-            while True:
-                try:
-                    self.set_status(task, "running")
-                except Exception:
-                    return
-                for _ in range(self.heartbeat):
-                    time.sleep(1)
-                    if len(STOP) > 0:
-                        STOP.pop()
-                        return
-
-        thread = threading.Thread(target=send_heartbeat)
-        thread.start()
+    def _task_done(self, start, event):
+        METRICS.inc("tasks_total", action=self.name, event=event)
+        METRICS.observe("task_seconds", time.monotonic() - start, action=self.name, event=event)
 
+    def process_task_with_heartbeat(self, task):
+        self.heartbeats.add(task)
         try:
             self.worker_process_task(task)
         finally:
-            STOP.append(1)  # stop the heartbeat thread
-            thread.join()
+            self.heartbeats.remove(task)
 
     @classmethod
     def parse_task(cls, task: TaskCatalogueEntry, *keys: list[str]):
@@ -172,37 +532,61 @@ class Worker:
             value = data.pop(k)
             assert is_alphanumeric(value), (k, value)
         for k in data:
-            if k not in ("action", "status", "progress", "created", "updated", "uuid"):
+            if k not in ("action", "status", "progress", "created", "updated", "uuid", "worker"):
                 LOG.warning(f"Unknown key {k}=data[k]")
         return [task.record[k] for k in keys]
 
     def choose_task(self):
-        for task in TaskCatalogueEntryList(status="queued", **self.filter_tasks):
+        # Only look at the oldest queued task
+        for task in TaskCatalogueEntryList(status="queued", **self.filter_tasks).get(limit=1):
             LOG.info("Found task")
-            return task
+            return TaskCatalogueEntry.from_list_payload(task)
         LOG.info(f"No queued tasks found with filter_tasks={self.filter_tasks}")
+        self.free_dead_tasks()
 
-        if self.max_no_heartbeat == 0:
-            return None
+    def claim_task(self):
+        """Take ownership of one of the oldest queued tasks, and return it."""
+        claimed = self.claim_tasks(1)
+        return claimed[0] if claimed else None
 
-        cat = TaskCatalogueEntryList(status="running", **self.filter_tasks)
-        if not cat:
-            LOG.info("No queued tasks found")
-        else:
-            LOG.info(f"Tasks list \n{cat.to_str(long=True)}")
-
-        # if a task is running, check if it has been running for too long, and free it
-        for task in cat:
-            updated = datetime.datetime.fromisoformat(task.record["updated"])
-            LOG.info(f"Task {task.key} is already running, last update {when(updated, use_utc=True)}.")
-            if (
-                self.max_no_heartbeat >= 0
-                and (datetime.datetime.utcnow() - updated).total_seconds() > self.max_no_heartbeat
-            ):
-                LOG.warning(
-                    f"Task {task.key} has been running for more than {self.max_no_heartbeat} seconds, freeing it."
+    def claim_tasks(self, count):
+        """Take ownership of up to `count` of the oldest queued tasks, and return them. Raise
+        ClaimContended if other workers took them all.
+        """
+        if self.dry_run:
+            task = self.choose_task()
+            if task:
+                self.take_ownership(task)
+                return [task]
+            return []
+
+        stats = CLAIM_STATS.copy()
+        try:
+            # ClaimContended is passed on, there is no need to look for dead tasks
+            claimed = TaskCatalogueEntryList(status="queued", **self.filter_tasks).claim(count)
+        finally:
+            attempts = CLAIM_STATS["attempts"] - stats["attempts"]
+            conflicts = CLAIM_STATS["conflicts"] - stats["conflicts"]
+            latency = CLAIM_STATS["seconds"] - stats["seconds"]
+            if attempts:
+                LOG.info(
+                    f"Claim took {latency:.3f}s, {conflicts}/{attempts} attempts lost to other workers"
+                    f" (overall {CLAIM_STATS['conflicts']}/{CLAIM_STATS['attempts']})"
                 )
-                self.release_ownership(task)
+        if claimed:
+            METRICS.inc("tasks_total", len(claimed), action=self.name, event="claimed")
+            return claimed
+
+        LOG.info(f"No queued tasks found with filter_tasks={self.filter_tasks}")
+        self.free_dead_tasks()
+        return []
+
+    def free_dead_tasks(self):
+        """Requeue the running tasks that have no heartbeat any more, and return their uuids."""
+        if not self.reap or self.max_no_heartbeat <= 0:
+            return []
+        running = TaskCatalogueEntryList(status="running", **self.filter_tasks)
+        return running.reap(self.max_no_heartbeat, dry_run=self.dry_run)
 
     def take_ownership(self, task):
         if self.dry_run:
@@ -215,6 +599,7 @@ class Worker:
             LOG.warning(f"Would release ownership of task {task.key} but this is only a dry run.")
             return
         task.release_ownership()
+        METRICS.inc("tasks_total", action=self.name, event="released")
 
     def unregister(self, task):
         if self.dry_run:
@@ -228,16 +613,38 @@ class Worker:
             return
         task.set_status(status)
 
+    def send_heartbeat(self, task, progress=None):
+        if self.dry_run:
+            LOG.warning(f"Would send heartbeat of task {task.key} but this is only a dry run.")
+            return
+        task.heartbeat(progress, timeout=self.heartbeat_timeout)
+
+    def report_progress(self, task, progress):
+        """Report the progress of a task, it is sent with its next heartbeat."""
+        self.heartbeats.report(task, progress)
+
     def worker_process_task(self, task):
         raise NotImplementedError("Subclasses must implement this method.")
 
 
-def run_worker(action, **kwargs):
+def worker_class(action):
+    """The class of the workers for `action`."""
     from anemoi.registry.workers.dummy import DummyWorker
 
     from .delete_dataset import DeleteDatasetWorker
+    from .reaper import ReaperWorker
     from .transfer_dataset import TransferDatasetWorker
 
+    return {
+        "transfer-dataset": TransferDatasetWorker,
+        "delete-dataset": DeleteDatasetWorker,
+        "dummy": DummyWorker,
+        "reaper": ReaperWorker,
+    }[action]
+
+
+def worker_kwargs(action, **kwargs):
+    """Complete the arguments of a worker for `action` with the `workers` section of the config."""
     workers_config = config().get("workers", {})
     worker_config = workers_config.get(action, {})
 
@@ -255,11 +662,10 @@ def run_worker(action, **kwargs):
         if k not in kwargs:
             kwargs[k] = v
 
-    LOG.info(f"Running worker {action} with kwargs {kwargs}")
+    return kwargs
 
-    cls = {
-        "transfer-dataset": TransferDatasetWorker,
-        "delete-dataset": DeleteDatasetWorker,
-        "dummy": DummyWorker,
-    }[action]
-    cls(**kwargs).run()
+
+def run_worker(action, **kwargs):
+    kwargs = worker_kwargs(action, **kwargs)
+    LOG.info(f"Running worker {action} with kwargs {kwargs}")
+    worker_class(action)(**kwargs).run()
@@ -34,14 +34,19 @@ class DeleteDatasetWorker(Worker):
             raise ValueError("No destination platform specified")
 
         self.platform = platform
-        self.filter_tasks.update(filter_tasks)
+        self.filter_tasks = self.tasks_filter(platform=platform, filter_tasks=filter_tasks)
 
+    @classmethod
+    def tasks_filter(cls, platform=None, filter_tasks={}, **kwargs):
+        result = super().tasks_filter(**kwargs)
+        result.update(filter_tasks)
         # TODO: location and platform should be made consistent in the catalogue
-        self.filter_tasks["location"] = self.platform
+        result["location"] = platform
+        return result
 
     def worker_process_task(self, task):
         platform, dataset = self.parse_task(task)
-        entry = DatasetCatalogueEntry(key=dataset)
+        entry = DatasetCatalogueEntry(key=dataset, fields=["locations"])
         assert platform == self.platform, (platform, self.platform)
 
         if self.dry_run:
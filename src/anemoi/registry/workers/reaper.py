@@ -0,0 +1,66 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+
+import logging
+
+from anemoi.registry.tasks import REAP_STATS
+from anemoi.registry.tasks import TaskCatalogueEntryList
+
+from . import Worker
+
+LOG = logging.getLogger(__name__)
+
+
+class ReaperWorker(Worker):
+    """Requeue the running tasks without heartbeat, so that the other workers do not have to look for them."""
+
+    name = "reaper"
+
+    def __init__(self, filter_tasks={}, **kwargs):
+        super().__init__(**kwargs)
+
+        if self.max_no_heartbeat <= 0:
+            raise ValueError("The reaper needs a positive max_no_heartbeat")
+
+        self.filter_tasks = self.tasks_filter(filter_tasks=filter_tasks)
+
+    @classmethod
+    def tasks_filter(cls, filter_tasks={}, **kwargs):
+        # Tasks of all actions, unless filtered
+        return dict(filter_tasks)
+
+    def run(self):
+        self.export_metrics()
+        while True:
+            try:
+                self.scan()
+            except Exception as e:
+                LOG.error(f"Error: {e}")
+                if not self.loop:
+                    raise
+            if not self.loop or self._stopping.wait(self.wait):
+                break
+        self.finish()
+
+    def scan(self):
+        """Scan the running tasks once, and return the uuids of the ones requeued."""
+        stats = REAP_STATS.copy()
+        running = TaskCatalogueEntryList(status="running", **self.filter_tasks)
+        reaped = running.reap(self.max_no_heartbeat, dry_run=self.dry_run)
+        delta = {k: REAP_STATS[k] - stats[k] for k in ("running", "stale", "reaped", "revived")}
+        LOG.info(
+            f"{delta['running']} running task(s), {delta['stale']} without heartbeat for {self.max_no_heartbeat}s,"
+            f" {delta['reaped']} requeued, {delta['revived']} updated in the meantime"
+            f" (overall {REAP_STATS['reaped']} requeued in {REAP_STATS['scans']} scans)"
+        )
+        return reaped
+
+    def worker_process_task(self, task):
+        raise NotImplementedError("The reaper does not process tasks.")
@@ -0,0 +1,246 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Run worker processes, as many as the queues need.
+
+Each pool of the `workers.supervisor` section of the config is a kind of worker
+(an action and its options). The supervisor counts the queued and running tasks the
+workers of a pool would claim, runs enough of them to process these tasks, and retires
+the extra ones once the queue has been empty for a while, between `min_workers` and
+`max_workers`.
+Workers are `anemoi-registry worker <action> --loop` processes, retired with SIGTERM
+so that they complete their tasks first. Crashed workers are restarted, after a delay
+that grows while they keep crashing.
+"""
+
+import argparse
+import logging
+import math
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from anemoi.registry import config
+from anemoi.registry.tasks import TaskCatalogueEntryList
+
+from . import Backoff
+from . import worker_class
+from . import worker_kwargs
+
+LOG = logging.getLogger(__name__)
+
+
+class Child:
+    def __init__(self, command):
+        # In their own process group, so that a worker killing its group on timeout does not kill the supervisor
+        self.process = subprocess.Popen(command, start_new_session=True)
+        self.started = time.monotonic()
+        self.retiring = False
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def poll(self):
+        return self.process.poll()
+
+    def signal(self, signum):
+        try:
+            self.process.send_signal(signum)
+        except ProcessLookupError:
+            pass
+
+    def retire(self):
+        self.retiring = True
+        self.signal(signal.SIGTERM)
+
+
+def worker_arguments(action):
+    """The options of `anemoi-registry worker <action>`, by name."""
+    from anemoi.registry.commands.worker import WorkerCommand
+
+    parser = argparse.ArgumentParser()
+    WorkerCommand().add_arguments(parser)
+    (subparsers,) = [a for a in parser._actions if isinstance(a, argparse._SubParsersAction)]
+    if action not in subparsers.choices:
+        raise ValueError(f"Unknown worker action {action!r}")
+    return {a.dest: a for a in subparsers.choices[action]._actions if a.option_strings and a.dest != "help"}
+
+
+class Pool:
+    """Worker processes of one kind, started and retired with the number of tasks waiting for them."""
+
+    def __init__(
+        self, action, min_workers=0, max_workers=1, options={}, idle=300, restart_wait=10, restart_max_wait=600
+    ):
+        self.action = action
+        self.min_workers = min_workers
+        self.max_workers = max(min_workers, max_workers)
+        self.options = dict(options)
+        # Passed on the command line of the workers, checked now rather than when they crash at startup
+        self.arguments = worker_arguments(action)
+        unknown = sorted(k for k in self.options if k not in self.arguments)
+        if unknown:
+            raise ValueError(f"Unknown options for the {action} workers: {', '.join(unknown)}")
+        self.idle = idle
+        self.backoff = Backoff(restart_wait, restart_max_wait)
+
+        # The tasks that the workers will claim, and how many each one processes at once
+        kwargs = worker_kwargs(action, **self.options)
+        self.filter_tasks = worker_class(action).tasks_filter(**kwargs)
+        self.slots = kwargs.get("slots") or 1
+
+        self.children = []
+        self.idle_since = None
+        self.not_before = 0
+
+    def __repr__(self):
+        options = ",".join(f"{k}={v}" for k, v in self.options.items())
+        return f"{self.action}[{options}]"
+
+    def command(self):
+        command = [sys.executable, "-m", "anemoi.registry", "worker", self.action, "--loop"]
+        for k, v in self.options.items():
+            argument = self.arguments[k]
+            option = argument.option_strings[-1]
+            if v is None:
+                continue
+            if isinstance(argument, argparse._StoreConstAction):
+                # Flags such as --dry-run, or --no-reap for reap=False
+                if v == argument.const:
+                    command.append(option)
+            elif isinstance(v, dict):
+                command += [option] + [f"{a}={b}" for a, b in v.items()]
+            elif isinstance(v, (list, tuple)):
+                command += [option] + [str(x) for x in v]
+            else:
+                command += [option, str(v)]
+        return command
+
+    @property
+    def active(self):
+        return [c for c in self.children if not c.retiring]
+
+    def collect(self, now):
+        """Forget the workers that have exited, and delay the next start if some crashed."""
+        for child in list(self.children):
+            code = child.poll()
+            if code is None:
+                continue
+            self.children.remove(child)
+            if child.retiring or code == 0:
+                LOG.info(f"{self}: worker {child.pid} exited with code {code}.")
+                continue
+            if now - child.started > self.backoff.max_wait:
+                # It ran for long enough, this is not a crash loop
+                self.backoff.reset()
+            delay = self.backoff.next()
+            self.not_before = max(self.not_before, now + delay)
+            LOG.warning(f"{self}: worker {child.pid} crashed with code {code}, restarting in {delay:.0f}s.")
+
+    def target(self, queued, running, now):
+        """Number of workers needed for `queued` tasks waiting and `running` tasks in progress."""
+        target = math.ceil((queued + running) / self.slots)
+        if queued:
+            self.idle_since = None
+        else:
+            if self.idle_since is None:
+                self.idle_since = now
+            if now - self.idle_since < self.idle:
+                # Keep them while new tasks may come, they are waiting for them anyway
+                target = max(target, len(self.active))
+        return min(self.max_workers, max(self.min_workers, target))
+
+    def step(self, now):
+        self.collect(now)
+
+        limit = self.max_workers * self.slots
+        queued = TaskCatalogueEntryList(status="queued", **self.filter_tasks).count(limit=limit)
+        running = TaskCatalogueEntryList(status="running", **self.filter_tasks).count(limit=limit)
+        target = self.target(queued, running, now)
+        active = self.active
+
+        if len(active) != target:
+            LOG.info(f"{self}: {queued} queued and {running} running task(s), {len(active)} -> {target} workers.")
+
+        while len(active) < target and now >= self.not_before:
+            child = Child(self.command())
+            LOG.info(f"{self}: started worker {child.pid}.")
+            self.children.append(child)
+            active.append(child)
+
+        while len(active) > target:
+            # The newest first, the oldest are more likely to be busy
+            child = active.pop()
+            LOG.info(f"{self}: retiring worker {child.pid}.")
+            child.retire()
+
+    def stop(self, signum=signal.SIGTERM):
+        for child in self.children:
+            child.retiring = True
+            child.signal(signum)
+
+
+class Supervisor:
+    """Check the queues every `interval` seconds, and adjust the pools of workers."""
+
+    def __init__(self, pools, interval=30):
+        self.pools = pools
+        self.interval = interval
+        self._stopping = threading.Event()
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        conf = dict(config().get("workers", {}).get("supervisor", {}))
+        conf.update({k: v for k, v in kwargs.items() if v is not None})
+
+        defaults = {k: conf[k] for k in ("idle", "restart_wait", "restart_max_wait") if k in conf}
+        pools = [Pool(**{**defaults, **pool}) for pool in conf.get("pools", [])]
+        if not pools:
+            raise ValueError("No pools of workers in the 'workers.supervisor.pools' section of the config")
+        return cls(pools, interval=conf.get("interval", 30))
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, self._stop)
+
+        while not self._stopping.is_set():
+            self.step()
+            self._stopping.wait(self.interval)
+
+        self.wait()
+
+    def step(self):
+        now = time.monotonic()
+        for pool in self.pools:
+            try:
+                pool.step(now)
+            except Exception as e:
+                LOG.error(f"{pool}: {e}")
+
+    def stop(self, signum=signal.SIGTERM):
+        """Stop starting workers, and pass `signum` to the running ones."""
+        self._stopping.set()
+        for pool in self.pools:
+            pool.stop(signum)
+
+    def _stop(self, signum, frame):
+        # A second signal is passed on too, the workers then release their tasks and exit
+        LOG.warning(f"Received signal {signum}, stopping the workers.")
+        self.stop(signal.SIGTERM if signum == signal.SIGINT else signum)
+
+    def wait(self):
+        """Wait for all the workers to exit."""
+        for pool in self.pools:
+            for child in pool.children:
+                child.process.wait()
+            pool.children = []
@@ -10,60 +10,117 @@
 
 import datetime
 import logging
+import math
 import os
-from copy import deepcopy
+import time
+from collections import deque
 
 from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+from anemoi.registry.metrics import METRICS
 
 from . import Worker
 
 LOG = logging.getLogger(__name__)
 
 
+def _round(x, digits=None):
+    return None if x is None else round(x, digits)
+
+
 class Progress:
-    """Progress reporter for transfer tasks."""
+    """Progress reporter for transfer tasks, called by `anemoi.utils.remote.transfer` after each file.
 
-    latest = None
+    The progress is given to `report`, or sent with `task.set_progress` if there is none. It
+    includes the throughput, smoothed over about `smoothing` seconds, the estimated time of
+    arrival, and the last `history` samples as compact [seconds, files, bytes] triplets.
+    Reports are at most every `frequency` seconds, or every `frequency / 10` seconds while
+    the percentage moves by at least `step` points between them.
+    """
 
-    def __init__(self, task, frequency=60):
+    def __init__(self, task, frequency=60, report=None, history=8, smoothing=60, step=1):
         self.task = task
         self.frequency = frequency
-        self.first_progress = None
-        self.first_transfer_progress = None
-        self.previous_progress = None
+        self.report = report or task.set_progress
+        self.smoothing = smoothing
+        self.step = step
+
+        self.samples = deque(maxlen=history)
+        self.start = time.monotonic()
+        self.started = datetime.datetime.utcnow()
+        self.transfer_started = None
+        self.files = 0
+        self.transferred = 0
+        self.rate = None
+        self.files_rate = None
+        self.latest = None
 
     def __call__(self, number_of_files, total_size, total_transferred, transfering, **kwargs):
-        now = datetime.datetime.utcnow()
-
-        if self.latest is not None and (now - self.latest).seconds < self.frequency:
-            # already updated recently
-            return
-        self.latest = now
-
-        timestamp = now.isoformat()
+        now = time.monotonic()
+
+        if transfering:
+            if self.transfer_started is None:
+                # Files are counted from the next call, one call per file
+                self.transfer_started = datetime.datetime.utcnow()
+            else:
+                self.files += 1
+                METRICS.inc("transferred_files_total")
+            METRICS.inc("transferred_bytes_total", total_transferred - self.transferred)
+            self.transferred = total_transferred
+
+        percentage = 100 * total_transferred / total_size if total_size and transfering else 0
+        done = transfering and total_transferred >= total_size
+
+        if self.latest is not None and not done:
+            elapsed = now - self.latest[0]
+            moved = abs(percentage - self.latest[1]) >= self.step
+            if elapsed < self.frequency and not (moved and elapsed >= self.frequency / 10):
+                # already updated recently
+                return
+
+        self.report(
+            self._progress(now, number_of_files, total_size, total_transferred, transfering, percentage, kwargs)
+        )
+        self.latest = (now, percentage)
+
+    def _progress(self, now, number_of_files, total_size, total_transferred, transfering, percentage, kwargs):
+        seconds = round(now - self.start, 1)
+        rate = files_rate = None
+        if self.samples and seconds > self.samples[-1][0]:
+            previous_seconds, previous_files, previous_bytes = self.samples[-1]
+            dt = seconds - previous_seconds
+            rate = (total_transferred - previous_bytes) / dt
+            files_rate = (self.files - previous_files) / dt
+            # Exponential moving average, weighted by the time since the previous sample
+            alpha = 1 - math.exp(-dt / self.smoothing)
+            self.rate = rate if self.rate is None else self.rate + alpha * (rate - self.rate)
+            self.files_rate = (
+                files_rate if self.files_rate is None else self.files_rate + alpha * (files_rate - self.files_rate)
+            )
+        self.samples.append((seconds, self.files, total_transferred))
 
         progress = dict(
             number_of_files=number_of_files,
             total_size=total_size,
             total_transferred=total_transferred,
             transfering=transfering,
-            timestamp=timestamp,
-            percentage=100 * total_transferred / total_size if total_size and transfering else 0,
+            files_transferred=self.files,
+            timestamp=datetime.datetime.utcnow().isoformat(),
+            started=self.started.isoformat(),
+            transfer_started=self.transfer_started and self.transfer_started.isoformat(),
+            percentage=round(percentage, 2),
+            bytes_per_second=_round(rate),
+            smoothed_bytes_per_second=_round(self.rate),
+            files_per_second=_round(self.files_rate, 2),
+            history=[list(sample) for sample in self.samples],
             **kwargs,
         )
 
-        if self.first_progress is None:
-            self.first_progress = progress
-        if self.first_transfer_progress is None and transfering:
-            self.first_transfer_progress = progress
-
-        p = deepcopy(progress)
-        p["first_progress"] = self.first_progress
-        p["first_transfer_progress"] = self.first_transfer_progress
-        p["previous_progress"] = self.previous_progress
-        self.task.set_progress(p)
+        if transfering and self.rate:
+            eta_seconds = (total_size - total_transferred) / self.rate
+            progress["eta_seconds"] = round(eta_seconds)
+            progress["eta"] = (datetime.datetime.utcnow() + datetime.timedelta(seconds=eta_seconds)).isoformat()
 
-        self.previous_progress = progress
+        return progress
 
 
 class TransferDatasetWorker(Worker):
@@ -94,14 +151,20 @@ class TransferDatasetWorker(Worker):
         if self.published_target_dir is None:
             self.published_target_dir = self.target_dir
 
-        self.filter_tasks.update(filter_tasks)
-        self.filter_tasks["destination"] = self.destination
-        if self.source:
-            self.filter_tasks["source"] = self.source
+        self.filter_tasks = self.tasks_filter(destination=destination, source=source, filter_tasks=filter_tasks)
 
         if not self.destination:
             raise ValueError("No destination platform specified")
 
+    @classmethod
+    def tasks_filter(cls, destination=None, source=None, filter_tasks={}, **kwargs):
+        result = super().tasks_filter(**kwargs)
+        result.update(filter_tasks)
+        result["destination"] = destination
+        if source:
+            result["source"] = source
+        return result
+
     def worker_process_task(self, task):
         if (
             not os.path.exists(self.target_dir)
@@ -113,7 +176,7 @@ class TransferDatasetWorker(Worker):
         from anemoi.utils.remote import transfer
 
         destination, source, dataset = self.parse_task(task)
-        entry = DatasetCatalogueEntry(key=dataset)
+        entry = DatasetCatalogueEntry(key=dataset, fields=["locations"])
 
         LOG.info(f"Transferring {dataset} from '{source}' to '{destination}'")
 
@@ -152,7 +215,13 @@ class TransferDatasetWorker(Worker):
             LOG.warning(f"Would tranfer {source_path} to {target_path} but this is only a dry run.")
             return
 
-        progress = Progress(task, frequency=10)
+        # Sent with the heartbeats of the task
+        report = Progress(task, frequency=10, report=lambda p: self.report_progress(task, p))
+
+        def progress(*args, **kwargs):
+            # On timeout, stop after the files in flight, the next worker resumes from there
+            self.check_interrupted()
+            report(*args, **kwargs)
 
         transfer(
             source_path,
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Conflict rate and latency of workers claiming tasks from the same queue, all racing
+for the first task of the list (the previous behaviour) and picking at random in a window.
+
+Usage: python tests/benchmarks/bench_claims.py [--workers N] [--tasks N] [--latency SECONDS]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from anemoi.utils.config import DotDict  # noqa: E402
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+from anemoi.registry.configuration import CONF  # noqa: E402
+from anemoi.registry.tasks import CLAIM_STATS  # noqa: E402
+from anemoi.registry.tasks import CLAIM_WINDOW  # noqa: E402
+from anemoi.registry.tasks import TaskCatalogueEntryList  # noqa: E402
+
+
+def run(label, catalogue, workers, tasks, window):
+    for i in range(tasks):
+        catalogue.add("tasks", {"action": "transfer-dataset", "updated": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}"})
+    CLAIM_STATS.clear()
+
+    def worker():
+        # Until the queue is empty, even if a claim comes back empty-handed
+        while any(t["status"] == "queued" for t in list(catalogue.collections["tasks"].values())):
+            TaskCatalogueEntryList(status="queued").claim(window=window)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    claims = CLAIM_STATS["attempts"] - CLAIM_STATS["conflicts"]
+    print(
+        f"{label:<20} {claims / elapsed:8.1f} claims/s"
+        f" {CLAIM_STATS['conflicts'] / CLAIM_STATS['attempts']:8.1%} conflicts"
+        f" {CLAIM_STATS['seconds'] / max(claims, 1) * 1000:8.1f} ms/claim"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=30)
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds added to each request")
+    args = parser.parse_args()
+
+    with FakeCatalogue() as catalogue:
+        conf = CONF.package_config["registry"].copy()
+        conf.update(catalogue.settings()["registry"])
+        conf["api_token"] = "token"
+        conf["http_pool_size"] = args.workers
+        CONF._cache = DotDict(conf)
+
+        catalogue.latency = args.latency
+        run("first task", catalogue, args.workers, args.tasks, window=1)
+        run("random in window", catalogue, args.workers, args.tasks, window=CLAIM_WINDOW)
+
+
+if __name__ == "__main__":
+    main()
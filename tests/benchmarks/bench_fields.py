@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Payload size and latency of listing datasets with full records and with a field projection.
+
+Usage: python tests/benchmarks/bench_fields.py [--count N] [--variables N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+from anemoi.registry.rest import shared_session  # noqa: E402
+
+
+def record(i, variables):
+    names = [f"var_{j}" for j in range(variables)]
+    return {
+        "name": f"dataset-{i}",
+        "status": "experimental",
+        "locations": {"ewc": {"path": f"s3://ml-datasets/dataset-{i}.zarr"}},
+        "metadata": {
+            "statistics": {k: [0.123456789] * variables for k in ("mean", "stdev", "minimum", "maximum")},
+            "variables_metadata": {n: {"mars": {"param": n, "levtype": "sfc"}} for n in names},
+            "recipe": {"input": {"join": [{"mars": {"param": names}}]}},
+        },
+    }
+
+
+def run(label, session, url, params, repeat=5):
+    best, size = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = session.get(url, params=params)
+        r.raise_for_status()
+        r.json()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        size = len(r.content)
+    print(f"{label:<30} {size / 1024:10.1f} KiB {best * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--variables", type=int, default=100)
+    args = parser.parse_args()
+
+    with FakeCatalogue() as catalogue:
+        for i in range(args.count):
+            catalogue.add("datasets", record(i, args.variables))
+
+        session = shared_session(catalogue.api_url, "token")
+        url = f"{catalogue.api_url}/datasets"
+        run("full records", session, url, None)
+        run("_fields=name", session, url, {"_fields": "name"})
+        run("_fields=name,status,locations", session, url, {"_fields": "name,status,locations"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Time spent importing anemoi-registry and the module of a command, as reported by
+`python -X importtime`, and the slowest modules imported on the way.
+
+Exits with an error if a command takes more than --budget milliseconds, so that it can
+be run in CI to catch a heavy import added at the top of a module.
+
+Usage: python tests/benchmarks/bench_importtime.py [--runs N] [--budget MS] [--top N] [COMMAND ...]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+COMMANDS = ["", "tasks", "datasets", "experiments", "weights", "worker"]
+
+CODE = """
+from anemoi.registry.commands import COMMANDS
+for name in COMMANDS.selected({argv!r}):
+    COMMANDS[name]
+"""
+
+
+def importtime(command):
+    """Total milliseconds of the imports of `command`, in a new interpreter, and the
+    cumulative milliseconds of each module imported.
+    """
+    argv = [command] if command else []
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODE.format(argv=argv)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, modules, started = 0, {}, False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        top_level = not name[1:].startswith(" ")
+        name = name.strip()
+        # The modules imported at startup (site, encodings...) come first
+        started = started or name.startswith("anemoi")
+        if not started:
+            continue
+        modules[name] = int(cumulative) / 1000
+        if top_level:
+            total += int(cumulative) / 1000
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("commands", nargs="*", default=COMMANDS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, help="Milliseconds allowed per command")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    over = []
+    for command in args.commands:
+        runs = [importtime(command) for _ in range(args.runs)]
+        total = statistics.median(t for t, _ in runs)
+        label = command or "(none)"
+        print(f"{label:<12} {total:8.1f} ms (median of {args.runs})")
+
+        _, modules = runs[-1]
+        slowest = sorted((v, k) for k, v in modules.items() if not k.startswith("anemoi.registry"))[-args.top :]
+        for millis, name in reversed(slowest):
+            print(f"{'':<12} {millis:8.1f} ms  {name}")
+
+        if args.budget is not None and total > args.budget:
+            over.append(label)
+
+    if over:
+        print(f"Over the budget of {args.budget} ms: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
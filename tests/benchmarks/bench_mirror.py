@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Time of a first and of an incremental sync of the mirror, and of looking up a dataset
+in the catalogue and in the mirror.
+
+Usage: python tests/benchmarks/bench_mirror.py [--count N] [--changed N] [--latency SECONDS]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from anemoi.utils.config import DotDict  # noqa: E402
+from bench_fields import record  # noqa: E402
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+from anemoi.registry.configuration import CONF  # noqa: E402
+from anemoi.registry.entry.dataset import DatasetCatalogueEntry  # noqa: E402
+from anemoi.registry.mirror import Mirror  # noqa: E402
+
+
+def lookups(label, count):
+    times = []
+    for i in range(count):
+        start = time.perf_counter()
+        DatasetCatalogueEntry(key=f"dataset-{i}").record
+        times.append(time.perf_counter() - start)
+    print(f"{label:<20} {statistics.median(times) * 1000:8.3f} ms per dataset (median of {count})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--changed", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to each request")
+    args = parser.parse_args()
+
+    with FakeCatalogue() as catalogue, tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.count):
+            catalogue.add("datasets", record(i, 20))
+        catalogue.latency = args.latency
+
+        conf = CONF.package_config["registry"].copy()
+        conf.update(catalogue.settings()["registry"])
+        conf["api_token"] = "token"
+        conf["mirror"] = {"path": os.path.join(tmp, "mirror.sqlite"), "offline": False}
+        CONF._cache = DotDict(conf)
+        mirror = Mirror.from_config(conf["mirror"])
+
+        for label in ("first sync", "no change"):
+            start = time.perf_counter()
+            mirror.sync(["datasets"])
+            print(f"{label:<20} {time.perf_counter() - start:8.3f} s")
+
+        for i in range(args.changed):
+            catalogue.patch("datasets", f"dataset-{i}", {}, [{"op": "replace", "path": "/status", "value": "ok"}])
+        start = time.perf_counter()
+        mirror.sync(["datasets"])
+        print(f"{f'{args.changed} changed':<20} {time.perf_counter() - start:8.3f} s")
+
+        lookups("catalogue", 50)
+        CONF._cache["mirror"]["offline"] = True
+        lookups("mirror", args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Time of filtering datasets with a query: one record at a time, over columns, and in
+the mirror, where only the values needed are extracted by SQLite.
+
+Usage: python tests/benchmarks/bench_query.py [--count N] [--query QUERY]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from bench_fields import record  # noqa: E402
+
+from anemoi.registry.mirror import Mirror  # noqa: E402
+from anemoi.registry.query import Query  # noqa: E402
+
+
+def dataset(i):
+    result = record(i, 50)
+    result["metadata"].update(resolution=["o96", "n320", "o1280"][i % 3], start_date=f"{1950 + i % 70}-01-01")
+    if i % 5 == 0:
+        result["locations"]["leonardo"] = {"path": f"/data/dataset-{i}.zarr"}
+    return result
+
+
+def run(label, func, repeat=15):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<25} {best * 1000:10.1f} ms {count:8d} matches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--query", default="resolution=o96 and start_date<1990 and .locations.leonardo exists")
+    args = parser.parse_args()
+
+    records = [dataset(i) for i in range(args.count)]
+    query = Query(args.query)
+
+    run("one record at a time", lambda: [r for r in records if query.match(r)])
+    run("columns", lambda: query.filter(records))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = Mirror(os.path.join(tmp, "mirror.sqlite"))
+        with mirror.transaction() as db:
+            db.executemany(
+                "INSERT INTO records VALUES ('datasets', ?, NULL, ?)", [(r["name"], json.dumps(r)) for r in records]
+            )
+        open(mirror.path, "a").close()
+
+        run("mirror, decode all", lambda: query.filter(mirror.list("datasets")), repeat=3)
+        run("mirror, extract values", lambda: mirror.list("datasets", where=query), repeat=3)
+        mirror.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Time of finding the datasets with a variable: by downloading all of them and looking
+into their JSON (as with `list datasets --json | grep`), and in the search index of the
+mirror, and time of keeping the index up to date.
+
+Usage: python tests/benchmarks/bench_search.py [--count N] [--changed N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from anemoi.utils.config import DotDict  # noqa: E402
+from bench_fields import record  # noqa: E402
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+from anemoi.registry.configuration import CONF  # noqa: E402
+from anemoi.registry.mirror import Mirror  # noqa: E402
+from anemoi.registry.rest import RestItemList  # noqa: E402
+
+
+def dataset(i):
+    result = record(i, 50)
+    # A variable only some datasets have
+    if i % 100 == 0:
+        result["metadata"]["variables_metadata"]["cp"] = {"mars": {"param": "cp"}}
+    return result
+
+
+def run(label, func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<25} {best * 1000:10.1f} ms {count:6d} matches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--changed", type=int, default=10)
+    args = parser.parse_args()
+
+    with FakeCatalogue() as catalogue, tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.count):
+            catalogue.add("datasets", dataset(i))
+
+        conf = CONF.package_config["registry"].copy()
+        conf.update(catalogue.settings()["registry"])
+        conf["api_token"] = "token"
+        conf["mirror"] = {"path": os.path.join(tmp, "mirror.sqlite"), "offline": False}
+        CONF._cache = DotDict(conf)
+        mirror = Mirror.from_config(conf["mirror"])
+
+        start = time.perf_counter()
+        mirror.sync(["datasets"])
+        print(f"{'first sync and index':<25} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+        for i in range(args.changed):
+            catalogue.patch("datasets", f"dataset-{i}", {}, [{"op": "replace", "path": "/status", "value": "ok"}])
+        start = time.perf_counter()
+        mirror.sync(["datasets"])
+        print(f"{f'sync of {args.changed} changes':<25} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+        def grep():
+            return [r for r in RestItemList("datasets").get() if '"cp"' in json.dumps(r)]
+
+        run("download and grep", grep, repeat=1)
+        run("search index", lambda: mirror.search("variables:cp", limit=args.count))
+
+
+if __name__ == "__main__":
+    main()
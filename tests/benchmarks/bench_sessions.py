@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Requests per second when fetching entries one by one, with a new HTTP session
+per entry (the previous behaviour) and with the shared, pooled session.
+
+Usage: python tests/benchmarks/bench_sessions.py [--count N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+from anemoi.registry.rest import shared_session  # noqa: E402
+
+
+def run(label, count, session_factory, url):
+    start = time.perf_counter()
+    for i in range(count):
+        session = session_factory()
+        session.get(f"{url}/datasets/dataset-{i % 100}").raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {count / elapsed:10.1f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    with FakeCatalogue() as catalogue:
+        for i in range(100):
+            catalogue.add("datasets", {"name": f"dataset-{i}", "metadata": {}})
+
+        run("new session", args.count, requests.Session, catalogue.api_url)
+        run("shared session", args.count, lambda: shared_session(catalogue.api_url, "token"), catalogue.api_url)
+        print(f"connections opened: {catalogue.requests['connections']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""Wall time of common anemoi-registry commands, each run in a new process, with the
+settings of the server fetched on each call (the previous behaviour) and cached on disk.
+
+Usage: python tests/benchmarks/bench_startup.py [--runs N] [--latency SECONDS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+COMMANDS = [
+    ["--help"],
+    ["settings"],
+    ["tasks", "--list"],
+]
+
+
+def run(label, command, runs, env):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "anemoi.registry", *command], env=env, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    print(f"{label:<12} {' '.join(command):<15} {statistics.median(times) * 1000:8.0f} ms (median of {runs})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds added to each request")
+    args = parser.parse_args()
+
+    with FakeCatalogue() as catalogue, tempfile.TemporaryDirectory() as home:
+        catalogue.latency = args.latency
+        settings = os.path.join(home, ".config", "anemoi", "settings.toml")
+        os.makedirs(os.path.dirname(settings))
+
+        env = dict(os.environ, HOME=home, ANEMOI_CATALOGUE=catalogue.url, ANEMOI_CATALOGUE_TOKEN="token")
+        for label, enabled in (("no cache", "false"), ("cached", "true")):
+            with open(settings, "w") as f:
+                f.write(f"[registry.settings_cache]\nenabled = {enabled}\n")
+            for command in COMMANDS:
+                run(label, command, args.runs, env)
+
+
+if __name__ == "__main__":
+    main()
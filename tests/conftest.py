@@ -0,0 +1,40 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import os
+import sys
+
+import pytest
+from anemoi.utils.config import DotDict
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_catalogue import FakeCatalogue  # noqa: E402
+
+
+@pytest.fixture
+def catalogue():
+    """Run a local stand-in catalogue and point the registry configuration at it."""
+    from anemoi.registry.configuration import CONF
+    from anemoi.registry.rest import close_sessions
+
+    with FakeCatalogue() as fake:
+        conf = CONF.package_config["registry"].copy()
+        conf.update(fake.settings()["registry"])
+        conf["api_token"] = "test-token"
+        conf["allow_delete"] = True
+
+        saved = CONF._cache
+        CONF._cache = DotDict(conf)
+        close_sessions()
+        try:
+            yield fake
+        finally:
+            CONF._cache = saved
+            close_sessions()
@@ -0,0 +1,309 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+"""A local stand-in for the catalogue server, used by the tests and the benchmarks.
+
+It keeps the collections in memory and implements the small subset of the REST API
+used by anemoi-registry: list with key=value filters, _sort and _limit, get, post, put,
+patch (JSON patch), delete, bulk delete (POST <collection>/_delete) and long-polling
+(GET with _wait=<seconds> and If-None-Match). It also counts the requests it receives,
+so tests can check how many round trips an operation costs.
+"""
+
+import copy
+import datetime
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+import jsonpatch
+
+MAIN_KEYS = {
+    "datasets": "name",
+    "experiments": "expver",
+    "weights": "uuid",
+    "trainings": "name",
+    "tasks": "uuid",
+}
+
+API = "/api/v1"
+
+
+def _now():
+    return datetime.datetime.utcnow().isoformat()
+
+
+def _etag(payload):
+    return '"%s"' % hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def catalogue(self):
+        return self.server.catalogue
+
+    def setup(self):
+        super().setup()
+        self.catalogue.count("connections")
+
+    def _parse(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path
+        if path == "/settings":
+            return "settings", None, params
+        assert path.startswith(API), path
+        parts = path[len(API) :].strip("/").split("/")
+        collection = parts[0]
+        key = "/".join(parts[1:]) or None
+        return collection, key, params
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _send(self, status, payload=None, headers={}):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _dispatch(self):
+        self.catalogue.count(self.command)
+        if self.catalogue.latency:
+            time.sleep(self.catalogue.latency)
+        collection, key, params = self._parse()
+
+        if self.command == "HEAD":
+            if not self.catalogue.supports_head:
+                self._send(405)
+                return
+            status, _ = self.catalogue.get(collection, key, params, None)
+            self._send(status)
+            return
+
+        if self.command == "GET" and params.get("_wait") and self.catalogue.supports_long_poll:
+            status, payload = self.catalogue.wait_for_change(
+                collection, key, params, self.headers.get("If-None-Match"), float(params["_wait"])
+            )
+        else:
+            status, payload = getattr(self.catalogue, self.command.lower())(collection, key, params, self._body())
+
+        if self.command == "GET" and status == 200:
+            etag = _etag(payload)
+            if self.headers.get("If-None-Match") == etag:
+                self.catalogue.count("not-modified")
+                self._send(304, headers={"ETag": etag})
+                return
+            self._send(status, payload, headers={"ETag": etag})
+            return
+
+        self._send(status, payload)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+
+class FakeCatalogue:
+    """In-memory catalogue served over HTTP on localhost."""
+
+    def __init__(self):
+        self.collections = {name: {} for name in MAIN_KEYS}
+        self.requests = Counter()
+        self.supports_head = True
+        self.supports_bulk_delete = True
+        self.supports_fields = True
+        # Seconds added to each request, to model a remote server in benchmarks
+        self.latency = 0
+        self.supports_long_poll = True
+        self.lock = threading.RLock()
+        # Notified on every change, for long-polling requests
+        self.changed = threading.Condition(self.lock)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.catalogue = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return self.url + API
+
+    def settings(self):
+        return {
+            "registry": {
+                "api_url": self.api_url,
+                "web_url": self.url,
+                "datasets_platform": "ewc",
+                "datasets_uri_pattern": "s3://ml-datasets/{name}.zarr",
+            }
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def count(self, verb):
+        with self.lock:
+            self.requests[verb] += 1
+
+    def reset_counts(self):
+        with self.lock:
+            self.requests.clear()
+
+    @property
+    def total_requests(self):
+        return sum(v for k, v in self.requests.items() if k.isupper())
+
+    def add(self, collection, record):
+        """Insert a record directly, bypassing HTTP."""
+        record = copy.deepcopy(record)
+        if collection == "tasks":
+            record.setdefault("uuid", str(uuid.uuid4()))
+            record.setdefault("status", "queued")
+        record.setdefault("created", _now())
+        record.setdefault("updated", record["created"])
+        key = record[MAIN_KEYS[collection]]
+        with self.lock:
+            self.collections[collection][key] = record
+            self.changed.notify_all()
+        return key
+
+    def wait_for_change(self, collection, key, params, etag, timeout):
+        """GET, held until the response differs from `etag` or `timeout` expires."""
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while True:
+                status, payload = self.get(collection, key, params, None)
+                remaining = deadline - time.monotonic()
+                if status != 200 or _etag(payload) != etag or remaining <= 0:
+                    return status, payload
+                self.changed.wait(remaining)
+
+    def _match(self, record, params):
+        return all(str(record.get(k)) == str(v) for k, v in params.items() if not k.startswith("_"))
+
+    def get(self, collection, key, params, body):
+        if collection == "settings":
+            return 200, self.settings()
+        with self.lock:
+            items = self.collections.get(collection)
+            if items is None:
+                return 404, {"error": f"Unknown collection {collection}"}
+            fields = params["_fields"].split(",") if params.get("_fields") and self.supports_fields else None
+            if key is None:
+                records = [r for r in items.values() if self._match(r, params)]
+                if params.get("_sort"):
+                    sort = params["_sort"]
+                    records.sort(key=lambda r: r[sort.lstrip("-")], reverse=sort.startswith("-"))
+                if params.get("_limit"):
+                    records = records[: int(params["_limit"])]
+                return 200, [self._project(r, fields) for r in records]
+            if key not in items:
+                return 404, {"error": f"{collection}/{key} not found"}
+            return 200, self._project(items[key], fields)
+
+    def _project(self, record, fields):
+        if fields is None:
+            return copy.deepcopy(record)
+        result = {}
+        for field in fields:
+            src, dst = record, result
+            *parents, last = field.split(".")
+            for p in parents:
+                src = src.get(p, {})
+                dst = dst.setdefault(p, {})
+            if last in src:
+                dst[last] = copy.deepcopy(src[last])
+        return result
+
+    def post(self, collection, key, params, body):
+        if key == "_delete":
+            return self.bulk_delete(collection, body["keys"])
+        with self.lock:
+            main_key = MAIN_KEYS[collection]
+            if body.get(main_key) in self.collections[collection]:
+                return 409, {"error": "already exists"}
+            key = self.add(collection, body)
+            return 201, copy.deepcopy(self.collections[collection][key])
+
+    def put(self, collection, key, params, body):
+        with self.lock:
+            body = dict(body)
+            body.setdefault(MAIN_KEYS[collection], key)
+            self.add(collection, body)
+            return 200, copy.deepcopy(self.collections[collection][key])
+
+    def patch(self, collection, key, params, body):
+        with self.lock:
+            items = self.collections[collection]
+            if key not in items:
+                return 404, {"error": f"{collection}/{key} not found"}
+            try:
+                record = jsonpatch.apply_patch(items[key], body)
+            except jsonpatch.JsonPatchTestFailed as e:
+                return 409, {"error": str(e)}
+            except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException) as e:
+                return 400, {"error": str(e)}
+            record["updated"] = _now()
+            items[key] = record
+            self.changed.notify_all()
+            return 200, copy.deepcopy(record)
+
+    def bulk_delete(self, collection, keys):
+        if not self.supports_bulk_delete:
+            return 405, {"error": "method not allowed"}
+        with self.lock:
+            items = self.collections[collection]
+            deleted = [key for key in keys if items.pop(key, None) is not None]
+            self.changed.notify_all()
+            return 200, {"deleted": deleted}
+
+    def delete(self, collection, key, params, body):
+        with self.lock:
+            items = self.collections[collection]
+            if key not in items:
+                return 404, {"error": f"{collection}/{key} not found"}
+            del items[key]
+            self.changed.notify_all()
+            return 200, {"deleted": key}
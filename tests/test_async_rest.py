@@ -0,0 +1,64 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import asyncio
+
+import pytest
+
+from anemoi.registry.async_rest import AsyncRestItem
+from anemoi.registry.async_rest import AsyncRestItemList
+from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+from anemoi.registry.entry.dataset import DatasetCatalogueEntryList
+from anemoi.registry.rest import AlreadyExists
+
+
+def test_load_many(catalogue):
+    for i in range(10):
+        catalogue.add("datasets", {"name": f"dataset-{i}", "metadata": {"i": i}})
+
+    entries = DatasetCatalogueEntry.load_many([f"dataset-{i}" for i in range(10)] + ["missing"], max_concurrency=4)
+
+    assert [e.record["metadata"]["i"] for e in entries[:10]] == list(range(10))
+    assert entries[10] is None
+    assert catalogue.requests["GET"] == 11
+
+
+def test_async_iteration(catalogue):
+    for i in range(5):
+        catalogue.add("datasets", {"name": f"dataset-{i}", "metadata": {}})
+
+    async def collect():
+        return [entry.key async for entry in DatasetCatalogueEntryList()]
+
+    assert sorted(asyncio.run(collect())) == [f"dataset-{i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("fields", [None, ["status"]])
+def test_async_iteration_where(catalogue, fields):
+    for i in range(5):
+        catalogue.add("datasets", {"name": f"dataset-{i}", "status": "ok", "metadata": {"i": i}})
+
+    lists = [DatasetCatalogueEntryList(where="i>=3", fields=fields) for _ in range(2)]
+
+    async def collect():
+        return [entry.key async for entry in lists[0]]
+
+    assert asyncio.run(collect()) == [entry.key for entry in lists[1]] == ["dataset-3", "dataset-4"]
+
+
+def test_async_error_mapping(catalogue):
+    catalogue.add("datasets", {"name": "existing", "metadata": {}})
+
+    async def main():
+        assert await AsyncRestItem("datasets", "existing").exists()
+        assert not await AsyncRestItem("datasets", "missing").exists()
+        with pytest.raises(AlreadyExists):
+            await AsyncRestItemList("datasets").post({"name": "existing"})
+
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+
+import subprocess
+import sys
+
+import pytest
+from anemoi.utils.cli import cli_main
+
+from anemoi.registry import __version__
+from anemoi.registry.commands import COMMANDS
+
+
+def anemoi_registry(command, *args):
+    cli_main(__version__, None, {command: COMMANDS[command]}, test_arguments=[command, *args])
+
+
+def test_list_datasets_fetches_names_only(catalogue, capsys):
+    catalogue.add("datasets", {"name": "a", "status": "ok", "metadata": {"statistics": [1.0] * 1000}})
+    catalogue.add("datasets", {"name": "b", "status": "experimental", "metadata": {}})
+
+    anemoi_registry("list", "datasets")
+    assert capsys.readouterr().out.split() == ["a", "b"]
+
+    anemoi_registry("list", "datasets", "--fields", "status")
+    out = capsys.readouterr().out
+    assert "experimental" in out and "statistics" not in out
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_delete_many_tasks(catalogue, bulk):
+    catalogue.supports_bulk_delete = bulk
+    for i in range(600):
+        catalogue.add("tasks", {"action": "dummy", "status": "stale" if i % 2 else "queued"})
+
+    anemoi_registry("tasks", "--delete-many", "status=stale", "-y")
+
+    assert [t["status"] for t in catalogue.collections["tasks"].values()] == ["queued"] * 300
+    # One snapshot of the list, then either one bulk request or one request per task
+    assert catalogue.requests["GET"] == 1
+    if bulk:
+        assert catalogue.requests["POST"] == 1
+        assert catalogue.requests["DELETE"] == 0
+    else:
+        assert catalogue.requests["DELETE"] == 300
+
+
+@pytest.mark.parametrize("command", ["tasks", "list", "datasets"])
+def test_command_imports_only_what_it_needs(command):
+    # Run in a new interpreter, the tests may already have imported everything
+    code = (
+        "import sys\n"
+        "from anemoi.registry.commands import COMMANDS\n"
+        f"assert list(COMMANDS.selected([{command!r}, '--help'])) == [{command!r}]\n"
+        "print(' '.join(m for m in ('anemoi.utils.remote.s3', 'boto3', 'numpy', 'pydantic') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == []
+
+
+def test_all_commands_listed_without_a_command():
+    assert {"datasets", "experiments", "tasks", "worker"} <= set(COMMANDS.selected(["--debug"]))
+    assert "base" not in COMMANDS
+
+
+def test_list_datasets_where(catalogue, capsys):
+    catalogue.add("datasets", {"name": "a", "metadata": {"resolution": "o96", "start_date": "1979-01-01"}})
+    catalogue.add("datasets", {"name": "b", "metadata": {"resolution": "o96", "start_date": "1995-01-01"}})
+    catalogue.add("datasets", {"name": "c", "metadata": {"resolution": "n320", "statistics": [1.0] * 1000}})
+
+    anemoi_registry("list", "datasets", "--where", "resolution=o96", "--where", "start_date<1990")
+    assert capsys.readouterr().out.split() == ["a"]
+
+
+def test_search_builds_mirror_on_first_use(catalogue, tmp_path, capsys):
+    from anemoi.registry.configuration import CONF
+
+    CONF._cache["mirror"] = {"path": str(tmp_path / "mirror.sqlite"), "offline": False}
+    catalogue.add("datasets", {"name": "a", "metadata": {"variables_metadata": {"tp": {}}}})
+    catalogue.add("datasets", {"name": "b", "metadata": {}})
+
+    anemoi_registry("search", "tp")
+    # One list per collection, then each record
+    assert catalogue.requests["GET"] == 4 + 2
+    assert "a" in capsys.readouterr().out.split()
+
+    catalogue.reset_counts()
+    anemoi_registry("search", "nothing")
+    assert catalogue.total_requests == 0
+    assert "No match." in capsys.readouterr().out
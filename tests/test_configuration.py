@@ -0,0 +1,77 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import pytest
+from fake_catalogue import FakeCatalogue
+
+from anemoi.registry.configuration import SingletonConfig
+from anemoi.registry.rest import close_sessions
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeCatalogue() as fake:
+        monkeypatch.setenv("ANEMOI_CATALOGUE", fake.url)
+        monkeypatch.setenv("ANEMOI_CATALOGUE_TOKEN", "test-token")
+        close_sessions()
+        yield fake
+        close_sessions()
+
+
+def _config(tmp_path, **settings_cache):
+    conf = SingletonConfig()
+    # As if read from the user config file
+    conf.__dict__["user_config"] = {"settings_cache": {"path": str(tmp_path / "settings.json"), **settings_cache}}
+    return conf
+
+
+def test_settings_cache(server, tmp_path):
+    assert _config(tmp_path)()["api_url"] == server.api_url
+    assert server.requests["GET"] == 1
+
+    # Other processes use the cached settings
+    assert _config(tmp_path)()["api_url"] == server.api_url
+    assert server.requests["GET"] == 1
+
+    # Unless disabled
+    assert _config(tmp_path, enabled=False)()["api_url"] == server.api_url
+    assert server.requests["GET"] == 2
+
+
+def test_settings_cache_expired(server, tmp_path):
+    _config(tmp_path)()
+
+    conf = _config(tmp_path, ttl=0)
+    assert conf()["api_url"] == server.api_url
+    # Fetched again before they are used
+    assert server.requests["GET"] == 2
+    _, age = conf.settings_cache.load(server.url)
+    assert age < 10
+
+
+def test_settings_cache_offline(server, tmp_path):
+    _config(tmp_path)()
+    server.stop()
+
+    conf = _config(tmp_path, ttl=0)
+    assert conf()["api_url"] == server.api_url
+
+
+def test_settings_cache_server_error(server, tmp_path, monkeypatch):
+    _config(tmp_path)()
+    get = server.get
+
+    def unavailable(collection, key, params, body):
+        if collection == "settings":
+            return 503, {"error": "Service unavailable"}
+        return get(collection, key, params, body)
+
+    monkeypatch.setattr(server, "get", unavailable)
+    conf = _config(tmp_path, ttl=0)
+    assert conf()["api_url"] == server.api_url
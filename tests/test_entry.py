@@ -8,6 +8,8 @@
 # nor does it submit to any jurisdiction.
 
 
+import pytest
+
 from anemoi.registry.entry import CatalogueEntry
 
 
@@ -24,3 +26,285 @@ def test_resolve_path():
         assert actual == y, "%s -> %s, expected: %s" % (x, actual, y)
         actual = CatalogueEntry.resolve_path(actual, check=False)
         assert actual == y, "%s -> %s, expected: %s" % (actual, actual, y)
+
+
+def test_list_iteration_is_one_request(catalogue):
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntryList
+
+    for i in range(50):
+        catalogue.add("datasets", {"name": f"dataset-{i}", "metadata": {"i": i}})
+
+    entries = [e for e in DatasetCatalogueEntryList()]
+    assert [e.record["metadata"]["i"] for e in entries] == list(range(50))
+    assert catalogue.total_requests == 1
+
+
+def test_list_payload_is_completed_lazily(catalogue):
+    from anemoi.registry.entry import PartialRecord
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+
+    catalogue.add("datasets", {"name": "a", "metadata": {"i": 1}, "locations": {"ewc": {"path": "/x"}}})
+
+    entry = DatasetCatalogueEntry.from_list_payload({"name": "a", "metadata": {"i": 1}})
+    assert entry.record["metadata"] == {"i": 1}
+    assert catalogue.total_requests == 0
+
+    # Without projection, the payload is the whole record
+    assert entry.record.get("locations", {}) == {}
+    assert "plots" not in entry.record
+    with pytest.raises(KeyError):
+        entry.record["missing"]
+    assert catalogue.total_requests == 0
+
+    projected = PartialRecord({"name": "a"}, lambda: {"name": "a", "status": "ok"}, projected=True)
+    assert dict(projected.items()) == {"name": "a", "status": "ok"}
+
+
+def test_missing_keys_of_list_payload(catalogue):
+    from anemoi.registry.entry.experiment import ExperimentCatalogueEntryList
+
+    for i in range(20):
+        catalogue.add("experiments", {"expver": f"e{i:03d}", "metadata": {}})
+
+    for entry in ExperimentCatalogueEntryList():
+        assert entry.record.get("runs", {}) == {}
+        assert "plots" not in entry.record
+    assert catalogue.total_requests == 1
+
+    # Projected: only the fields left out of the projection are fetched
+    catalogue.reset_counts()
+    entry, *_ = ExperimentCatalogueEntryList(fields=["status", "metadata.updated"])
+    assert entry.record.get("status") is None
+    assert entry.record["metadata"].get("updated") is None
+    assert catalogue.total_requests == 1
+    assert entry.record.get("runs") is None
+    assert catalogue.total_requests == 2
+
+
+def test_load_from_key_is_one_request(catalogue):
+    from anemoi.registry.entry import CatalogueEntryNotFound
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+
+    catalogue.add("datasets", {"name": "a", "metadata": {}})
+
+    assert DatasetCatalogueEntry.load_from_key("a").key == "a"
+    assert DatasetCatalogueEntry.load_from_key("b") is None
+    assert DatasetCatalogueEntry(key="a").key == "a"
+    with pytest.raises(CatalogueEntryNotFound):
+        DatasetCatalogueEntry(key="b")
+
+    assert catalogue.total_requests == catalogue.requests["GET"] == 4
+
+
+def test_list_with_fields(catalogue):
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntryList
+    from anemoi.registry.rest import RestItemList
+
+    catalogue.add("datasets", {"name": "a", "status": "ok", "metadata": {"updated": 3, "statistics": [1, 2, 3]}})
+
+    assert RestItemList("datasets").get(fields="name,metadata.updated") == [{"name": "a", "metadata": {"updated": 3}}]
+
+    (entry,) = [e for e in DatasetCatalogueEntryList(fields=["status"])]
+    # Completed on demand
+    assert entry.record["metadata"]["statistics"] == [1, 2, 3]
+    assert dict(entry.record) == catalogue.collections["datasets"]["a"]
+
+
+def test_lazy_entry(catalogue):
+    from anemoi.registry.tasks import TaskCatalogueEntry
+
+    uuid = catalogue.add("tasks", {"action": "dummy"})
+
+    task = TaskCatalogueEntry(key=uuid, lazy=True)
+    task.set_status("running")
+    task.set_progress(50)
+    assert catalogue.requests["GET"] == 0
+
+    # The record returned by the last PATCH is used
+    assert task.record["status"] == "running"
+    assert task.record["progress"] == {"percent": 50}
+    assert catalogue.requests["GET"] == 0
+
+
+def test_partial_entry(catalogue):
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+
+    catalogue.add("datasets", {"name": "a", "metadata": {"updated": 3, "statistics": [1.0] * 100, "TEST": {}}})
+
+    entry = DatasetCatalogueEntry(key="a", fields=["metadata.updated"])
+    assert entry.record["metadata"]["updated"] == 3
+    assert catalogue.requests["GET"] == 1
+
+    # Nested fields missing from the projection are fetched on demand, once
+    assert entry.record["metadata"]["statistics"] == [1.0] * 100
+    assert entry.record["metadata"]["TEST"] == {}
+    assert catalogue.requests["GET"] == 2
+
+    entry.set_value("other", "x", increment_update=True)
+    entry.set_value("TEST.a.b", "y")
+    assert catalogue.requests["GET"] == 2
+
+    record = catalogue.collections["datasets"]["a"]
+    assert record["metadata"]["updated"] == 4
+    assert record["metadata"]["TEST"] == {"a": {"b": "y"}}
+
+
+def test_partial_record_fetch_failure():
+    from anemoi.registry.entry import PartialRecord
+
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("unreachable")
+        return {"name": "a", "status": "ok"}
+
+    record = PartialRecord({"name": "a"}, fetch, projected=True)
+    with pytest.raises(ConnectionError):
+        record["status"]
+
+    # Still partial, fetched again
+    assert record["status"] == "ok"
+    assert dict(record) == {"name": "a", "status": "ok"}
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("params", [None, {"_": True}])
+def test_record_follows_patches(catalogue, params):
+    from anemoi.registry.entry.experiment import ExperimentCatalogueEntry
+
+    catalogue.add("experiments", {"expver": "i4df", "runs": {"1": {"archives": {}}}})
+
+    entry = ExperimentCatalogueEntry(key="i4df", params=params)
+    entry.set_key("foo", "bar", run_number=2)
+    entry.set_key("foo", "baz", run_number=3)
+    entry.set_key("top", 1, run_number=None)
+
+    # No refetch between the writes, and the record matches the catalogue
+    assert catalogue.requests["GET"] == 1
+    assert entry.record["runs"] == catalogue.collections["experiments"]["i4df"]["runs"]
+    assert entry.record["runs"]["3"] == {"archives": {}, "foo": "baz"}
+    assert entry.record["top"] == 1
+    assert entry.get_value("/runs/2/foo") == "bar"
+
+
+def test_edit_sends_one_patch(catalogue):
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+
+    catalogue.add("datasets", {"name": "a", "metadata": {"updated": 3, "tags": ["x"], "recipe": {}}})
+    entry = DatasetCatalogueEntry(key="a")
+
+    with entry.edit(increment_update=True, guard=True) as record:
+        record["metadata"]["recipe"] = {"dates": {"start": 2020}}
+        record["metadata"]["tags"].append("y")
+        del record["metadata"]["recipe"]["dates"]["start"]
+        record["metadata"]["new"] = 1
+
+    assert catalogue.requests["PATCH"] == 1
+    metadata = catalogue.collections["datasets"]["a"]["metadata"]
+    assert metadata == {"updated": 4, "tags": ["x", "y"], "recipe": {"dates": {}}, "new": 1}
+    assert entry.record["metadata"] == metadata
+
+    # No changes, no request
+    with entry.edit(increment_update=True) as record:
+        record["metadata"]["new"] = 1
+    assert catalogue.requests["PATCH"] == 1
+
+    # Nothing is sent if the block fails
+    with pytest.raises(RuntimeError):
+        with entry.edit() as record:
+            record["metadata"]["new"] = 2
+            raise RuntimeError()
+    assert catalogue.requests["PATCH"] == 1
+    assert entry.record["metadata"]["new"] == 1
+
+
+def test_edit_guard(catalogue):
+    from requests.exceptions import HTTPError
+
+    from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+
+    catalogue.add("datasets", {"name": "a", "metadata": {"updated": 3}})
+    entry = DatasetCatalogueEntry(key="a")
+
+    # Someone else updates the entry
+    catalogue.collections["datasets"]["a"]["metadata"]["updated"] = 4
+
+    with pytest.raises(HTTPError):
+        with entry.edit(guard=True) as record:
+            record["metadata"]["new"] = 1
+    assert "new" not in catalogue.collections["datasets"]["a"]["metadata"]
+
+
+def test_compare_and_swap_retries_on_conflict(catalogue):
+    from anemoi.registry.entry import CONFLICT_STATS
+    from anemoi.registry.entry.experiment import ExperimentCatalogueEntry
+
+    CONFLICT_STATS.clear()
+    catalogue.add("experiments", {"expver": "i4df", "runs": {"1": {}}})
+    entry = ExperimentCatalogueEntry(key="i4df")
+
+    calls = []
+
+    def add_run(record):
+        calls.append(dict(record["runs"]))
+        if len(calls) == 1:
+            # Another writer adds a run after we read the record
+            catalogue.collections["experiments"]["i4df"]["runs"]["2"] = {}
+        record["runs"]["3"] = {}
+
+    entry.compare_and_swap(add_run, backoff=0)
+
+    assert calls == [{"1": {}}, {"1": {}, "2": {}}]
+    assert catalogue.collections["experiments"]["i4df"]["runs"] == {"1": {}, "2": {}, "3": {}}
+    assert entry.record["runs"] == {"1": {}, "2": {}, "3": {}}
+    assert CONFLICT_STATS == {"experiments.conflicts": 1, "experiments.retries": 1}
+
+
+def test_compare_and_swap_is_not_resent(catalogue, monkeypatch):
+    import requests
+
+    from anemoi.registry.entry.experiment import ExperimentCatalogueEntry
+    from anemoi.registry.rest import Rest
+
+    catalogue.add("experiments", {"expver": "i4df", "metadata": {"count": 0}})
+    entry = ExperimentCatalogueEntry(key="i4df")
+    session = Rest().session
+    patch = session.patch
+
+    def lost_response(*args, **kwargs):
+        # The PATCH is applied, but the response never arrives
+        patch(*args, **kwargs)
+        raise requests.exceptions.ConnectionError("connection reset")
+
+    monkeypatch.setattr(session, "patch", lost_response)
+
+    def increment(record):
+        record["metadata"]["count"] += 1
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        entry.compare_and_swap(increment, backoff=0)
+
+    assert catalogue.collections["experiments"]["i4df"]["metadata"]["count"] == 1
+    assert catalogue.requests["PATCH"] == 1
+
+
+def test_compare_and_swap_gives_up(catalogue):
+    from anemoi.registry.entry import CONFLICT_STATS
+    from anemoi.registry.entry import PatchConflict
+    from anemoi.registry.entry.experiment import ExperimentCatalogueEntry
+
+    CONFLICT_STATS.clear()
+    catalogue.add("experiments", {"expver": "i4df", "runs": {}})
+    entry = ExperimentCatalogueEntry(key="i4df")
+
+    def add_run(record):
+        catalogue.collections["experiments"]["i4df"]["runs"][str(len(record["runs"]))] = {}
+        record["runs"]["new"] = {}
+
+    with pytest.raises(PatchConflict):
+        entry.compare_and_swap(add_run, retries=2, backoff=0)
+
+    assert "new" not in catalogue.collections["experiments"]["i4df"]["runs"]
+    assert CONFLICT_STATS == {"experiments.conflicts": 3, "experiments.retries": 2, "experiments.failures": 1}
@@ -0,0 +1,86 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import urllib.request
+
+from anemoi.registry.metrics import METRICS
+from anemoi.registry.metrics import Metrics
+from anemoi.registry.tasks import TaskCatalogueEntryList
+from anemoi.registry.workers.dummy import DummyWorker
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_render():
+    metrics = Metrics(buckets=(1, 10))
+    metrics.inc("tasks_total", action="dummy", event="claimed")
+    metrics.inc("tasks_total", 2, action="dummy", event="claimed")
+    for value in (0.5, 1, 5, 50):
+        metrics.observe("task_seconds", value, action="dummy")
+
+    text = metrics.render()
+    assert "# TYPE anemoi_registry_tasks_total counter" in text
+    assert "# TYPE anemoi_registry_task_seconds histogram" in text
+
+    samples = _samples(text)
+    assert samples['anemoi_registry_tasks_total{action="dummy",event="claimed"}'] == "3"
+    assert samples['anemoi_registry_task_seconds_bucket{action="dummy",le="1"}'] == "2"
+    assert samples['anemoi_registry_task_seconds_bucket{action="dummy",le="10"}'] == "3"
+    assert samples['anemoi_registry_task_seconds_bucket{action="dummy",le="+Inf"}'] == "4"
+    assert samples['anemoi_registry_task_seconds_count{action="dummy"}'] == "4"
+    assert samples['anemoi_registry_task_seconds_sum{action="dummy"}'] == "56.5"
+
+
+def test_worker_metrics(catalogue, tmp_path):
+    METRICS.clear()
+    catalogue.add("tasks", {"action": "dummy"})
+
+    path = tmp_path / "worker-{pid}.prom"
+    worker = DummyWorker(arg=None, heartbeat=60, max_no_heartbeat=0, wait=1, metrics_textfile=str(path))
+    worker.run()
+
+    (path,) = tmp_path.glob("worker-*.prom")
+    samples = _samples(path.read_text())
+    assert samples['anemoi_registry_tasks_total{action="dummy",event="claimed"}'] == "1"
+    assert samples['anemoi_registry_tasks_total{action="dummy",event="completed"}'] == "1"
+    assert samples['anemoi_registry_task_seconds_count{action="dummy",event="completed"}'] == "1"
+    assert samples["anemoi_registry_claim_claimed_total"] != "0"
+    # List, claim (and maybe a heartbeat), and delete
+    assert int(samples['anemoi_registry_request_seconds_count{method="GET"}']) >= 1
+    assert int(samples['anemoi_registry_request_seconds_count{method="PATCH"}']) >= 1
+    assert int(samples['anemoi_registry_request_seconds_count{method="DELETE"}']) == 1
+
+
+def test_serve():
+    metrics = Metrics()
+    metrics.inc("tasks_total", action="dummy", event="failed")
+    server = metrics.serve(0)
+    try:
+        # Not reachable from other hosts
+        address, port = server.server_address
+        assert address == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as r:
+            text = r.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'anemoi_registry_tasks_total{action="dummy",event="failed"} 1' in text
+
+
+def test_long_polls_not_in_request_latency(catalogue):
+    METRICS.clear()
+    queue = TaskCatalogueEntryList(status="queued")
+    etag = queue.wait_for_change(None, timeout=1)
+    queue.wait_for_change(etag, timeout=0.2)
+    assert 'request_seconds_count{method="GET"}' not in METRICS.render()
+
+    len(queue)
+    assert _samples(METRICS.render())['anemoi_registry_request_seconds_count{method="GET"}'] == "1"
@@ -0,0 +1,193 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import pytest
+
+from anemoi.registry.configuration import CONF
+from anemoi.registry.entry.dataset import DatasetCatalogueEntry
+from anemoi.registry.entry.dataset import DatasetCatalogueEntryList
+from anemoi.registry.mirror import Mirror
+from anemoi.registry.rest import Offline
+from anemoi.registry.tasks import TaskCatalogueEntryList
+
+
+@pytest.fixture
+def mirror(catalogue, tmp_path):
+    CONF._cache["mirror"] = {"path": str(tmp_path / "mirror.sqlite"), "offline": False}
+    mirror = Mirror.from_config(CONF._cache["mirror"])
+    yield mirror
+    mirror.close()
+
+
+def test_mirror_sync_is_incremental(catalogue, mirror):
+    for name in ("a", "b", "c"):
+        catalogue.add("datasets", {"name": name, "status": "experimental", "metadata": {"size": 1}})
+    catalogue.add("weights", {"uuid": "w1"})
+
+    results = mirror.sync()
+    assert results["datasets"]["added"] == 3
+    assert results["weights"]["added"] == 1
+    assert mirror.status()["datasets"][0] == 3
+    # One list per collection, then each new record
+    assert catalogue.requests["GET"] == 4 + 4
+
+    # Nothing changed: one list per collection, no record downloaded
+    catalogue.reset_counts()
+    results = mirror.sync()
+    assert catalogue.requests["GET"] == 4
+    assert results["datasets"] == {"added": 0, "updated": 0, "deleted": 0, "unchanged": 3}
+
+    catalogue.patch("datasets", "a", {}, [{"op": "replace", "path": "/status", "value": "ok"}])
+    catalogue.delete("datasets", "b", {}, None)
+    catalogue.add("datasets", {"name": "d"})
+
+    catalogue.reset_counts()
+    results = mirror.sync(["datasets"])
+    assert results["datasets"] == {"added": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+    assert catalogue.requests["GET"] == 1 + 2
+
+    assert mirror.get("datasets", "a")["status"] == "ok"
+    assert mirror.get("datasets", "b") is None
+    assert [r["name"] for r in mirror.list("datasets", {"status": "experimental"})] == ["c"]
+
+
+def test_mirror_sync_without_projection(catalogue, mirror):
+    catalogue.supports_fields = False
+    for name in ("a", "b"):
+        catalogue.add("datasets", {"name": name, "metadata": {"size": 1}})
+    mirror.sync(["datasets"])
+
+    catalogue.patch("datasets", "a", {}, [{"op": "replace", "path": "/metadata/size", "value": 2}])
+    catalogue.reset_counts()
+    results = mirror.sync(["datasets"])
+    assert results["datasets"] == {"added": 0, "updated": 1, "deleted": 0, "unchanged": 1}
+    # The list has the whole records, none is fetched again
+    assert catalogue.requests["GET"] == 1
+    assert mirror.get("datasets", "a")["metadata"] == {"size": 2}
+
+
+def test_mirror_sync_fetches_records_missing_from_list(catalogue, mirror, monkeypatch):
+    catalogue.add("datasets", {"name": "a", "status": "ok", "metadata": {"size": 1}})
+    get = catalogue.get
+
+    def get_without_metadata(collection, key, params, body):
+        # A list that leaves out a field of the records
+        status, payload = get(collection, key, params, body)
+        if key is None and status == 200:
+            payload = [{k: v for k, v in r.items() if k != "metadata"} for r in payload]
+        return status, payload
+
+    monkeypatch.setattr(catalogue, "get", get_without_metadata)
+    mirror.sync(["datasets"])
+    assert mirror.get("datasets", "a")["metadata"] == {"size": 1}
+
+
+def test_offline_reads_from_mirror(catalogue, mirror):
+    catalogue.add("datasets", {"name": "a", "status": "ok", "metadata": {"size": 1}})
+    catalogue.add("datasets", {"name": "b", "status": "experimental"})
+    mirror.sync()
+
+    CONF._cache["mirror"]["offline"] = True
+    catalogue.reset_counts()
+
+    assert DatasetCatalogueEntry(key="a").record["metadata"] == {"size": 1}
+    assert DatasetCatalogueEntry.load_from_key("missing") is None
+    assert [e.key for e in DatasetCatalogueEntryList()] == ["a", "b"]
+    assert DatasetCatalogueEntryList().get(params={"status": "ok"}, fields=["name"]) == [{"name": "a"}]
+    assert DatasetCatalogueEntry.key_exists("b")
+    assert catalogue.total_requests == 0
+
+    with pytest.raises(Offline):
+        DatasetCatalogueEntry(key="a").set_status("ok")
+    with pytest.raises(Offline):
+        len(TaskCatalogueEntryList())
+    assert catalogue.total_requests == 0
+
+
+@pytest.mark.parametrize("where", ["resolution=o96 and .status exists", "tags.0=x or resolution=o96"])
+def test_offline_where(catalogue, mirror, where):
+    catalogue.add("datasets", {"name": "a", "status": "ok", "metadata": {"resolution": "o96", "tags": ["x"]}})
+    catalogue.add("datasets", {"name": "b", "metadata": {"resolution": "o96"}})
+    catalogue.add("datasets", {"name": "c", "status": "ok", "metadata": {"resolution": "n320"}})
+    mirror.sync(["datasets"])
+    online = DatasetCatalogueEntryList(where=where).get(fields=["name"])
+    assert 0 < len(online) < 3
+
+    CONF._cache["mirror"]["offline"] = True
+    assert DatasetCatalogueEntryList(where=where).get(fields=["name"]) == online
+    assert [e.key for e in DatasetCatalogueEntryList(where=where)] == [r["name"] for r in online]
+
+
+def test_search(catalogue, mirror):
+    catalogue.add(
+        "datasets",
+        {
+            "name": "aifs-od-an-oper-0001-mars-o96-2016-2023-6h-v1",
+            "metadata": {
+                "description": "Operational analysis",
+                "variables_metadata": {"2t": {"mars": {"param": "2t"}}, "z_500": {"mars": {"param": "z"}}},
+                "recipe": {"input": {"accumulations": {"class": "od"}}},
+                "statistics": {"mean": [1.5, 2.5]},
+            },
+        },
+    )
+    catalogue.add("datasets", {"name": "era5-n320", "metadata": {"description": "Reanalysis with 2t in the text"}})
+    catalogue.add("experiments", {"expver": "i4df", "metadata": {"description": "Trained on era5-n320"}})
+    mirror.sync()
+
+    def search(text, **kwargs):
+        return [key for _, key, _ in mirror.search(text, **kwargs)]
+
+    # A variable ranks above a mention in the text
+    assert search("2t") == ["aifs-od-an-oper-0001-mars-o96-2016-2023-6h-v1", "era5-n320"]
+    assert search("variables:2t") == ["aifs-od-an-oper-0001-mars-o96-2016-2023-6h-v1"]
+    assert search("accumulations o96") == ["aifs-od-an-oper-0001-mars-o96-2016-2023-6h-v1"]
+    assert search("era5-n320") == ["era5-n320", "i4df"]
+    assert search("era5-n320", collections=["experiments"]) == ["i4df"]
+    assert search("reanal*") == ["era5-n320"]
+    assert search("z_500 OR nothing") == ["aifs-od-an-oper-0001-mars-o96-2016-2023-6h-v1"]
+
+    # The index follows the incremental syncs
+    catalogue.patch("datasets", "era5-n320", {}, [{"op": "replace", "path": "/metadata/description", "value": "ERA5"}])
+    catalogue.delete("experiments", "i4df", {}, None)
+    mirror.sync()
+    assert search("reanalysis") == []
+    assert search("era5") == ["era5-n320"]
+
+
+def test_mirror_without_fts5(catalogue, mirror, monkeypatch):
+    import anemoi.registry.mirror
+
+    catalogue.add("datasets", {"name": "a", "metadata": {"description": "findme"}})
+    catalogue.add("datasets", {"name": "b", "metadata": {}})
+    mirror.sync(["datasets"])
+
+    monkeypatch.setattr(anemoi.registry.mirror, "fts5_available", lambda: False)
+    catalogue.patch("datasets", "b", {}, [{"op": "add", "path": "/metadata/description", "value": "findme too"}])
+    catalogue.delete("datasets", "a", {}, None)
+    assert mirror.sync(["datasets"])["datasets"] == {"added": 0, "updated": 1, "deleted": 1, "unchanged": 0}
+    assert mirror.get("datasets", "b")["metadata"] == {"description": "findme too"}
+    with pytest.raises(ValueError, match="FTS5"):
+        mirror.search("findme")
+
+    # Brought up to date by the next process with FTS5
+    monkeypatch.undo()
+    mirror.close()
+    assert [key for _, key, _ in mirror.search("findme")] == ["b"]
+
+
+def test_search_index_built_for_existing_mirror(catalogue, mirror):
+    catalogue.add("datasets", {"name": "a", "metadata": {"description": "findme"}})
+    mirror.sync()
+    # As created before the search index
+    mirror.db.execute("DROP TABLE search")
+    mirror.db.execute("PRAGMA user_version = 0")
+    mirror.close()
+
+    assert [key for _, key, _ in mirror.search("findme")] == ["a"]
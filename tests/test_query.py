@@ -0,0 +1,76 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import pytest
+
+from anemoi.registry.query import Query
+from anemoi.registry.query import QueryError
+
+RECORDS = [
+    {
+        "name": "aifs-o96",
+        "status": "ok",
+        "locations": {"leonardo": {"path": "/data"}},
+        "metadata": {"resolution": "o96", "start_date": "1979-01-01T00:00:00", "frequency": "6h", "n": 5},
+    },
+    {
+        "name": "era5-n320",
+        "status": "deprecated",
+        "locations": {"ewc": {"path": "s3://"}},
+        "metadata": {"resolution": "n320", "start_date": "1990-01-01T00:00:00", "frequency": "1h", "n": 12},
+    },
+    {"name": "empty", "metadata": {"variables": ["2t", "10u"], "flag": True}},
+]
+
+
+@pytest.mark.parametrize(
+    "query, names",
+    [
+        ("resolution=o96 and start_date<1990 and .locations.leonardo exists", ["aifs-o96"]),
+        ("frequency in (6h, 24h) or n>10", ["aifs-o96", "era5-n320"]),
+        ("not .status=deprecated", ["aifs-o96", "empty"]),
+        (".status!=deprecated", ["aifs-o96"]),
+        (".name~*-n320", ["era5-n320"]),
+        ("n in 5..10", ["aifs-o96"]),
+        ("n in 6..", ["era5-n320"]),
+        ("n not in (5, 12)", ["empty"]),
+        ("variables=2t", ["empty"]),
+        ("flag=true", ["empty"]),
+        ("/metadata/resolution == 'n320'", ["era5-n320"]),
+        ("not (resolution exists) or n = 5", ["aifs-o96", "empty"]),
+    ],
+)
+def test_query(query, names):
+    query = Query(query)
+    assert [r["name"] for r in RECORDS if query.match(r)] == names
+    # Same result over columns
+    columns = {p.parts: [p(r) for r in RECORDS] for p in query.paths}
+    assert [RECORDS[i]["name"] for i in query.select(columns, len(RECORDS))] == names
+
+
+def test_query_fields():
+    assert Query("resolution=o96 and .locations.leonardo exists").fields() == [
+        "metadata.resolution",
+        "locations.leonardo",
+    ]
+    assert Query(["n>1", "n<3"]).fields() == ["metadata.n"]
+    assert Query("/metadata/key.with.dot=1").fields() is None
+
+
+def test_filter_columnar():
+    records = [{"metadata": {"n": i, "even": i % 2 == 0}} for i in range(1000)]
+    query = Query("n<100 and (even=true or n in 95..)")
+    assert query.filter(records) == [r for r in records if query.match(r)]
+    assert len(query.filter(records)) == 50 + 3
+
+
+@pytest.mark.parametrize("query", ["a =", "a ?? b", "(a=1", "a in b", "= 1", "a=1 b=2"])
+def test_invalid_query(query):
+    with pytest.raises(QueryError):
+        Query(query)
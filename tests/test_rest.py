@@ -0,0 +1,106 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+
+import os
+
+from anemoi.registry.rest import Rest
+from anemoi.registry.rest import RestItem
+from anemoi.registry.rest import RestItemList
+
+
+def test_session_is_shared(catalogue):
+    assert Rest().session is Rest().session
+    assert RestItem("datasets", "a").rest.session is RestItemList("datasets").rest.session
+    assert Rest(token="other").session is not Rest().session
+
+
+def test_forked_child_has_its_own_session(catalogue):
+    import anemoi.registry.rest as rest
+
+    api = Rest()
+    parent = api.session
+    rest._SESSIONS_LOCK.acquire()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            # As in the child: the lock held by the parent is replaced, and the session is not reused
+            ok = api.session is not parent and RestItem("datasets", "a").rest.session is api.session
+            os._exit(0 if ok else 1)
+    finally:
+        rest._SESSIONS_LOCK.release()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert api.session is parent
+
+
+def test_connections_are_reused(catalogue):
+    for i in range(20):
+        catalogue.add("datasets", {"name": f"dataset-{i}", "metadata": {}})
+
+    for i in range(20):
+        RestItem("datasets", f"dataset-{i}").get()
+
+    assert catalogue.requests["GET"] == 20
+    assert catalogue.requests["connections"] == 1
+
+
+def test_response_cache(catalogue, tmp_path):
+    from anemoi.registry.configuration import CONF
+
+    catalogue.add("datasets", {"name": "cached", "metadata": {"value": 1}})
+    CONF._cache["http_cache"] = dict(enabled=True, path=str(tmp_path / "cache.sqlite"), max_size_mb=1)
+
+    assert RestItem("datasets", "cached").get()["metadata"]["value"] == 1
+    assert RestItem("datasets", "cached").get()["metadata"]["value"] == 1
+    assert catalogue.requests["not-modified"] == 1
+
+    # Changes on the server are seen
+    RestItem("datasets", "cached").patch([{"op": "add", "path": "/metadata/value", "value": 2}])
+    assert RestItem("datasets", "cached").get()["metadata"]["value"] == 2
+    assert catalogue.requests["not-modified"] == 1
+
+    # The cache can be bypassed
+    RestItem("datasets", "cached").get(cache=False)
+    assert catalogue.requests["not-modified"] == 1
+
+
+def test_response_cache_eviction(tmp_path):
+    from anemoi.registry.http_cache import ResponseCache
+
+    class Response:
+        headers = {"ETag": '"x"'}
+        content = os.urandom(200 * 1024)
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_size_mb=0.5)
+    for i in range(4):
+        cache.store(f"key-{i}", Response())
+
+    assert cache.lookup("key-0") is None
+    assert cache.lookup("key-3") is not None
+
+
+def test_exists_uses_head(catalogue):
+    from anemoi.registry.rest import _HEAD_SUPPORTED
+
+    catalogue.add("datasets", {"name": "a", "metadata": {}})
+    _HEAD_SUPPORTED.clear()
+
+    assert RestItem("datasets", "a").exists()
+    assert not RestItem("datasets", "b").exists()
+    assert catalogue.requests["HEAD"] == 2
+    assert catalogue.requests["GET"] == 0
+
+    # Fallback to GET for servers without HEAD support
+    catalogue.supports_head = False
+    _HEAD_SUPPORTED.clear()
+    assert RestItem("datasets", "a").exists()
+    assert not RestItem("datasets", "b").exists()
+    assert catalogue.requests["HEAD"] == 3
+    assert catalogue.requests["GET"] == 2
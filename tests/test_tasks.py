@@ -0,0 +1,136 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import datetime
+import threading
+
+import pytest
+
+from anemoi.registry.entry import PatchConflict
+from anemoi.registry.tasks import CLAIM_STATS
+from anemoi.registry.tasks import REAP_STATS
+from anemoi.registry.tasks import ClaimContended
+from anemoi.registry.tasks import TaskCatalogueEntry
+from anemoi.registry.tasks import TaskCatalogueEntryList
+
+
+def _add_tasks(catalogue, n, **kwargs):
+    return [
+        catalogue.add("tasks", {"action": "dummy", "updated": f"2024-01-01T00:00:{i:02d}", **kwargs}) for i in range(n)
+    ]
+
+
+def test_claim_window(catalogue):
+    uuids = _add_tasks(catalogue, 40)
+
+    claimed = TaskCatalogueEntryList(status="queued").claim(count=3, window=5)
+
+    assert len(claimed) == 3
+    # Only among the five oldest, and the list is requested with a limit
+    assert {t.key for t in claimed} <= set(uuids[:5])
+    assert all(t.record["status"] == "running" for t in claimed)
+    assert catalogue.requests["GET"] == 1
+    assert catalogue.requests["PATCH"] == 3
+
+
+def test_take_last(catalogue):
+    uuids = _add_tasks(catalogue, 10)
+    assert TaskCatalogueEntryList(status="queued").take_last() in uuids
+    assert TaskCatalogueEntryList(status="queued", action="other").take_last() is None
+
+
+def test_concurrent_claims(catalogue):
+    CLAIM_STATS.clear()
+    _add_tasks(catalogue, 40)
+    claimed = []
+
+    def worker():
+        while True:
+            try:
+                tasks = TaskCatalogueEntryList(status="queued").claim(window=8)
+            except ClaimContended:
+                continue
+            if not tasks:
+                break
+            claimed.extend(t.key for t in tasks)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every task is claimed exactly once
+    assert sorted(claimed) == sorted(catalogue.collections["tasks"])
+    assert CLAIM_STATS["claimed"] == 40
+    assert CLAIM_STATS["attempts"] == 40 + CLAIM_STATS["conflicts"]
+
+
+def test_claim_contended(catalogue, monkeypatch):
+    _add_tasks(catalogue, 10)
+    take_ownership = TaskCatalogueEntry.take_ownership
+
+    def taken_first(task):
+        # Another worker claims it just before
+        catalogue.collections["tasks"][task.key]["status"] = "running"
+        return take_ownership(task)
+
+    monkeypatch.setattr(TaskCatalogueEntry, "take_ownership", taken_first)
+    # Lost in every round, unlike an empty queue
+    with pytest.raises(ClaimContended):
+        TaskCatalogueEntryList(status="queued").claim(rounds=3)
+    assert TaskCatalogueEntryList(status="queued", action="other").claim() == []
+
+
+def test_reap(catalogue):
+    stale = _add_tasks(catalogue, 3, status="running", worker={"host": "gone"})
+    fresh = catalogue.add(
+        "tasks", {"action": "dummy", "status": "running", "updated": datetime.datetime.utcnow().isoformat()}
+    )
+    queued = catalogue.add("tasks", {"action": "dummy", "updated": "2024-01-01T00:00:00"})
+    REAP_STATS.clear()
+
+    reaped = TaskCatalogueEntryList(status="running").reap(max_no_heartbeat=600)
+
+    assert sorted(reaped) == sorted(stale)
+    tasks = catalogue.collections["tasks"]
+    assert all(tasks[uuid]["status"] == "queued" and "worker" not in tasks[uuid] for uuid in stale)
+    assert tasks[fresh]["status"] == "running"
+    assert tasks[queued]["status"] == "queued"
+    # One scan, one patch per stale task
+    assert catalogue.requests["GET"] == 1
+    assert catalogue.requests["PATCH"] == 3
+    assert REAP_STATS == {"scans": 1, "running": 4, "stale": 3, "reaped": 3}
+
+
+def test_reap_spares_task_with_late_heartbeat(catalogue):
+    (uuid,) = _add_tasks(catalogue, 1, status="running", worker={"host": "slow"})
+    TaskCatalogueEntry(key=uuid).heartbeat()
+
+    # Released only if not updated since the scan
+    with pytest.raises(PatchConflict):
+        TaskCatalogueEntry(key=uuid, lazy=True).release_ownership(updated="2024-01-01T00:00:00")
+    assert catalogue.collections["tasks"][uuid]["status"] == "running"
+
+
+def test_delete_many_tasks_chunk_fails(catalogue, monkeypatch):
+    uuids = [catalogue.add("tasks", {"action": "dummy"}) for _ in range(1200)]
+    bulk_delete = catalogue.bulk_delete
+
+    def failing(collection, keys):
+        if uuids[600] in keys:
+            return 400, {"error": "bad request"}
+        return bulk_delete(collection, keys)
+
+    monkeypatch.setattr(catalogue, "bulk_delete", failing)
+    counts = TaskCatalogueEntryList().delete_many(uuids)
+
+    # Only the tasks of the failed request are left
+    assert counts == {"deleted": 700, "missing": 0, "failed": 500}
+    assert list(catalogue.collections["tasks"]) == uuids[500:1000]
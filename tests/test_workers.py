@@ -0,0 +1,474 @@
+# (C) Copyright 2024-2026 Anemoi contributors.
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# In applying this licence, ECMWF does not waive the privileges and immunities
+# granted to it by virtue of its status as an intergovernmental organisation
+# nor does it submit to any jurisdiction.
+
+import signal
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from anemoi.registry.tasks import ClaimContended
+from anemoi.registry.tasks import TaskCatalogueEntryList
+from anemoi.registry.workers import Backoff
+from anemoi.registry.workers import Heartbeat
+from anemoi.registry.workers.dummy import DummyWorker
+from anemoi.registry.workers.reaper import ReaperWorker
+from anemoi.registry.workers.supervisor import Pool
+
+
+def _worker(**kwargs):
+    return DummyWorker(arg=None, heartbeat=60, max_no_heartbeat=0, wait=1, **kwargs)
+
+
+def test_backoff():
+    backoff = Backoff(1, 10, jitter=0)
+    assert [backoff.next() for _ in range(6)] == [1, 2, 4, 8, 10, 10]
+    backoff.reset()
+    assert backoff.next() == 1
+
+    backoff = Backoff(4, 100, jitter=0.25)
+    assert 3 <= backoff.next() <= 5
+    assert 6 <= backoff.next() <= 10
+
+
+def test_process_one_task(catalogue):
+    worker = _worker()
+    assert worker.process_one_task() is False
+
+    catalogue.add("tasks", {"action": "dummy"})
+    assert worker.process_one_task() is True
+    assert catalogue.collections["tasks"] == {}
+
+
+class FailingWorker(DummyWorker):
+    def __init__(self, **kwargs):
+        super().__init__(arg=None, heartbeat=60, max_no_heartbeat=0, wait=0.2, loop=True, **kwargs)
+        self.attempts = 0
+
+    def worker_process_task(self, task):
+        self.attempts += 1
+        raise RuntimeError("failed")
+
+
+def _run_for(worker, seconds):
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    time.sleep(seconds)
+    worker.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_failing_task_is_not_claimed_again_at_once(catalogue):
+    catalogue.add("tasks", {"action": "dummy"})
+    worker = FailingWorker()
+    assert worker.process_one_task() is False
+    assert worker.attempts == 1
+
+    # Waits 0.2, 0.4, 0.8s... between the attempts
+    _run_for(worker, 1.3)
+    assert 2 <= worker.attempts <= 5
+    assert catalogue.requests["PATCH"] <= 3 * worker.attempts
+
+
+def test_failing_task_is_not_claimed_again_at_once_in_slots(catalogue):
+    catalogue.add("tasks", {"action": "dummy"})
+    worker = FailingWorker(slots=3)
+    _run_for(worker, 1.3)
+    assert 2 <= worker.attempts <= 4
+
+
+def test_long_poll_wakes_up_on_new_task(catalogue):
+    worker = _worker(long_poll=True)
+    worker.pause(5)  # learns the current state of the queue
+
+    timer = threading.Timer(0.2, catalogue.add, ("tasks", {"action": "dummy"}))
+    timer.start()
+    start = time.monotonic()
+    worker.pause(5)
+    assert time.monotonic() - start < 1
+    assert catalogue.requests["GET"] == 2
+
+    # Tasks for other workers do not wake it up
+    timer = threading.Timer(0.2, catalogue.add, ("tasks", {"action": "other"}))
+    timer.start()
+    start = time.monotonic()
+    worker.pause(0.5)
+    assert time.monotonic() - start == pytest.approx(0.5, abs=0.2)
+
+
+def test_long_poll_not_supported(catalogue):
+    catalogue.supports_long_poll = False
+    worker = _worker(long_poll=True)
+    worker.pause(0.1)
+
+    # The server answers at once, the worker sleeps instead
+    start = time.monotonic()
+    worker.pause(0.5)
+    assert time.monotonic() - start == pytest.approx(0.5, abs=0.2)
+    assert catalogue.requests["GET"] == 2
+
+
+class SlowWorker(DummyWorker):
+    def __init__(self, **kwargs):
+        super().__init__(arg=None, heartbeat=0.05, max_no_heartbeat=0, wait=0.1, **kwargs)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.done = []
+
+    def worker_process_task(self, task):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.3)
+        with self.lock:
+            self.running -= 1
+        if task.record.get("fail"):
+            raise RuntimeError("failed")
+        self.done.append(task.key)
+
+
+def test_slots(catalogue):
+    good = [catalogue.add("tasks", {"action": "dummy"}) for _ in range(6)]
+    bad = catalogue.add("tasks", {"action": "dummy", "fail": True})
+
+    worker = SlowWorker(slots=3, loop=True)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while len(worker.done) < 6 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    worker.stop()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert worker.max_running == 3
+    assert sorted(worker.done) == sorted(good)
+    # The failed task is released and back in the queue, the others are deleted
+    assert list(catalogue.collections["tasks"]) == [bad]
+    assert catalogue.collections["tasks"][bad]["status"] == "queued"
+
+
+def test_slots_drain(catalogue):
+    for _ in range(5):
+        catalogue.add("tasks", {"action": "dummy"})
+
+    worker = SlowWorker(slots=2, loop=True)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    while worker.running < 2:
+        time.sleep(0.01)
+    worker.stop()
+    thread.join(5)
+
+    # The two tasks in flight are completed, no other is claimed
+    assert len(worker.done) == 2
+    assert [t["status"] for t in catalogue.collections["tasks"].values()] == ["queued"] * 3
+
+
+def test_heartbeats(catalogue):
+    uuid = catalogue.add("tasks", {"action": "dummy"})
+
+    worker = SlowWorker()
+    assert worker.process_one_task() is True
+    assert uuid in worker.done
+    # One heartbeat at the start, then one every 0.05s during the 0.3s of processing
+    assert 4 <= catalogue.requests["PATCH"] - 1 <= 8
+
+
+def test_release_stops_heartbeat(catalogue):
+    uuid = catalogue.add("tasks", {"action": "dummy"})
+    started, done = threading.Event(), threading.Event()
+
+    class BlockedWorker(SlowWorker):
+        def worker_process_task(self, task):
+            started.set()
+            done.wait(5)
+
+    worker = BlockedWorker()
+    thread = threading.Thread(target=worker.process_one_task)
+    thread.start()
+    started.wait(5)
+    # As on a second signal or at the end of the grace period
+    worker._release_active()
+    time.sleep(0.2)
+    assert catalogue.collections["tasks"][uuid]["status"] == "queued"
+    done.set()
+    thread.join(5)
+
+
+class FakeTask:
+    def __init__(self, key):
+        self.key = key
+
+
+def test_heartbeat_carries_latest_progress():
+    sent = []
+    heartbeats = Heartbeat(0.2, lambda task, progress: sent.append((task.key, progress)))
+    a, b = FakeTask("a"), FakeTask("b")
+
+    heartbeats.add(a)
+    heartbeats.add(b)
+    time.sleep(0.05)
+    for i in range(5):
+        heartbeats.report(a, i)
+    time.sleep(0.2)
+    heartbeats.remove(a)
+    heartbeats.remove(b)
+    time.sleep(0.2)
+
+    # One heartbeat per task per interval, with the latest progress only
+    assert sent == [("a", None), ("b", None), ("a", 4), ("b", None)]
+    assert heartbeats.thread is None
+
+
+def test_slow_heartbeat_does_not_block():
+    def send(task, progress):
+        if task.key == "slow":
+            time.sleep(0.5)
+
+    heartbeats = Heartbeat(10, send)
+    slow, fast = FakeTask("slow"), FakeTask("fast")
+    heartbeats.add(slow)
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    heartbeats.add(fast)
+    heartbeats.report(fast, 50)
+    heartbeats.remove(fast)
+    assert time.monotonic() - start < 0.2
+
+    # Until its heartbeat is sent, a task cannot be removed
+    heartbeats.remove(slow)
+    assert time.monotonic() - start >= 0.3
+    assert heartbeats.sending is None
+
+
+def test_heartbeat_backs_off():
+    times = []
+
+    def send(task, progress):
+        times.append(time.monotonic())
+        raise ConnectionError()
+
+    heartbeats = Heartbeat(0.05, send, max_interval=0.2)
+    task = FakeTask("a")
+    heartbeats.add(task)
+    time.sleep(0.8)
+    heartbeats.remove(task)
+
+    intervals = [round(b - a, 1) for a, b in zip(times, times[1:])]
+    assert intervals[:4] == [0.1, 0.2, 0.2, 0.2]
+
+
+def test_transfer_progress(monkeypatch):
+    from anemoi.registry.workers import transfer_dataset
+
+    clock = [1000.0]
+    monkeypatch.setattr(transfer_dataset.time, "monotonic", lambda: clock[0])
+
+    reports = []
+    progress = transfer_dataset.Progress(FakeTask("a"), frequency=60, report=reports.append, history=5)
+
+    total = 1000 * 1_000_000
+    progress(1000, total, 0, False)
+    progress(1000, total, 0, True)
+    # 1 MB per file, 10 files per second
+    for i in range(1, 1001):
+        clock[0] += 0.1
+        progress(1000, total, i * 1_000_000, True)
+
+    # Every 6 seconds while moving by at least one point, one at the end
+    assert 15 <= len(reports) <= 20
+    last = reports[-1]
+    assert last["files_transferred"] == 1000
+    assert last["percentage"] == 100
+    assert len(last["history"]) == 5
+    assert last["history"][-1] == [100.0, 1000, total]
+
+    middle = reports[len(reports) // 2]
+    assert middle["smoothed_bytes_per_second"] == pytest.approx(10_000_000)
+    assert middle["files_per_second"] == pytest.approx(10)
+    assert middle["eta_seconds"] == pytest.approx((total - middle["total_transferred"]) / 10_000_000, abs=1)
+
+
+def test_tasks_list_shows_eta(catalogue):
+    import datetime
+
+    eta = (datetime.datetime.utcnow() + datetime.timedelta(minutes=42, seconds=30)).isoformat()
+    catalogue.add("tasks", {"action": "dummy", "status": "running", "progress": {"percentage": 12.345, "eta": eta}})
+
+    text = TaskCatalogueEntryList().to_str(long=False)
+    assert "12.3" in text and "in 42 minutes" in text
+
+
+def test_reaper(catalogue):
+    old = {"status": "running", "updated": "2024-01-01T00:00:00", "worker": {}}
+    stale = catalogue.add("tasks", {"action": "dummy", **old})
+    other = catalogue.add("tasks", {"action": "other", **old})
+
+    reaper = ReaperWorker(heartbeat=60, max_no_heartbeat=60, wait=1, filter_tasks={"action": "dummy"})
+    assert reaper.scan() == [stale]
+    assert catalogue.collections["tasks"][other]["status"] == "running"
+
+    with pytest.raises(ValueError):
+        ReaperWorker(heartbeat=60, max_no_heartbeat=-1, wait=1)
+
+
+def test_claim_contended(catalogue, monkeypatch):
+    calls = []
+
+    def claim(*args, **kwargs):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise ClaimContended("taken")
+        worker.stop()
+        return []
+
+    worker = DummyWorker(arg=None, heartbeat=60, max_no_heartbeat=60, wait=60, loop=True)
+    monkeypatch.setattr(TaskCatalogueEntryList, "claim", claim)
+    monkeypatch.setattr(worker, "free_dead_tasks", lambda: calls.append(None))
+    with pytest.raises(ClaimContended):
+        worker.process_one_task()
+    assert len(calls) == 1
+
+    # The loop claims again soon, instead of backing off as if the queue was empty
+    calls.clear()
+    worker.run()
+    # The second claim finds the queue empty and looks for dead tasks
+    assert len(calls) == 3
+    assert calls[1] - calls[0] <= worker.contended_wait + 0.5
+
+
+def test_reaper_timeout(catalogue):
+    reaper = ReaperWorker(heartbeat=60, max_no_heartbeat=60, wait=1, loop=True, timeout_exit_code=3)
+    # As after the timeout alarm
+    reaper._timed_out.set()
+    reaper.stop()
+    with pytest.raises(SystemExit) as e:
+        reaper.run()
+    assert e.value.code == 3
+
+
+def test_idle_worker_without_reap(catalogue):
+    catalogue.add("tasks", {"action": "dummy", "status": "running", "updated": "2024-01-01T00:00:00"})
+
+    worker = DummyWorker(arg=None, heartbeat=60, max_no_heartbeat=60, wait=1, reap=False)
+    assert worker.process_one_task() is False
+    # Only the queue is looked at
+    assert catalogue.requests["GET"] == 1
+
+
+class ResumableWorker(DummyWorker):
+    def worker_process_task(self, task):
+        while True:
+            self.check_interrupted()
+            time.sleep(0.01)
+
+
+def test_soft_timeout_releases_task(catalogue):
+    uuid = catalogue.add("tasks", {"action": "dummy"})
+    worker = ResumableWorker(arg=None, heartbeat=60, max_no_heartbeat=0, wait=1, loop=True, timeout_exit_code=3)
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGHUP)}
+    try:
+        signal.signal(signal.SIGALRM, worker._soft_timeout)
+        signal.setitimer(signal.ITIMER_REAL, 0.3)
+        with pytest.raises(SystemExit) as e:
+            worker.run()
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    assert e.value.code == 3
+    # Back in the queue at once, for the next worker
+    task = catalogue.collections["tasks"][uuid]
+    assert task["status"] == "queued"
+    assert "worker" not in task
+
+
+def _wait_until(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+
+def test_supervisor_pool(catalogue, monkeypatch, tmp_path):
+    # The workers are separate processes, they find the catalogue from the environment
+    monkeypatch.setenv("ANEMOI_CATALOGUE", catalogue.url)
+    monkeypatch.setenv("ANEMOI_CATALOGUE_TOKEN", "test-token")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    settings = tmp_path / ".config" / "anemoi" / "settings.toml"
+    settings.parent.mkdir(parents=True)
+    settings.write_text("[registry]\n")
+
+    pool = Pool("dummy", max_workers=2, idle=0, options={"wait": 1})
+    assert pool.filter_tasks == {"action": "dummy"}
+    pool.step(time.monotonic())
+    assert pool.children == []
+
+    for _ in range(3):
+        catalogue.add("tasks", {"action": "dummy"})
+    pool.step(time.monotonic())
+    assert len(pool.children) == 2
+
+    try:
+        _wait_until(lambda: not catalogue.collections["tasks"])
+    finally:
+        # Nothing left, they are retired at once
+        pool.step(time.monotonic())
+        assert all(child.retiring for child in pool.children)
+        _wait_until(lambda: all(child.poll() is not None for child in pool.children))
+    assert [child.poll() for child in pool.children] == [0, 0]
+
+
+def test_supervisor_restarts_with_backoff(catalogue):
+    # Not a number, the worker exits at once
+    pool = Pool("dummy", min_workers=1, options={"wait": "never"}, restart_wait=100)
+    now = time.monotonic()
+    pool.step(now)
+    (child,) = pool.children
+    _wait_until(lambda: child.poll() is not None)
+
+    pool.step(now + 1)
+    assert pool.children == []
+    assert 75 <= pool.not_before - (now + 1) <= 125
+
+
+def test_supervisor_pool_command(catalogue):
+    pool = Pool("dummy", options={"wait": 5, "reap": False, "dry_run": True, "long_poll": False})
+    assert pool.command()[-5:] == ["--loop", "--wait", "5", "--no-reap", "--dry-run"]
+
+    with pytest.raises(ValueError, match="metrics_interval"):
+        Pool("dummy", options={"metrics_interval": 60})
+
+
+def test_supervisor_pool_size(catalogue, monkeypatch):
+    def no_worker(*args, **kwargs):
+        raise AssertionError("Workers are only created in their own processes")
+
+    monkeypatch.setattr(DummyWorker, "__init__", no_worker)
+    pool = Pool("dummy", max_workers=10, idle=60, options={"slots": 2})
+    assert pool.filter_tasks == {"action": "dummy"}
+
+    assert pool.target(queued=5, running=0, now=0) == 3
+    pool.children = [SimpleNamespace(retiring=False) for _ in range(3)]
+    # The tasks have been claimed, no more workers are needed
+    assert pool.target(queued=1, running=4, now=30) == 3
+    assert pool.target(queued=0, running=1, now=60) == 3
+    # Kept while idle for less than `idle` seconds
+    assert pool.target(queued=0, running=0, now=100) == 3
+    assert pool.target(queued=0, running=0, now=150) == 0
+
+    pool = Pool("transfer-dataset", options={"destination": "ewc", "source": "leonardo"})
+    assert pool.filter_tasks == {"action": "transfer-dataset", "destination": "ewc", "source": "leonardo"}